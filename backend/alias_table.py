@@ -0,0 +1,271 @@
+"""
+sanctions_alias: one row per entity name or alias, normalized at import time.
+
+sanctions_list.aliases is an array (or a JSON string, depending on the
+importer) that can only be matched exactly and without an index. This child
+table holds every primary name and alias with its normalized form, script
+and metaphone key, behind btree and trigram indexes, so one indexed lookup
+covers names and aliases together. It is rebuilt alongside sanctions_list
+by the full import and kept in step by delta syncs. Every other writer
+(COPY uploads, Supabase inserts, SQL edits) is covered by statement
+triggers on sanctions_list that rewrite the changed entities' rows in SQL;
+those rows carry no script or phonetic_key until the next rebuild.
+
+There is no foreign key: full imports swap sanctions_list for a new table,
+which a constraint would pin to the retired copy.
+"""
+import logging
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import jellyfish
+from psycopg2 import sql
+
+from backend.bulk_load import SANCTIONS_TABLE, bulk_load, copy_rows
+from backend.name_index import coerce_aliases, normalize_key
+
+logger = logging.getLogger(__name__)
+
+ALIAS_TABLE = 'sanctions_alias'
+ALIAS_COLUMNS = ['entity_id', 'alias', 'alias_norm', 'script', 'phonetic_key', 'is_primary']
+LOAD_BATCH_SIZE = 20000
+
+SCHEMA_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # entity_id takes whatever type sanctions_list.id has in this database
+    """
+    CREATE TABLE IF NOT EXISTS sanctions_alias (
+        entity_id {id_type} NOT NULL,
+        alias TEXT NOT NULL,
+        alias_norm TEXT NOT NULL,
+        script TEXT,
+        phonetic_key TEXT,
+        is_primary BOOLEAN NOT NULL DEFAULT FALSE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_sanctions_alias_entity ON sanctions_alias (entity_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sanctions_alias_norm ON sanctions_alias (alias_norm text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_sanctions_alias_trgm ON sanctions_alias USING gin (alias_norm gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_sanctions_alias_phonetic ON sanctions_alias (phonetic_key)",
+]
+
+# Keeps sanctions_alias in step with writes that bypass this module
+SYNC_SQL = [
+    # Same result as name_index.normalize_key, which writes alias_norm from Python
+    r"""
+    CREATE OR REPLACE FUNCTION sanctions_alias_key(t text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+    $$ SELECT btrim(regexp_replace(lower(coalesce(t, '')), '[^[:alnum:]_]+', ' ', 'g')) $$
+    """,
+    # aliases is text[], JSON text or delimited text depending on the importer, like coerce_aliases
+    """
+    CREATE OR REPLACE FUNCTION sanctions_alias_array(a text[]) RETURNS text[]
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT a $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sanctions_alias_array(a jsonb) RETURNS text[]
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+    $$ SELECT CASE WHEN jsonb_typeof(a) = 'array'
+                   THEN ARRAY(SELECT jsonb_array_elements_text(a)) END $$
+    """,
+    r"""
+    CREATE OR REPLACE FUNCTION sanctions_alias_array(a text) RETURNS text[]
+    LANGUAGE plpgsql IMMUTABLE AS $$
+    DECLARE
+        t text := btrim(coalesce(a, ''));
+    BEGIN
+        IF left(t, 1) = '[' THEN
+            BEGIN
+                RETURN ARRAY(SELECT json_array_elements_text(t::json));
+            EXCEPTION WHEN others THEN
+                NULL;
+            END;
+        END IF;
+        IF left(t, 1) = '{' AND right(t, 1) = '}' THEN
+            t := substr(t, 2, length(t) - 2);
+        END IF;
+        RETURN ARRAY(
+            SELECT btrim(btrim(v), '"')
+            FROM regexp_split_to_table(t, CASE WHEN position('|' IN t) > 0 THEN '\|' ELSE ',' END) AS v
+        );
+    END
+    $$
+    """,
+    # alias_table.alias_rows in SQL: name first, one row per distinct normalized form
+    """
+    CREATE OR REPLACE FUNCTION sanctions_alias_forms(p_name text, p_aliases text[])
+    RETURNS TABLE (alias text, alias_norm text, is_primary boolean)
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT DISTINCT ON (k.alias_norm) k.alias, k.alias_norm, k.ord = 1
+        FROM (
+            SELECT btrim(f.alias) AS alias, sanctions_alias_key(f.alias) AS alias_norm, f.ord
+            FROM unnest(ARRAY[p_name] || coalesce(p_aliases, ARRAY[]::text[])) WITH ORDINALITY AS f(alias, ord)
+        ) k
+        WHERE k.alias_norm <> ''
+        ORDER BY k.alias_norm, k.ord
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sync_sanctions_alias() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            TRUNCATE sanctions_alias;
+        ELSIF TG_OP = 'DELETE' THEN
+            DELETE FROM sanctions_alias a USING old_rows o WHERE a.entity_id = o.id;
+        ELSIF TG_OP = 'INSERT' THEN
+            DELETE FROM sanctions_alias a USING new_rows n WHERE a.entity_id = n.id;
+            INSERT INTO sanctions_alias (entity_id, alias, alias_norm, is_primary)
+            SELECT n.id, f.alias, f.alias_norm, f.is_primary
+            FROM new_rows n, sanctions_alias_forms(n.entity_name, sanctions_alias_array(n.aliases)) f;
+        ELSE
+            -- Only entities whose id, name or aliases changed
+            DELETE FROM sanctions_alias a USING old_rows o
+            WHERE a.entity_id = o.id
+              AND NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.id = o.id
+                              AND n.entity_name IS NOT DISTINCT FROM o.entity_name
+                              AND n.aliases IS NOT DISTINCT FROM o.aliases);
+            INSERT INTO sanctions_alias (entity_id, alias, alias_norm, is_primary)
+            SELECT n.id, f.alias, f.alias_norm, f.is_primary
+            FROM new_rows n, sanctions_alias_forms(n.entity_name, sanctions_alias_array(n.aliases)) f
+            WHERE NOT EXISTS (SELECT 1 FROM old_rows o WHERE o.id = n.id
+                              AND o.entity_name IS NOT DISTINCT FROM n.entity_name
+                              AND o.aliases IS NOT DISTINCT FROM n.aliases);
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    # Transition tables allow one event per trigger
+    "DROP TRIGGER IF EXISTS sanctions_alias_sync_insert ON sanctions_list",
+    "CREATE TRIGGER sanctions_alias_sync_insert AFTER INSERT ON sanctions_list"
+    " REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE sync_sanctions_alias()",
+    "DROP TRIGGER IF EXISTS sanctions_alias_sync_update ON sanctions_list",
+    "CREATE TRIGGER sanctions_alias_sync_update AFTER UPDATE ON sanctions_list"
+    " REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE PROCEDURE sync_sanctions_alias()",
+    "DROP TRIGGER IF EXISTS sanctions_alias_sync_delete ON sanctions_list",
+    "CREATE TRIGGER sanctions_alias_sync_delete AFTER DELETE ON sanctions_list"
+    " REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE PROCEDURE sync_sanctions_alias()",
+    "DROP TRIGGER IF EXISTS sanctions_alias_sync_truncate ON sanctions_list",
+    "CREATE TRIGGER sanctions_alias_sync_truncate AFTER TRUNCATE ON sanctions_list"
+    " FOR EACH STATEMENT EXECUTE PROCEDURE sync_sanctions_alias()",
+]
+
+
+def detect_script(text: str) -> Optional[str]:
+    """Dominant Unicode script of the letters in text ('latin', 'arabic', 'cyrillic', ...)"""
+    scripts = Counter()
+    for ch in text:
+        if ch.isalpha():
+            try:
+                scripts[unicodedata.name(ch).split(' ', 1)[0].lower()] += 1
+            except ValueError:
+                continue
+    return scripts.most_common(1)[0][0] if scripts else None
+
+
+def alias_rows(entity_id: Any, entity_name: Any, aliases: Any = None) -> List[Tuple]:
+    """ALIAS_COLUMNS rows for an entity's name and aliases, one per distinct normalized form"""
+    rows = []
+    seen = set()
+    for position, alias in enumerate([entity_name] + coerce_aliases(aliases)):
+        alias = str(alias or '').strip()
+        alias_norm = normalize_key(alias)
+        if not alias_norm or alias_norm in seen:
+            continue
+        seen.add(alias_norm)
+        script = detect_script(alias)
+        # Metaphone only means something for Latin spellings
+        phonetic_key = None
+        if script == 'latin':
+            phonetic_key = jellyfish.metaphone(alias_norm) or None
+        rows.append((entity_id, alias, alias_norm, script, phonetic_key, position == 0))
+    return rows
+
+
+def iter_alias_rows(records: Iterable[Dict[str, Any]]) -> Iterator[Tuple]:
+    """Alias rows for sanctions_list records (dicts with id, entity_name, aliases)"""
+    for record in records:
+        yield from alias_rows(record.get('id'), record.get('entity_name'), record.get('aliases'))
+
+
+def ensure_alias_table(conn) -> bool:
+    """Create sanctions_alias, its indexes and sync triggers if this database predates them; True if it was missing"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NULL AS missing", (ALIAS_TABLE,))
+        row = cursor.fetchone()
+        missing = row['missing'] if isinstance(row, dict) else row[0]
+        cursor.execute(
+            "SELECT format_type(atttypid, atttypmod) AS id_type FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attname = 'id'",
+            (SANCTIONS_TABLE,)
+        )
+        row = cursor.fetchone()
+        id_type = (row['id_type'] if isinstance(row, dict) else row[0]) if row else 'text'
+        for statement in SCHEMA_SQL:
+            cursor.execute(sql.SQL(statement).format(id_type=sql.SQL(id_type)))
+        for statement in SYNC_SQL:
+            cursor.execute(statement)
+    conn.commit()
+    return missing
+
+
+def backfill_missing_aliases(conn, batch_size: int = LOAD_BATCH_SIZE) -> int:
+    """Write alias rows for sanctions_list entities that have none; returns how many were covered.
+
+    Retrieval reads sanctions_alias whenever it exists, so an entity without
+    rows there drops out of screening. The sync triggers keep new writes
+    covered; this catches rows written before they existed or with them disabled.
+    """
+    start = time.time()
+    # Read everything first: COPY cannot run while a named cursor is still fetching
+    with conn.cursor(name='alias_table_backfill') as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(
+            "SELECT s.id, s.entity_name, s.aliases FROM sanctions_list s "
+            "WHERE NOT EXISTS (SELECT 1 FROM sanctions_alias a WHERE a.entity_id = s.id)"
+        )
+        entities = [
+            dict(row) if isinstance(row, dict) else {'id': row[0], 'entity_name': row[1], 'aliases': row[2]}
+            for row in cursor
+        ]
+    rows = list(iter_alias_rows(entities))
+    # Nameless rows come back every time without producing a row; they have nothing to match anyway
+    covered = len({row[0] for row in rows})
+    if rows:
+        with conn.cursor() as cursor:
+            copy_rows(cursor, ALIAS_TABLE, ALIAS_COLUMNS, rows)
+        logger.info(f"🏷️ Backfilled {len(rows):,} alias rows for {covered:,} uncovered entities "
+                    f"in {time.time() - start:.1f}s")
+    conn.commit()
+    return covered
+
+
+def replace_entity_aliases(cursor, entity_ids: Sequence[Any], records: Iterable[Dict[str, Any]]) -> int:
+    """Drop the alias rows of entity_ids and add rows for records, inside the caller's transaction"""
+    if entity_ids:
+        cursor.execute(
+            "CREATE TEMP TABLE sanctions_alias_stale ON COMMIT DROP AS "
+            "SELECT entity_id FROM sanctions_alias WITH NO DATA"
+        )
+        copy_rows(cursor, 'sanctions_alias_stale', ['entity_id'], ([entity_id] for entity_id in entity_ids))
+        cursor.execute("DELETE FROM sanctions_alias a USING sanctions_alias_stale s WHERE a.entity_id = s.entity_id")
+    return copy_rows(cursor, ALIAS_TABLE, ALIAS_COLUMNS, iter_alias_rows(records))
+
+
+def rebuild_alias_table(conn, batch_size: int = LOAD_BATCH_SIZE) -> int:
+    """Regenerate sanctions_alias from the current sanctions_list contents"""
+    start = time.time()
+    ensure_alias_table(conn)
+    # Read everything first: COPY cannot run while a named cursor is still fetching
+    with conn.cursor(name='alias_table_rebuild') as cursor:
+        cursor.itersize = batch_size
+        cursor.execute("SELECT id, entity_name, aliases FROM sanctions_list")
+        entities = [
+            dict(row) if isinstance(row, dict) else {'id': row[0], 'entity_name': row[1], 'aliases': row[2]}
+            for row in cursor
+        ]
+    loaded = bulk_load(conn, iter_alias_rows(entities), table=ALIAS_TABLE, columns=ALIAS_COLUMNS)
+    logger.info(f"✅ {loaded:,} alias rows for {len(entities):,} entities in {time.time() - start:.1f}s")
+    return loaded
@@ -1,23 +1,120 @@
+"""
+Database access for the FastAPI service.
+
+With DATABASE_URL set, queries go through an asyncpg pool that is opened
+at startup, so a screening waiting on Postgres never holds the event loop.
+Deployments that only configure SUPABASE_URL/SUPABASE_KEY keep using the
+supabase client. Its calls are synchronous and run on the bounded executor.
+"""
+import logging
 import os
-from supabase import create_client, Client
+from typing import Any, Dict, List, Optional
+
 from dotenv import load_dotenv
 
+from .executor import run_sync
+
 load_dotenv()
 
-# Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY")
-)
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+# Seconds a request waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# Per-statement limit so one slow query can't hold a connection forever
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", 15))
+# Supabase's pooler (pgbouncer in transaction mode) can't keep prepared statements
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 0))
+
+# Candidates scoring below this are not returned
+SCREEN_MIN_SCORE = float(os.getenv("SCREEN_MIN_SCORE", 0.3))
+
+# scripts/add_screening_function.py: indexed retrieval, scoring, filters and top-K in one call
+SCREEN_QUERY = "SELECT * FROM screen_sanctions($1, $2, $3, $4, $5, $6, $7)"
+
+_pool = None
+_supabase = None
+
+
+async def init_db() -> None:
+    """Open the asyncpg pool, or the supabase client when no DATABASE_URL is set"""
+    global _pool, _supabase
+    if DATABASE_URL:
+        import asyncpg
+
+        _pool = await asyncpg.create_pool(
+            DATABASE_URL,
+            min_size=DB_POOL_MIN,
+            max_size=DB_POOL_MAX,
+            command_timeout=DB_COMMAND_TIMEOUT,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        )
+        logger.info(f"✅ asyncpg pool ready ({DB_POOL_MIN}-{DB_POOL_MAX} connections)")
+    elif os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"):
+        from supabase import create_client
+
+        _supabase = await run_sync(create_client, os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+        logger.warning("⚠️ DATABASE_URL not set - using the supabase client on the sync executor")
+    else:
+        logger.error("❌ Neither DATABASE_URL nor SUPABASE_URL/SUPABASE_KEY is set")
+
+
+async def close_db() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def screen_sanctions(name: str, entity_type: Optional[str] = None, nationality: Optional[str] = None,
+                           list_sources: Optional[List[str]] = None, is_pep: Optional[bool] = None,
+                           limit: int = 10, min_score: float = SCREEN_MIN_SCORE) -> List[Dict[str, Any]]:
+    """Top `limit` sanctions_list rows for name, ranked and filtered by the screen_sanctions() SQL function"""
+    if _pool is not None:
+        async with _pool.acquire(timeout=DB_POOL_TIMEOUT) as conn:
+            rows = await conn.fetch(
+                SCREEN_QUERY, name, entity_type, nationality, list_sources, is_pep, limit, min_score
+            )
+        return [dict(row) for row in rows]
+    if _supabase is not None:
+        params = {
+            'q': name, 'p_entity_type': entity_type, 'p_nationality': nationality,
+            'p_list_sources': list_sources, 'p_is_pep': is_pep, 'p_limit': limit, 'p_min_score': min_score,
+        }
+        result = await run_sync(lambda: _supabase.rpc('screen_sanctions', params).execute())
+        return result.data
+    raise RuntimeError("Database not configured")
+
+
+async def count_sanctions() -> Optional[int]:
+    """Row count of sanctions_list"""
+    if _pool is not None:
+        async with _pool.acquire(timeout=DB_POOL_TIMEOUT) as conn:
+            return await conn.fetchval("SELECT count(*) FROM sanctions_list")
+    if _supabase is not None:
+        result = await run_sync(
+            lambda: _supabase.table('sanctions_list').select("*", count='exact').limit(1).execute()
+        )
+        return result.count
+    raise RuntimeError("Database not configured")
+
+
+def pool_stats() -> Dict[str, Any]:
+    if _pool is None:
+        return {"driver": "supabase" if _supabase is not None else None}
+    return {
+        "driver": "asyncpg",
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "max": _pool.get_max_size(),
+    }
 
-def get_supabase_client():
-    """Returns Supabase client for database operations"""
-    return supabase
 
-def test_connection():
+async def test_connection():
     """Test database connection"""
     try:
-        result = supabase.table('sanctions_list').select("*", count='exact').limit(1).execute()
-        return {"status": "connected", "records": result.count}
+        return {"status": "connected", "records": await count_sanctions(), "pool": pool_stats()}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -0,0 +1,54 @@
+"""
+Bounded thread pool for the synchronous work left in the async service.
+
+Blocking calls (the supabase client fallback, CPU-bound scoring) run here
+instead of on the event loop. SYNC_MAX_PENDING caps how many calls can be
+queued or running at once; beyond that, callers wait on a semaphore in the
+event loop. A burst of requests therefore cannot pile up unbounded work
+behind the threads.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+SYNC_WORKERS = int(os.environ.get("SYNC_WORKERS", 8))
+SYNC_MAX_PENDING = int(os.environ.get("SYNC_MAX_PENDING", 64))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def start_executor() -> None:
+    """Create the pool and its semaphore on the running event loop"""
+    global _executor, _slots
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=SYNC_WORKERS, thread_name_prefix="sync-worker")
+        _slots = asyncio.Semaphore(SYNC_MAX_PENDING)
+
+
+def stop_executor() -> None:
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor, _slots = None, None
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking call on the bounded pool and await its result"""
+    if _executor is None:
+        start_executor()
+    async with _slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def executor_stats() -> dict:
+    return {
+        "workers": SYNC_WORKERS,
+        "max_pending": SYNC_MAX_PENDING,
+        "available_slots": _slots._value if _slots is not None else SYNC_MAX_PENDING,
+    }
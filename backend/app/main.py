@@ -1,16 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
+import asyncio
 import os
 from dotenv import load_dotenv
-from groq import Groq
+from groq import AsyncGroq
 
-from .db import get_supabase_client, test_connection
+from countries import canonical_country, canonical_nationalities
+
+from .db import close_db, init_db, screen_sanctions, count_sanctions, test_connection
+from .executor import executor_stats, start_executor, stop_executor
 
 load_dotenv()
 
-app = FastAPI(title="ComplianceAI Pro API", version="3.0.0")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = "llama-3.3-70b-versatile"
+# Whole-call budget for the risk summary; the screening result is returned without it after this
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", 10))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", 1))
+# screen_sanctions() keeps rows without nationality codes, which are checked here; fetch
+# extra so the ones from other countries don't leave the response short
+NATIONALITY_OVERFETCH = 3
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_executor()
+    await init_db()
+    yield
+    await close_db()
+    if groq_client is not None:
+        await groq_client.close()
+    stop_executor()
+
+
+app = FastAPI(title="ComplianceAI Pro API", version="3.0.0", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -21,13 +47,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# GROQ Client
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# GROQ Client (async: waiting on the LLM doesn't block other screenings)
+groq_client = AsyncGroq(api_key=GROQ_API_KEY, timeout=GROQ_TIMEOUT, max_retries=GROQ_MAX_RETRIES) if GROQ_API_KEY else None
 
 class ScreeningRequest(BaseModel):
     name: str
     country: Optional[str] = None
     date_of_birth: Optional[str] = None
+    # Filters applied by screen_sanctions() before ranking
+    entity_type: Optional[str] = None
+    nationality: Optional[str] = None
+    lists: Optional[List[str]] = None
+    is_pep: Optional[bool] = None
+    limit: int = Field(10, ge=1, le=100)
 
 class Match(BaseModel):
     entity_name: str
@@ -36,6 +68,7 @@ class Match(BaseModel):
     program: Optional[str]
     nationalities: Optional[List[str]]
     date_of_birth: Optional[str]
+    matched_name: Optional[str]
     match_score: float
 
 @app.get("/")
@@ -53,69 +86,95 @@ def root():
     }
 
 @app.get("/api/health")
-def health():
-    db_status = test_connection()
+async def health():
+    db_status = await test_connection()
     return {
         "status": "healthy",
         "database": db_status,
-        "ai": "ready" if os.getenv("GROQ_API_KEY") else "not_configured"
+        "ai": "ready" if groq_client else "not_configured",
+        "executor": executor_stats()
     }
 
+async def ai_risk_analysis(request: ScreeningRequest, matches: List[dict]) -> str:
+    """Short LLM risk assessment, bounded by GROQ_TIMEOUT"""
+    prompt = f"""Analyze this compliance screening result:
+
+Entity Searched: {request.name}
+Country: {request.country or 'Not provided'}
+DOB: {request.date_of_birth or 'Not provided'}
+
+Matches Found: {len(matches)}
+Top Match: {matches[0]['entity_name']} ({matches[0]['list_source']}, score {matches[0]['match_score']})
+
+Provide a brief risk assessment (2-3 sentences) and recommended action."""
+
+    try:
+        completion = await asyncio.wait_for(
+            groq_client.chat.completions.create(
+                model=GROQ_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,
+                max_tokens=200
+            ),
+            timeout=GROQ_TIMEOUT
+        )
+        return completion.choices[0].message.content
+    except asyncio.TimeoutError:
+        return f"AI analysis unavailable: timed out after {GROQ_TIMEOUT:g}s"
+    except Exception as e:
+        return f"AI analysis unavailable: {str(e)}"
+
 @app.post("/api/screen")
 async def screen_entity(request: ScreeningRequest):
+    nationality = None
+    if request.nationality:
+        nationality = canonical_country(request.nationality)
+        if nationality is None:
+            # Filtering on a country we can't map would silently drop every match
+            raise HTTPException(status_code=400, detail=f"Unknown nationality: {request.nationality}")
+
     try:
-        supabase = get_supabase_client()
-        
-        # Search sanctions by name
-        result = supabase.table('sanctions_list')\
-            .select('*')\
-            .ilike('entity_name', f'%{request.name}%')\
-            .limit(10)\
-            .execute()
-        
+        # Retrieval, scoring, filters and ranking in one database call
+        records = await screen_sanctions(
+            request.name,
+            entity_type=request.entity_type,
+            nationality=nationality,
+            list_sources=request.lists or None,
+            is_pep=request.is_pep,
+            limit=min(request.limit * NATIONALITY_OVERFETCH, 100) if nationality else request.limit
+        )
+        if nationality:
+            records = [
+                r for r in records if nationality in canonical_nationalities(r.get("nationalities"))
+            ][:request.limit]
+
         matches = []
-        for record in result.data:
+        for record in records:
             matches.append({
                 "entity_name": record.get("entity_name", ""),
                 "entity_type": record.get("entity_type"),
                 "list_source": record.get("list_source"),
                 "program": record.get("program"),
-                "nationalities": record.get("nationalities", []),
+                "nationalities": record.get("nationalities") or [],
                 "date_of_birth": record.get("date_of_birth"),
-                "match_score": 0.85
+                "matched_name": record.get("matched_name"),
+                "match_score": round(record.get("match_score") or 0.0, 3)
             })
-        
+
         # AI Risk Analysis if matches found
         ai_analysis = None
-        if matches and os.getenv("GROQ_API_KEY"):
-            try:
-                prompt = f"""Analyze this compliance screening result:
-                
-Entity Searched: {request.name}
-Country: {request.country or 'Not provided'}
-DOB: {request.date_of_birth or 'Not provided'}
-
-Matches Found: {len(matches)}
-Top Match: {matches[0]['entity_name']} ({matches[0]['list_source']})
+        if matches and groq_client:
+            ai_analysis = await ai_risk_analysis(request, matches)
 
-Provide a brief risk assessment (2-3 sentences) and recommended action."""
-
-                completion = groq_client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.3,
-                    max_tokens=200
-                )
-                
-                ai_analysis = completion.choices[0].message.content
-            except Exception as e:
-                ai_analysis = f"AI analysis unavailable: {str(e)}"
-        
         return {
             "query": {
                 "name": request.name,
                 "country": request.country,
-                "date_of_birth": request.date_of_birth
+                "date_of_birth": request.date_of_birth,
+                "entity_type": request.entity_type,
+                "nationality": nationality,
+                "lists": request.lists,
+                "is_pep": request.is_pep
             },
             "total_matches": len(matches),
             "matches": matches,
@@ -123,18 +182,17 @@ Provide a brief risk assessment (2-3 sentences) and recommended action."""
             "risk_level": "HIGH" if matches else "LOW",
             "recommended_action": "ESCALATE" if matches else "APPROVE"
         }
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Screening failed: {str(e)}")
 
 @app.get("/api/stats")
 async def get_stats():
     try:
-        supabase = get_supabase_client()
-        result = supabase.table('sanctions_list').select("*", count='exact').limit(1).execute()
-        
+        total = await count_sanctions()
+
         return {
-            "total_sanctions": result.count,
+            "total_sanctions": total,
             "database": "Supabase",
             "status": "operational"
         }
@@ -0,0 +1,230 @@
+"""
+Batch fuzzy scoring for sanctions screening.
+
+Scores one query against every candidate name and alias in a single pass
+using rapidfuzz's process.cdist, reproducing the fuzzywuzzy-based
+calculate_fuzzy_score composite (0.15 ratio, 0.25 partial, 0.25 token sort,
+0.35 token set) exactly.
+"""
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import Indel, Levenshtein
+
+from name_forms import normalize_name, stored_name_forms
+
+MAX_ALIASES = 10
+PREPARED_CACHE_SIZE = 200000
+
+WEIGHT_RATIO = 0.15
+WEIGHT_PARTIAL = 0.25
+WEIGHT_TOKEN_SORT = 0.25
+WEIGHT_TOKEN_SET = 0.35
+
+# fuzzywuzzy's force_ascii only strips the Latin-1 range, not every non-ASCII char
+_LATIN1_TABLE = {i: None for i in range(128, 256)}
+_NON_WORD = re.compile(r"(?ui)\W")
+
+
+def full_process(text: str) -> str:
+    """Same cleanup fuzzywuzzy applies before its token scorers"""
+    text = text.translate(_LATIN1_TABLE)
+    return _NON_WORD.sub(' ', text).lower().strip()
+
+
+def partial_ratio(s1: str, s2: str) -> int:
+    """fuzzywuzzy's block-aligned partial_ratio built on rapidfuzz primitives.
+
+    rapidfuzz.fuzz.partial_ratio searches every window and returns different
+    (higher) scores, so it cannot be used if results have to stay unchanged.
+    """
+    if s1 == s2:
+        return 100
+    if not s1 or not s2:
+        return 0
+    shorter, longer = (s1, s2) if len(s1) <= len(s2) else (s2, s1)
+    width = len(shorter)
+    best = 0.0
+    seen = set()
+    for src_start, dest_start, _ in Levenshtein.opcodes(shorter, longer).as_matching_blocks():
+        long_start = dest_start - src_start if dest_start > src_start else 0
+        if long_start in seen:
+            continue
+        seen.add(long_start)
+        r = Indel.normalized_similarity(shorter, longer[long_start:long_start + width], score_cutoff=best)
+        if r > .995:
+            return 100
+        if r > best:
+            best = r
+    return int(round(100 * best))
+
+
+@lru_cache(maxsize=PREPARED_CACHE_SIZE)
+def prepare_normalized(norm: str) -> Tuple[str, str, str, frozenset, str]:
+    """Query-independent forms of an already normalized string, cached across requests"""
+    proc = full_process(norm)
+    tokens = proc.split()
+    token_set = frozenset(tokens)
+    return norm, proc, ' '.join(sorted(tokens)), token_set, ' '.join(sorted(token_set))
+
+
+def prepare_choice(choice: str) -> Tuple[str, str, str, frozenset, str]:
+    """Query-independent forms of a raw candidate string"""
+    return prepare_normalized(normalize_name(choice))
+
+
+def token_set_strings(query_prep: tuple, choice_prep: tuple) -> Tuple[str, str, str]:
+    """The (intersection, intersection+rest_a, intersection+rest_b) strings fuzzywuzzy compares"""
+    query_tokens, choice_tokens = query_prep[3], choice_prep[3]
+    if query_tokens.isdisjoint(choice_tokens):
+        return '', query_prep[4], choice_prep[4]
+    sect = ' '.join(sorted(query_tokens & choice_tokens))
+    rest_a = ' '.join(sorted(query_tokens - choice_tokens))
+    rest_b = ' '.join(sorted(choice_tokens - query_tokens))
+    return sect, f"{sect} {rest_a}".strip(), f"{sect} {rest_b}".strip()
+
+
+def fuzzy_scores(query: str, choices: Sequence[str], score_cutoff: Optional[float] = None,
+                 normalized: bool = False) -> List[float]:
+    """calculate_fuzzy_score(query, choice) for every choice at once.
+
+    With score_cutoff, choices that provably cannot reach it score 0.0 and
+    skip the expensive partial_ratio pass. normalized=True means choices
+    already went through normalize_name (the stored normalized_* columns).
+    """
+    if not choices:
+        return []
+    if not query:
+        return [0.0] * len(choices)
+
+    query_prep = prepare_choice(query)
+    query_norm, query_proc, query_sorted = query_prep[:3]
+    scores = [0.0] * len(choices)
+
+    # Exact and substring hits short-circuit exactly like calculate_fuzzy_score
+    pending: List[int] = []
+    prepared = []
+    for i, choice in enumerate(choices):
+        # Normalized choices use None for "no string"; '' is a name like "Mr."
+        # that normalized away and still scores like it always did
+        if choice is None or (not choice and not normalized):
+            continue
+        prep = prepare_normalized(choice) if normalized else prepare_choice(choice)
+        choice_norm = prep[0]
+        if choice_norm == query_norm:
+            scores[i] = 1.0
+        elif choice_norm in query_norm or query_norm in choice_norm:
+            scores[i] = 0.95
+        else:
+            pending.append(i)
+            prepared.append(prep)
+    if not pending:
+        return _apply_cutoff(scores, score_cutoff)
+
+    norms = [p[0] for p in prepared]
+    ratio = np.rint(process.cdist([query_norm], norms, scorer=fuzz.ratio, dtype=np.float64, workers=1)[0])
+
+    # fuzzywuzzy: token sort of two strings that clean up to nothing is 100,
+    # token set of anything that cleans up to nothing is 0
+    token_sort = np.rint(process.cdist(
+        [query_sorted], [p[2] for p in prepared], scorer=fuzz.ratio, dtype=np.float64, workers=1
+    )[0])
+    empty = np.fromiter((not p[1] for p in prepared), dtype=bool, count=len(prepared))
+    token_sort[empty] = 100.0 if not query_proc else 0.0
+
+    # rapidfuzz's own token_set_ratio rounds differently at .5 boundaries, so
+    # build fuzzywuzzy's three comparison strings and score them pairwise
+    sects, combined_a, combined_b = zip(*(token_set_strings(query_prep, p) for p in prepared))
+    token_set = np.maximum.reduce([
+        np.rint(process.cpdist(sects, combined_a, scorer=fuzz.ratio, dtype=np.float64, workers=1)),
+        np.rint(process.cpdist(sects, combined_b, scorer=fuzz.ratio, dtype=np.float64, workers=1)),
+        np.rint(process.cpdist(combined_a, combined_b, scorer=fuzz.ratio, dtype=np.float64, workers=1)),
+    ])
+    if not query_proc:
+        token_set[:] = 0.0
+    else:
+        token_set[empty] = 0.0
+
+    partial_free = (
+        ratio / 100.0 * WEIGHT_RATIO +
+        token_sort / 100.0 * WEIGHT_TOKEN_SORT +
+        token_set / 100.0 * WEIGHT_TOKEN_SET
+    )
+
+    needs_partial = np.ones(len(pending), dtype=bool)
+    if score_cutoff is not None:
+        # rapidfuzz's partial_ratio searches a superset of fuzzywuzzy's windows,
+        # so it is an upper bound on the exact block-aligned score
+        partial_bound = np.ceil(process.cdist(
+            [query_norm], norms, scorer=fuzz.partial_ratio, dtype=np.float64, workers=1
+        )[0])
+        # half a unit of slack for the final round(score, 3)
+        needs_partial = partial_free + partial_bound / 100.0 * WEIGHT_PARTIAL >= score_cutoff - 0.0005
+
+    partial = np.zeros(len(pending), dtype=np.float64)
+    for j in np.flatnonzero(needs_partial):
+        partial[j] = partial_ratio(query_norm, norms[j])
+
+    # Same operation order as calculate_fuzzy_score so floats round identically
+    composite = (
+        ratio / 100.0 * WEIGHT_RATIO +
+        partial / 100.0 * WEIGHT_PARTIAL +
+        token_sort / 100.0 * WEIGHT_TOKEN_SORT +
+        token_set / 100.0 * WEIGHT_TOKEN_SET
+    )
+    for i, computed, score in zip(pending, needs_partial.tolist(), composite.tolist()):
+        scores[i] = round(score, 3) if computed else 0.0
+    return _apply_cutoff(scores, score_cutoff)
+
+
+def _apply_cutoff(scores: List[float], score_cutoff: Optional[float]) -> List[float]:
+    if score_cutoff is None:
+        return scores
+    return [s if s >= score_cutoff else 0.0 for s in scores]
+
+
+def score_entities(query: str, entities: Sequence[Dict[str, Any]],
+                   score_cutoff: Optional[float] = None) -> List[Tuple[float, float, Optional[str]]]:
+    """(name_score, best_score, matched_alias) per entity, scored in one batch.
+
+    Entities whose best score falls below score_cutoff come back as zeros.
+    """
+    # Scored on the ingest-time normalized forms; choices holds those, the
+    # spans keep the raw aliases for matched_alias
+    choices: List[Optional[str]] = []
+    spans: List[Tuple[int, List[str]]] = []
+    for entity in entities:
+        name_norm, alias_norms = stored_name_forms(entity)
+        pairs = [(str(a), n) for a, n in zip((entity.get('aliases', []) or [])[:MAX_ALIASES], alias_norms) if a]
+        spans.append((len(choices), [a for a, _ in pairs]))
+        choices.append(name_norm if entity.get('entity_name') else None)
+        choices.extend(n for _, n in pairs)
+
+    scores = fuzzy_scores(query, choices, score_cutoff, normalized=True)
+
+    if score_cutoff is not None:
+        # matched_alias compares against the exact name score, so strings that
+        # were pruned to 0.0 inside a surviving entity get their real score back
+        rescore = [
+            k
+            for start, aliases in spans
+            if max(scores[start:start + 1 + len(aliases)]) > 0.0
+            for k in range(start, start + 1 + len(aliases))
+            if scores[k] == 0.0 and choices[k] is not None
+        ]
+        for k, score in zip(rescore, fuzzy_scores(query, [choices[k] for k in rescore], normalized=True)):
+            scores[k] = score
+
+    results = []
+    for start, aliases in spans:
+        name_score = scores[start]
+        alias_scores = scores[start + 1:start + 1 + len(aliases)]
+        if score_cutoff is not None and max([name_score] + alias_scores) < score_cutoff:
+            results.append((0.0, 0.0, None))
+            continue
+        matched_alias = next((a for a, s in zip(aliases, alias_scores) if s > name_score), None)
+        results.append((name_score, max([name_score] + alias_scores), matched_alias))
+    return results
@@ -0,0 +1,141 @@
+"""
+Helpers for /api/screen/batch: upload parsing and live progress counters.
+"""
+import csv
+import io
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+NAME_COLUMNS = ['name', 'full_name', 'customer_name', 'entity_name']
+REFERENCE_COLUMNS = ['id', 'customer_id', 'reference', 'ref']
+# Finished jobs stay visible on the status endpoint for a while
+JOB_RETENTION_SECONDS = 3600
+
+
+def detect_format(filename: str, content_type: str, first_line: str) -> str:
+    """'jsonl' or 'csv' from the upload name, content type or first line"""
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith(('.jsonl', '.ndjson', '.json')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    if filename.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return 'jsonl' if first_line.lstrip().startswith('{') else 'csv'
+
+
+def _pick(record: Dict[str, Any], columns: List[str]) -> Any:
+    for column in columns:
+        value = record.get(column)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def normalize_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an uploaded record onto the fields /api/screen understands"""
+    record = {str(k).strip().lower(): v for k, v in record.items() if k is not None}
+    return {
+        'name': str(_pick(record, NAME_COLUMNS) or '').strip(),
+        'type': str(record.get('type') or record.get('entity_type') or 'individual').strip().lower(),
+        'nationality': str(record.get('nationality') or '').strip(),
+        'reference': _pick(record, REFERENCE_COLUMNS),
+    }
+
+
+def iter_upload_rows(stream, filename: str = '', content_type: str = '') -> Iterator[Dict[str, Any]]:
+    """Yield normalized rows from a CSV or JSON-lines byte stream without loading it whole"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    first_line = text.readline()
+    fmt = detect_format(filename, content_type, first_line)
+
+    if fmt == 'csv':
+        lines = _chain_first(first_line, text)
+        for row_no, record in enumerate(csv.DictReader(lines), 1):
+            yield {'row': row_no, **normalize_row(record)}
+        return
+
+    for row_no, line in enumerate(_chain_first(first_line, text), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {'row': row_no, 'error': f"Invalid JSON: {e}"}
+            continue
+        if not isinstance(record, dict):
+            yield {'row': row_no, 'error': "Each line must be a JSON object"}
+            continue
+        yield {'row': row_no, **normalize_row(record)}
+
+
+def _chain_first(first_line: str, rest) -> Iterator[str]:
+    if first_line:
+        yield first_line
+    yield from rest
+
+
+class BatchProgress:
+    """Thread-safe counters for one running batch"""
+
+    def __init__(self, batch_id: Optional[str] = None):
+        self.batch_id = batch_id or uuid.uuid4().hex
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.status = 'running'
+        self.processed = 0
+        self.matched = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, processed: int = 0, matched: int = 0, errors: int = 0) -> None:
+        with self._lock:
+            self.processed += processed
+            self.matched += matched
+            self.errors += errors
+
+    def finish(self, status: str = 'completed') -> None:
+        with self._lock:
+            self.status = status
+            self.finished_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            return {
+                'batch_id': self.batch_id,
+                'status': self.status,
+                'processed': self.processed,
+                'matched': self.matched,
+                'errors': self.errors,
+                'elapsed_seconds': round(elapsed, 2),
+                'rows_per_second': round(self.processed / elapsed, 1) if elapsed > 0 else 0.0,
+            }
+
+
+_jobs: Dict[str, BatchProgress] = {}
+_jobs_lock = threading.Lock()
+
+
+def start_batch() -> BatchProgress:
+    progress = BatchProgress()
+    with _jobs_lock:
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for batch_id in [b for b, p in _jobs.items() if p.finished_at and p.finished_at < cutoff]:
+            del _jobs[batch_id]
+        _jobs[progress.batch_id] = progress
+    return progress
+
+
+def get_batch(batch_id: str) -> Optional[BatchProgress]:
+    with _jobs_lock:
+        return _jobs.get(batch_id)
+
+
+def list_batches() -> List[Dict[str, Any]]:
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [job.snapshot() for job in jobs]
@@ -0,0 +1,329 @@
+"""
+COPY-based bulk loader for sanctions_list.
+
+Records are serialized to CSV on the fly and streamed into
+COPY ... FROM STDIN, so a full reload is one round trip per buffer instead
+of one INSERT per row. Full reloads go into a staging table that replaces
+the live table in the same transaction; readers see the old data until the
+commit and the new data right after.
+"""
+import csv
+import io
+import json
+import logging
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from psycopg2 import sql
+
+logger = logging.getLogger(__name__)
+
+SANCTIONS_TABLE = 'sanctions_list'
+SANCTIONS_COLUMNS = [
+    'id', 'entity_name', 'entity_type', 'first_name', 'last_name',
+    'list_source', 'program', 'is_pep', 'pep_level', 'position',
+    'jurisdiction', 'nationalities', 'aliases', 'date_of_birth',
+    'remarks', 'last_updated_date', 'created_at', 'source_key', 'content_hash',
+    'normalized_name', 'normalized_aliases', 'latin_transliteration', 'nationality_codes'
+]
+# Characters handed to COPY per read() from the server side
+COPY_BUFFER_SIZE = 1 << 20
+# Unquoted \N is NULL; an unquoted empty field stays an empty string
+COPY_NULL = '\\N'
+
+Record = Union[Dict[str, Any], Sequence[Any]]
+
+
+def _array_literal(values: Iterable[Any]) -> str:
+    items = []
+    for value in values:
+        if value is None:
+            items.append('NULL')
+            continue
+        text = str(value).replace('\x00', '').replace('\\', '\\\\').replace('"', '\\"')
+        items.append(f'"{text}"')
+    return '{' + ','.join(items) + '}'
+
+
+def copy_value(value: Any) -> str:
+    """Text form of one field as COPY (FORMAT csv, NULL '\\N') expects it"""
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, float) and value != value:
+        return COPY_NULL
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        return _array_literal(value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value).replace('\x00', '')
+
+
+class CopyStream(io.TextIOBase):
+    """File-like CSV view over a row iterator, consumed by cursor.copy_expert.
+
+    Only about one buffer of CSV text exists at a time, so the record source
+    can be a generator over a file far larger than memory.
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]], buffer_size: int = COPY_BUFFER_SIZE):
+        self._rows = iter(rows)
+        self._buffer_size = buffer_size
+        self._out = io.StringIO()
+        self._writer = csv.writer(self._out, lineterminator='\n')
+        self._pending = ''
+        self.rows = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self, size: int) -> None:
+        for row in self._rows:
+            self._writer.writerow([copy_value(v) for v in row])
+            self.rows += 1
+            if self._out.tell() >= size:
+                break
+        self._pending += self._out.getvalue()
+        self._out.seek(0)
+        self._out.truncate()
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            size = self._buffer_size
+        if len(self._pending) < size:
+            self._fill(max(size, self._buffer_size))
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+
+def _as_rows(records: Iterable[Record], columns: Sequence[str]) -> Iterable[Sequence[Any]]:
+    for record in records:
+        if isinstance(record, dict):
+            yield [record.get(c) for c in columns]
+        else:
+            yield record
+
+
+def copy_rows(cursor, table: str, columns: Sequence[str], records: Iterable[Record],
+              buffer_size: int = COPY_BUFFER_SIZE) -> int:
+    """COPY records (dicts or column-ordered sequences) into table; returns the row count"""
+    statement = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL {})").format(
+        sql.Identifier(table),
+        sql.SQL(', ').join(sql.Identifier(c) for c in columns),
+        sql.Literal(COPY_NULL),
+    )
+    stream = CopyStream(_as_rows(records, columns), buffer_size)
+    cursor.copy_expert(statement.as_string(cursor), stream, size=buffer_size)
+    return stream.rows
+
+
+def _fetch(cursor, query: str, params: tuple, *keys: str) -> List[tuple]:
+    """Rows as plain tuples whether or not the connection uses RealDictCursor"""
+    cursor.execute(query, params)
+    return [tuple(r[k] for k in keys) if isinstance(r, dict) else tuple(r) for r in cursor.fetchall()]
+
+
+def _index_signature(indexdef: str) -> str:
+    # "CREATE [UNIQUE] INDEX name ON tbl USING btree (col)" -> "UNIQUE|btree (col)"
+    unique = 'UNIQUE|' if indexdef.upper().startswith('CREATE UNIQUE') else ''
+    return unique + indexdef.split(' USING ', 1)[-1]
+
+
+def _carry_over_indexes(cursor, table: str, staging: str, retired: str) -> None:
+    """Give the staging table's indexes the live table's index names"""
+    query = "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s"
+    fresh: Dict[str, List[str]] = {}
+    for name, indexdef in _fetch(cursor, query, (staging,), 'indexname', 'indexdef'):
+        fresh.setdefault(_index_signature(indexdef), []).append(name)
+
+    for n, (name, indexdef) in enumerate(_fetch(cursor, query, (table,), 'indexname', 'indexdef')):
+        candidates = fresh.get(_index_signature(indexdef))
+        if not candidates:
+            continue
+        cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+            sql.Identifier(name), sql.Identifier(f"{retired}_idx{n}")))
+        cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+            sql.Identifier(candidates.pop(0)), sql.Identifier(name)))
+
+
+def _carry_over_access(cursor, table: str, staging: str) -> None:
+    """Copy grants and row-level security policies, which LIKE does not"""
+    grants = _fetch(
+        cursor,
+        "SELECT grantee, privilege_type FROM information_schema.role_table_grants "
+        "WHERE table_schema = current_schema() AND table_name = %s",
+        (table,), 'grantee', 'privilege_type'
+    )
+    for grantee, privilege in grants:
+        cursor.execute(sql.SQL("GRANT {} ON {} TO {}").format(
+            sql.SQL(privilege), sql.Identifier(staging), _role(grantee)))
+
+    policies = _fetch(
+        cursor,
+        "SELECT policyname, permissive, roles, cmd, qual, with_check FROM pg_policies "
+        "WHERE schemaname = current_schema() AND tablename = %s",
+        (table,), 'policyname', 'permissive', 'roles', 'cmd', 'qual', 'with_check'
+    )
+    for name, permissive, roles, cmd, qual, with_check in policies:
+        statement = sql.SQL("CREATE POLICY {} ON {} AS {} FOR {} TO {}").format(
+            sql.Identifier(name), sql.Identifier(staging), sql.SQL(permissive), sql.SQL(cmd),
+            sql.SQL(', ').join(_role(role) for role in roles),
+        )
+        if qual:
+            statement += sql.SQL(" USING ({})").format(sql.SQL(qual))
+        if with_check:
+            statement += sql.SQL(" WITH CHECK ({})").format(sql.SQL(with_check))
+        cursor.execute(statement)
+
+    rls = _fetch(cursor, "SELECT relrowsecurity FROM pg_class WHERE oid = %s::regclass", (table,), 'relrowsecurity')
+    if rls and rls[0][0]:
+        cursor.execute(sql.SQL("ALTER TABLE {} ENABLE ROW LEVEL SECURITY").format(sql.Identifier(staging)))
+
+
+def _carry_over_triggers(cursor, table: str, staging: str) -> None:
+    """Recreate the live table's triggers on staging; LIKE copies none of them"""
+    triggers = _fetch(
+        cursor,
+        "SELECT t.tgname, pg_get_triggerdef(t.oid) AS triggerdef, "
+        "quote_ident(n.nspname) || '.' || quote_ident(c.relname) AS target, "
+        "quote_ident(n.nspname) || '.' || quote_ident(%s) AS staging "
+        "FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE t.tgrelid = %s::regclass AND NOT t.tgisinternal",
+        (staging, table), 'tgname', 'triggerdef', 'target', 'staging'
+    )
+    for name, triggerdef, target, staging_name in triggers:
+        statement = triggerdef.replace(f" ON {target} ", f" ON {staging_name} ", 1)
+        if statement == triggerdef:
+            raise RuntimeError(f"Cannot retarget trigger {name} on {table}: {triggerdef}")
+        cursor.execute(statement)
+
+
+def _check_dependents(cursor, table: str) -> None:
+    """Fail before loading if views or foreign keys elsewhere depend on table.
+
+    The swap drops the old table without CASCADE, so they would otherwise
+    abort the load at the very end, after every row has been staged.
+    """
+    dependents = _fetch(
+        cursor,
+        "SELECT DISTINCT coalesce(v.oid, c.conrelid)::regclass::text AS dependent "
+        "FROM pg_depend d "
+        "LEFT JOIN pg_rewrite r ON d.classid = 'pg_rewrite'::regclass AND r.oid = d.objid "
+        "LEFT JOIN pg_class v ON v.oid = r.ev_class "
+        "LEFT JOIN pg_constraint c ON d.classid = 'pg_constraint'::regclass AND c.oid = d.objid "
+        "WHERE d.refclassid = 'pg_class'::regclass AND d.refobjid = %s::regclass "
+        "AND d.deptype = 'n' AND coalesce(v.oid, c.conrelid) <> %s::regclass",
+        (table, table), 'dependent'
+    )
+    if dependents:
+        names = ', '.join(sorted(row[0] for row in dependents))
+        raise RuntimeError(
+            f"Cannot replace {table}: {names} depend(s) on it. "
+            f"Drop them before the load and recreate them afterwards, or append instead of replacing."
+        )
+
+
+def _carry_over_sequences(cursor, retired: str, table: str) -> None:
+    """serial columns share the retired table's sequence; move ownership before it is dropped"""
+    owned = _fetch(
+        cursor,
+        "SELECT attname, pg_get_serial_sequence(%s, attname) AS seq FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped",
+        (retired, retired), 'attname', 'seq'
+    )
+    for column, sequence in owned:
+        if sequence:
+            cursor.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.{}").format(
+                sql.SQL(sequence), sql.Identifier(table), sql.Identifier(column)))
+
+
+def _role(name: str) -> sql.Composable:
+    return sql.SQL('PUBLIC') if name.lower() == 'public' else sql.Identifier(name)
+
+
+def _stage(cursor, table: str, columns: Sequence[str], records: Iterable[Record], buffer_size: int) -> int:
+    """Fill a fresh {table}_staging copy of table, ready for _swap"""
+    staging = f"{table}_staging"
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging)))
+    cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING ALL)").format(
+        sql.Identifier(staging), sql.Identifier(table)))
+    loaded = copy_rows(cursor, staging, columns, records, buffer_size)
+    cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(staging)))
+    _carry_over_access(cursor, table, staging)
+    # After the COPY, so row triggers don't fire for every staged row
+    _carry_over_triggers(cursor, table, staging)
+    return loaded
+
+
+def _swap(cursor, table: str) -> None:
+    """Put {table}_staging in place of table under the caller's lock"""
+    staging, retired = f"{table}_staging", f"{table}_retired"
+    _carry_over_indexes(cursor, table, staging, retired)
+    cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(table), sql.Identifier(retired)))
+    cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(staging), sql.Identifier(table)))
+    _carry_over_sequences(cursor, retired, table)
+    cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(retired)))
+
+
+def bulk_replace(conn, loads: Sequence[Tuple[str, Sequence[str], Iterable[Record]]],
+                 buffer_size: int = COPY_BUFFER_SIZE) -> Dict[str, int]:
+    """Replace several tables from (table, columns, records) loads in one commit; returns row counts.
+
+    Every table is staged before any is locked, so readers are only blocked
+    for the renames and never see one table new and another old. Tables
+    that views or other tables' foreign keys depend on are refused up front.
+    """
+    start = time.time()
+    cursor = conn.cursor()
+    try:
+        for table, _, _ in loads:
+            _check_dependents(cursor, table)
+        loaded: Dict[str, int] = {}
+        for table, columns, records in loads:
+            loaded[table] = _stage(cursor, table, columns, records, buffer_size)
+            logger.info(f"📦 Staged {loaded[table]:,} rows for {table} in {time.time() - start:.1f}s")
+
+        tables = [table for table, _, _ in loads]
+        cursor.execute(sql.SQL("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE").format(
+            sql.SQL(', ').join(sql.Identifier(t) for t in tables)))
+        for table in tables:
+            _swap(cursor, table)
+        conn.commit()
+        logger.info(f"✅ Swapped in {', '.join(tables)} in {time.time() - start:.1f}s")
+        return loaded
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def bulk_load(conn, records: Iterable[Record], table: str = SANCTIONS_TABLE,
+              columns: Sequence[str] = SANCTIONS_COLUMNS, replace: bool = True,
+              buffer_size: int = COPY_BUFFER_SIZE) -> int:
+    """Stream records into table with COPY and commit; returns the row count.
+
+    replace=True loads into a staging copy of the table and swaps it in, so
+    the table is either fully old or fully new. replace=False appends.
+    Nothing is committed if any step fails.
+    """
+    if replace:
+        return bulk_replace(conn, [(table, columns, records)], buffer_size)[table]
+
+    start = time.time()
+    cursor = conn.cursor()
+    try:
+        loaded = copy_rows(cursor, table, columns, records, buffer_size)
+        conn.commit()
+        logger.info(f"✅ Appended {loaded:,} rows to {table} in {time.time() - start:.1f}s")
+        return loaded
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
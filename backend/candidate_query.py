@@ -0,0 +1,57 @@
+"""
+Set-based ILIKE candidate retrieval for sanctions_list.
+
+All search terms go to Postgres as one array, so a request costs a single
+round trip however many name variations it tries. Each entity comes back
+once, with the terms that hit it in matched_terms. Only the scoring
+columns are selected; the final matches are hydrated afterwards.
+"""
+import logging
+from typing import Dict, List, Sequence
+
+from entity_store import scoring_projection
+from search_filters import filter_sql
+
+logger = logging.getLogger(__name__)
+
+TERMS_QUERY = """
+SELECT {columns},
+       ARRAY(SELECT t.term FROM unnest(%(terms)s::text[]) AS t(term)
+             WHERE s.entity_name ILIKE '%%' || t.term || '%%' OR t.term = ANY(s.aliases)) AS matched_terms
+FROM (
+    SELECT DISTINCT hit.id
+    FROM unnest(%(terms)s::text[]) AS t(term)
+    CROSS JOIN LATERAL (
+        SELECT s.id FROM sanctions_list s
+        WHERE s.entity_type = %(entity_type)s
+          AND (s.entity_name ILIKE '%%' || t.term || '%%' OR t.term = ANY(s.aliases)){filters}
+        LIMIT %(limit)s
+    ) hit
+) hits
+JOIN sanctions_list s ON s.id = hits.id
+"""
+
+
+def term_candidates(terms: Sequence[str], entity_type: str, conn, per_term_limit: int = 500,
+                    filters=None) -> List[Dict]:
+    """Rows whose name contains, or whose aliases equal, any of terms, fetched in one query.
+
+    Each term is capped at per_term_limit rows on its own, like the old
+    one-query-per-term loop, so a common term can't crowd out the rest.
+    """
+    terms = list(dict.fromkeys(t for t in terms if t))
+    if not terms:
+        return []
+
+    clause, filter_params = filter_sql(filters)
+    with conn.cursor() as cursor:
+        cursor.execute(TERMS_QUERY.format(columns=scoring_projection(conn), filters=clause), {
+            'terms': terms,
+            'entity_type': entity_type,
+            'limit': per_term_limit,
+            **filter_params,
+        })
+        results = cursor.fetchall()
+
+    logger.info(f"  {len(terms)} terms: found {len(results)} matches")
+    return results
@@ -0,0 +1,277 @@
+"""
+Country names, demonyms and ISO 3166-1 alpha-2 codes.
+
+Sources spell nationality differently: OpenSanctions uses "ru", the UN
+list "Russian Federation", demo and legacy rows "RUSSIAN". canonical_country
+folds all of them to the lowercase alpha-2 code so filters can compare codes.
+The importers store the codes in sanctions_list.nationality_codes, which
+screening filters on through a GIN index instead of substring matching.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+# code: name, then other spellings (UN style "iran islamic republic of" is
+# matched after punctuation is stripped) and demonyms
+COUNTRIES = {
+    'af': ['afghanistan', 'afghan'],
+    'al': ['albania', 'albanian'],
+    'dz': ['algeria', 'algerian'],
+    'ad': ['andorra', 'andorran'],
+    'ao': ['angola', 'angolan'],
+    'ag': ['antigua and barbuda', 'antiguan'],
+    'ar': ['argentina', 'argentine', 'argentinian'],
+    'am': ['armenia', 'armenian'],
+    'au': ['australia', 'australian'],
+    'at': ['austria', 'austrian'],
+    'az': ['azerbaijan', 'azerbaijani', 'azeri'],
+    'bs': ['bahamas', 'bahamian'],
+    'bh': ['bahrain', 'bahraini'],
+    'bd': ['bangladesh', 'bangladeshi'],
+    'bb': ['barbados', 'barbadian'],
+    'by': ['belarus', 'belarusian', 'belorussian'],
+    'be': ['belgium', 'belgian'],
+    'bz': ['belize', 'belizean'],
+    'bj': ['benin', 'beninese'],
+    'bt': ['bhutan', 'bhutanese'],
+    'bo': ['bolivia', 'bolivian', 'plurinational state of bolivia', 'bolivia plurinational state of'],
+    'ba': ['bosnia and herzegovina', 'bosnian', 'bosnia'],
+    'bw': ['botswana', 'motswana', 'batswana'],
+    'br': ['brazil', 'brazilian'],
+    'bn': ['brunei', 'bruneian', 'brunei darussalam'],
+    'bg': ['bulgaria', 'bulgarian'],
+    'bf': ['burkina faso', 'burkinabe'],
+    'bi': ['burundi', 'burundian'],
+    'cv': ['cabo verde', 'cape verde', 'cape verdean'],
+    'kh': ['cambodia', 'cambodian'],
+    'cm': ['cameroon', 'cameroonian'],
+    'ca': ['canada', 'canadian'],
+    'cf': ['central african republic', 'central african'],
+    'td': ['chad', 'chadian'],
+    'cl': ['chile', 'chilean'],
+    'cn': ['china', 'chinese', "people's republic of china"],
+    'co': ['colombia', 'colombian'],
+    'km': ['comoros', 'comoran', 'comorian'],
+    'cg': ['congo', 'republic of the congo', 'congolese'],
+    'cd': ['democratic republic of the congo', 'dr congo', 'drc', 'congo kinshasa',
+           'congo democratic republic of the'],
+    'cr': ['costa rica', 'costa rican'],
+    'ci': ["cote d'ivoire", 'ivory coast', 'ivorian'],
+    'hr': ['croatia', 'croatian'],
+    'cu': ['cuba', 'cuban'],
+    'cy': ['cyprus', 'cypriot'],
+    'cz': ['czechia', 'czech republic', 'czech'],
+    'dk': ['denmark', 'danish'],
+    'dj': ['djibouti', 'djiboutian'],
+    'dm': ['dominica', 'dominican'],
+    'do': ['dominican republic'],
+    'ec': ['ecuador', 'ecuadorian'],
+    'eg': ['egypt', 'egyptian'],
+    'sv': ['el salvador', 'salvadoran'],
+    'gq': ['equatorial guinea', 'equatoguinean'],
+    'er': ['eritrea', 'eritrean'],
+    'ee': ['estonia', 'estonian'],
+    'sz': ['eswatini', 'swaziland', 'swazi'],
+    'et': ['ethiopia', 'ethiopian'],
+    'fj': ['fiji', 'fijian'],
+    'fi': ['finland', 'finnish'],
+    'fr': ['france', 'french'],
+    'ga': ['gabon', 'gabonese'],
+    'gm': ['gambia', 'gambian'],
+    'ge': ['georgia', 'georgian'],
+    'de': ['germany', 'german'],
+    'gh': ['ghana', 'ghanaian'],
+    'gr': ['greece', 'greek'],
+    'gd': ['grenada', 'grenadian'],
+    'gt': ['guatemala', 'guatemalan'],
+    'gn': ['guinea', 'guinean'],
+    'gw': ['guinea-bissau', 'bissau-guinean'],
+    'gy': ['guyana', 'guyanese'],
+    'ht': ['haiti', 'haitian'],
+    'hn': ['honduras', 'honduran'],
+    'hk': ['hong kong'],
+    'hu': ['hungary', 'hungarian'],
+    'is': ['iceland', 'icelandic'],
+    'in': ['india', 'indian'],
+    'id': ['indonesia', 'indonesian'],
+    'ir': ['iran', 'iranian', 'islamic republic of iran', 'iran islamic republic of'],
+    'iq': ['iraq', 'iraqi'],
+    'ie': ['ireland', 'irish'],
+    'il': ['israel', 'israeli'],
+    'it': ['italy', 'italian'],
+    'jm': ['jamaica', 'jamaican'],
+    'jp': ['japan', 'japanese'],
+    'jo': ['jordan', 'jordanian'],
+    'kz': ['kazakhstan', 'kazakh', 'kazakhstani'],
+    'ke': ['kenya', 'kenyan'],
+    'ki': ['kiribati'],
+    'kp': ['north korea', "democratic people's republic of korea", 'dprk', 'north korean',
+           "korea democratic people's republic of"],
+    'kr': ['south korea', 'republic of korea', 'korea', 'south korean', 'korean', 'korea republic of'],
+    'xk': ['kosovo', 'kosovar'],
+    'kw': ['kuwait', 'kuwaiti'],
+    'kg': ['kyrgyzstan', 'kyrgyz'],
+    'la': ['laos', "lao people's democratic republic", 'lao', 'laotian'],
+    'lv': ['latvia', 'latvian'],
+    'lb': ['lebanon', 'lebanese'],
+    'ls': ['lesotho', 'basotho'],
+    'lr': ['liberia', 'liberian'],
+    'ly': ['libya', 'libyan'],
+    'li': ['liechtenstein'],
+    'lt': ['lithuania', 'lithuanian'],
+    'lu': ['luxembourg', 'luxembourgish'],
+    'mo': ['macao', 'macau'],
+    'mg': ['madagascar', 'malagasy'],
+    'mw': ['malawi', 'malawian'],
+    'my': ['malaysia', 'malaysian'],
+    'mv': ['maldives', 'maldivian'],
+    'ml': ['mali', 'malian'],
+    'mt': ['malta', 'maltese'],
+    'mh': ['marshall islands', 'marshallese'],
+    'mr': ['mauritania', 'mauritanian'],
+    'mu': ['mauritius', 'mauritian'],
+    'mx': ['mexico', 'mexican'],
+    'fm': ['micronesia', 'micronesian', 'micronesia federated states of'],
+    'md': ['moldova', 'moldovan', 'republic of moldova', 'moldova republic of'],
+    'mc': ['monaco', 'monegasque'],
+    'mn': ['mongolia', 'mongolian'],
+    'me': ['montenegro', 'montenegrin'],
+    'ma': ['morocco', 'moroccan'],
+    'mz': ['mozambique', 'mozambican'],
+    'mm': ['myanmar', 'burma', 'burmese'],
+    'na': ['namibia', 'namibian'],
+    'nr': ['nauru', 'nauruan'],
+    'np': ['nepal', 'nepalese', 'nepali'],
+    'nl': ['netherlands', 'dutch', 'holland'],
+    'nz': ['new zealand', 'new zealander'],
+    'ni': ['nicaragua', 'nicaraguan'],
+    'ne': ['niger', 'nigerien'],
+    'ng': ['nigeria', 'nigerian'],
+    'mk': ['north macedonia', 'macedonia', 'macedonian'],
+    'no': ['norway', 'norwegian'],
+    'om': ['oman', 'omani'],
+    'pk': ['pakistan', 'pakistani'],
+    'pw': ['palau', 'palauan'],
+    'ps': ['palestine', 'palestinian', 'state of palestine'],
+    'pa': ['panama', 'panamanian'],
+    'pg': ['papua new guinea', 'papua new guinean'],
+    'py': ['paraguay', 'paraguayan'],
+    'pe': ['peru', 'peruvian'],
+    'ph': ['philippines', 'filipino', 'philippine'],
+    'pl': ['poland', 'polish'],
+    'pt': ['portugal', 'portuguese'],
+    'qa': ['qatar', 'qatari'],
+    'ro': ['romania', 'romanian'],
+    'ru': ['russia', 'russian', 'russian federation'],
+    'rw': ['rwanda', 'rwandan'],
+    'kn': ['saint kitts and nevis', 'kittitian'],
+    'lc': ['saint lucia', 'saint lucian'],
+    'vc': ['saint vincent and the grenadines', 'vincentian'],
+    'ws': ['samoa', 'samoan'],
+    'sm': ['san marino', 'sammarinese'],
+    'st': ['sao tome and principe', 'santomean'],
+    'sa': ['saudi arabia', 'saudi', 'saudi arabian'],
+    'sn': ['senegal', 'senegalese'],
+    'rs': ['serbia', 'serbian'],
+    'sc': ['seychelles', 'seychellois'],
+    'sl': ['sierra leone', 'sierra leonean'],
+    'sg': ['singapore', 'singaporean'],
+    'sk': ['slovakia', 'slovak'],
+    'si': ['slovenia', 'slovenian', 'slovene'],
+    'sb': ['solomon islands', 'solomon islander'],
+    'so': ['somalia', 'somali'],
+    'za': ['south africa', 'south african'],
+    'ss': ['south sudan', 'south sudanese'],
+    'es': ['spain', 'spanish'],
+    'lk': ['sri lanka', 'sri lankan'],
+    'sd': ['sudan', 'sudanese'],
+    'sr': ['suriname', 'surinamese'],
+    'se': ['sweden', 'swedish'],
+    'ch': ['switzerland', 'swiss'],
+    'sy': ['syria', 'syrian', 'syrian arab republic'],
+    'tw': ['taiwan', 'taiwanese'],
+    'tj': ['tajikistan', 'tajik'],
+    'tz': ['tanzania', 'tanzanian', 'united republic of tanzania', 'tanzania united republic of'],
+    'th': ['thailand', 'thai'],
+    'tl': ['timor-leste', 'east timor', 'timorese'],
+    'tg': ['togo', 'togolese'],
+    'to': ['tonga', 'tongan'],
+    'tt': ['trinidad and tobago', 'trinidadian'],
+    'tn': ['tunisia', 'tunisian'],
+    'tr': ['turkey', 'turkiye', 'turkish'],
+    'tm': ['turkmenistan', 'turkmen'],
+    'tv': ['tuvalu', 'tuvaluan'],
+    'ug': ['uganda', 'ugandan'],
+    'ua': ['ukraine', 'ukrainian'],
+    'ae': ['united arab emirates', 'uae', 'emirati'],
+    'gb': ['united kingdom', 'uk', 'british', 'great britain', 'england',
+           'united kingdom of great britain and northern ireland'],
+    'us': ['united states', 'usa', 'american', 'united states of america', 'us'],
+    'uy': ['uruguay', 'uruguayan'],
+    'uz': ['uzbekistan', 'uzbek'],
+    'vu': ['vanuatu', 'ni-vanuatu'],
+    'va': ['holy see', 'vatican'],
+    've': ['venezuela', 'venezuelan', 'bolivarian republic of venezuela', 'venezuela bolivarian republic of'],
+    'vn': ['viet nam', 'vietnam', 'vietnamese'],
+    'ye': ['yemen', 'yemeni'],
+    'zm': ['zambia', 'zambian'],
+    'zw': ['zimbabwe', 'zimbabwean'],
+}
+
+SCHEMA_SQL = [
+    "ALTER TABLE sanctions_list ADD COLUMN IF NOT EXISTS nationality_codes TEXT[]",
+    "CREATE INDEX IF NOT EXISTS idx_sanctions_nationality_codes ON sanctions_list USING GIN (nationality_codes)",
+    "CREATE INDEX IF NOT EXISTS idx_sanctions_type_source_pep ON sanctions_list (entity_type, list_source, is_pep)",
+]
+
+_NON_WORD = re.compile(r"[^\w'\- ]+")
+
+_LOOKUP = {code: code for code in COUNTRIES}
+for _code, _names in COUNTRIES.items():
+    for _name in _names:
+        _LOOKUP[_name] = _code
+
+
+@lru_cache(maxsize=4096)
+def canonical_country(value: Any) -> Optional[str]:
+    """Lowercase alpha-2 code for a country name, demonym or code; None if unknown"""
+    if not value:
+        return None
+    # "Côte d'Ivoire" and "Cote d'Ivoire" are the same key
+    text = unicodedata.normalize('NFKD', str(value).lower()).encode('ascii', 'ignore').decode()
+    text = ' '.join(_NON_WORD.sub(' ', text).split())
+    if not text:
+        return None
+    code = _LOOKUP.get(text)
+    if code is None and text.startswith('the '):
+        code = _LOOKUP.get(text[4:])
+    return code
+
+
+def canonical_nationalities(values: Any) -> List[str]:
+    """Distinct alpha-2 codes for a nationalities array (or single value), unknown spellings dropped"""
+    if not values:
+        return []
+    if isinstance(values, str):
+        values = [values]
+    codes = []
+    for value in values if isinstance(values, Iterable) else [values]:
+        code = canonical_country(value)
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def with_nationality_codes(record: Dict[str, Any]) -> Dict[str, Any]:
+    """record with nationality_codes filled in from its nationalities"""
+    record['nationality_codes'] = canonical_nationalities(record.get('nationalities'))
+    return record
+
+
+def ensure_nationality_codes_column(conn) -> None:
+    """Add nationality_codes and the filter indexes if this database predates them"""
+    with conn.cursor() as cursor:
+        for statement in SCHEMA_SQL:
+            cursor.execute(statement)
+    conn.commit()
@@ -0,0 +1,183 @@
+"""
+Shared Postgres connection pool for the Flask backends.
+
+Connections are opened once and reused across requests instead of paying a
+fresh TLS handshake to Supabase on every call.
+"""
+import os
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+# Seconds a request waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+# Connections idle longer than this get a SELECT 1 probe on checkout
+DB_POOL_VALIDATE_AFTER = float(os.environ.get("DB_POOL_VALIDATE_AFTER", 30))
+
+
+def get_database_url() -> Optional[str]:
+    """DATABASE_URL with the postgres:// scheme fixed for psycopg2"""
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        return None
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    return database_url
+
+
+class ConnectionPool:
+    """Thread-safe pool that blocks (up to a timeout) when every connection is in use"""
+
+    def __init__(self, dsn: str, minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX,
+                 timeout: float = DB_POOL_TIMEOUT, validate_after: float = DB_POOL_VALIDATE_AFTER):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, dsn, cursor_factory=RealDictCursor)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self._in_use: Dict[int, Any] = {}
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.peak_in_use = 0
+
+    def _is_usable(self, conn) -> bool:
+        """Cheap liveness check; only probes the server for long-idle connections"""
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a validated connection, waiting for a free slot if needed"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.waits += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise pool.PoolError(f"no connection available within {self.timeout}s")
+
+        try:
+            conn = self._pool.getconn()
+            if not self._is_usable(conn):
+                with self._lock:
+                    self.discarded += 1
+                    self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.checkouts += 1
+            self._in_use[id(conn)] = conn
+            self.peak_in_use = max(self.peak_in_use, len(self._in_use))
+        return conn
+
+    def putconn(self, conn) -> None:
+        """Return a connection; unfinished transactions are rolled back by psycopg2"""
+        with self._lock:
+            if self._in_use.pop(id(conn), None) is None:
+                return
+            self._last_used[id(conn)] = time.monotonic()
+        try:
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool saturation metrics for /api/health"""
+        with self._lock:
+            in_use = len(self._in_use)
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": in_use,
+                "idle": len(self._pool._pool),
+                "saturation": round(in_use / self.maxconn, 3) if self.maxconn else 0.0,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+            }
+
+    def closeall(self) -> None:
+        self._pool.closeall()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[ConnectionPool]:
+    """Process-wide pool, created on first use"""
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        database_url = get_database_url()
+        if not database_url:
+            logger.error("❌ DATABASE_URL environment variable is not set!")
+            return None
+        try:
+            _pool = ConnectionPool(database_url)
+            logger.info(f"✅ Database pool ready (min={DB_POOL_MIN}, max={DB_POOL_MAX})")
+        except psycopg2.OperationalError as e:
+            logger.error(f"❌ Database operational error: {e}")
+            logger.error("💡 Check if your DATABASE_URL is correct and database is accessible")
+        except Exception as e:
+            logger.error(f"❌ Unexpected database error: {e}")
+        return _pool
+
+
+def get_db_connection():
+    """Check out a pooled connection, or None if the database is unavailable"""
+    db_pool = get_pool()
+    if db_pool is None:
+        return None
+    try:
+        return db_pool.getconn()
+    except Exception as e:
+        logger.error(f"❌ Could not check out database connection: {e}")
+        return None
+
+
+def release_db_connection(conn) -> None:
+    """Hand a connection back to the pool"""
+    if conn is None:
+        return
+    if _pool is None:
+        conn.close()
+        return
+    _pool.putconn(conn)
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    return _pool.stats() if _pool is not None else None
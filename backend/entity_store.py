@@ -0,0 +1,343 @@
+"""
+Compact in-memory store of the sanctions_list fields screening reads.
+
+The same fields are the phase-one projection every retrieval query selects
+(scoring_projection); phase two (hydrate_entities) fetches full rows for
+the final matches only.
+
+Candidates used to arrive as RealDictCursor rows of SELECT *. Each row was
+a dict holding every column, raw_data included, and a second dict was
+then built per match. The store keeps one column per field instead:
+- ids in an int64 array (strings only for UUID keys);
+- entity_type / list_source / program / nationalities as integer codes
+  into interned category lists;
+- names and aliases as plain strings and tuples.
+
+StoredEntity is a two-slot view of one row that answers .get() the way
+the dict did, so scoring and filters are unchanged. Only the final top-K
+are hydrated into full rows (hydrate_entities) for the response. The
+store snapshots like the indexes (index_snapshot.py), so workers can map
+one shared copy.
+"""
+import logging
+import sys
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from index_snapshot import Categorical, stable_hash
+from name_index import SharedIndex, coerce_aliases
+
+logger = logging.getLogger(__name__)
+
+LOAD_BATCH_SIZE = 20000
+# Seconds before re-checking which optional columns sanctions_list has
+COLUMNS_RECHECK_AFTER = 600
+
+# Everything scoring, filtering and risk scoring read; the rest is fetched for the top-K only
+STORE_COLUMNS = [
+    'id', 'entity_name', 'entity_type', 'list_source', 'program', 'is_pep',
+    'nationalities', 'nationality_codes', 'aliases', 'date_of_birth',
+    'normalized_name', 'normalized_aliases', 'latin_transliteration',
+]
+# Few distinct values across the corpus: stored as codes into a shared list
+CATEGORICAL_COLUMNS = ['entity_type', 'list_source', 'program', 'nationalities', 'nationality_codes']
+LIST_COLUMNS = ['aliases', 'normalized_aliases']
+TEXT_COLUMNS = ['entity_name', 'date_of_birth', 'normalized_name', 'latin_transliteration']
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    # Dates keep the ISO form whether they came from a DATE or a TEXT column
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _string_tuple(value: Any) -> tuple:
+    if isinstance(value, (list, tuple)):
+        return tuple(None if v is None else str(v) for v in value)
+    return tuple(coerce_aliases(value))
+
+
+_present_columns: Optional[List[str]] = None
+_present_checked_at = 0.0
+
+
+def present_store_columns(conn) -> List[str]:
+    """STORE_COLUMNS this database has; imports that predate a migration lack the normalized/code columns"""
+    global _present_columns, _present_checked_at
+    if _present_columns is None or time.time() - _present_checked_at > COLUMNS_RECHECK_AFTER:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT * FROM sanctions_list LIMIT 0")
+            present = {column[0] for column in cursor.description}
+        _present_columns = [column for column in STORE_COLUMNS if column in present]
+        _present_checked_at = time.time()
+    return _present_columns
+
+
+def scoring_projection(conn, alias: Optional[str] = 's') -> str:
+    """SELECT list for phase-one retrieval: the scoring columns only, not remarks or raw_data"""
+    prefix = f"{alias}." if alias else ''
+    return ', '.join(prefix + column for column in present_store_columns(conn))
+
+
+class _CategoryColumn(Categorical):
+    """Categorical that grows while the store loads"""
+
+    def __init__(self):
+        super().__init__(array('I'), [])
+        self.lookup: Dict[Any, int] = {}
+
+    def append(self, value: Any) -> None:
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.categories)
+            self.categories.append(value)
+        self.codes.append(code)
+
+
+class _BoolColumn(Sequence):
+    def __init__(self, flags):
+        self.flags = flags
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def __getitem__(self, i):
+        return bool(self.flags[i])
+
+
+class StoredEntity:
+    """Read-only, dict-like view of one store row"""
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store: 'EntityStore', row: int):
+        self.store = store
+        self.row = row
+
+    def get(self, key: str, default: Any = None) -> Any:
+        column = self.store.columns.get(key)
+        return default if column is None else column[self.row]
+
+    def __getitem__(self, key: str) -> Any:
+        column = self.store.columns.get(key)
+        if column is None:
+            raise KeyError(key)
+        return column[self.row]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.store.columns
+
+    def keys(self) -> List[str]:
+        return list(self.store.columns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: column[self.row] for key, column in self.store.columns.items()}
+
+
+class EntityStore:
+    """Column-per-field copy of the screening fields of every sanctions_list row"""
+
+    def __init__(self):
+        self.int_ids = True
+        self.ids: Any = []
+        self.columns: Dict[str, Sequence] = {}
+        # Sorted id keys (the ids, or stable hashes of UUID strings) and their rows
+        self.id_keys = np.empty(0, dtype=np.int64)
+        self.id_order = np.empty(0, dtype=np.int64)
+        self.loaded_at: Optional[float] = None
+        self.data_version: Optional[int] = None
+        self._building: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _start(self) -> Dict[str, Any]:
+        if self._building is None:
+            self._building = {column: [] for column in TEXT_COLUMNS + LIST_COLUMNS}
+            self._building.update({column: _CategoryColumn() for column in CATEGORICAL_COLUMNS})
+            self._building['is_pep'] = bytearray()
+        return self._building
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Append one sanctions_list row; call finalize() when done"""
+        building = self._start()
+        entity_id = row.get('id')
+        if self.int_ids and not isinstance(entity_id, int):
+            self.int_ids = False
+        self.ids.append(entity_id)
+
+        for column in TEXT_COLUMNS:
+            value = _text(row.get(column))
+            # Repeated values (dates of birth, common names) share one object
+            building[column].append(None if value is None else sys.intern(value))
+        for column in LIST_COLUMNS:
+            value = row.get(column)
+            building[column].append(None if value is None and column == 'normalized_aliases' else _string_tuple(value))
+        building['entity_type'].append(row.get('entity_type'))
+        building['list_source'].append(row.get('list_source'))
+        building['program'].append(row.get('program'))
+        building['nationalities'].append(_string_tuple(row.get('nationalities')))
+        codes = row.get('nationality_codes')
+        building['nationality_codes'].append(None if codes is None else _string_tuple(codes))
+        building['is_pep'].append(1 if row.get('is_pep') else 0)
+
+    def finalize(self) -> 'EntityStore':
+        """Freeze the columns and build the id lookup"""
+        building = self._start()
+        self._building = None
+        if self.int_ids:
+            self.ids = array('q', self.ids)
+        for column in CATEGORICAL_COLUMNS:
+            building[column].lookup = None
+        is_pep = building.pop('is_pep', bytearray())
+        self.columns = {'id': self.ids, **building, 'is_pep': _BoolColumn(is_pep)}
+        self._index_ids()
+        self.loaded_at = time.time()
+        return self
+
+    def _index_ids(self) -> None:
+        if self.int_ids:
+            keys = np.frombuffer(self.ids, dtype=np.int64) if len(self.ids) else np.empty(0, np.int64)
+        else:
+            keys = np.fromiter((stable_hash(str(i)) for i in self.ids), dtype=np.int64, count=len(self.ids))
+        self.id_order = np.argsort(keys, kind='stable')
+        self.id_keys = keys[self.id_order]
+
+    def load_from_db(self, conn, batch_size: int = LOAD_BATCH_SIZE) -> 'EntityStore':
+        """Stream the screening columns this database has from sanctions_list"""
+        start = time.time()
+        columns = scoring_projection(conn, alias=None)
+        conn.commit()
+
+        with conn.cursor(name='entity_store_load') as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(f"SELECT {columns} FROM sanctions_list")
+            for row in cursor:
+                self.add(row)
+        conn.commit()
+        self.finalize()
+        logger.info(f"🗃️ Entity store loaded: {len(self):,} entities in {self.loaded_at - start:.1f}s")
+        return self
+
+    def row_of(self, entity_id: Any) -> Optional[int]:
+        if self.int_ids:
+            try:
+                key = int(entity_id)
+            except (TypeError, ValueError):
+                return None
+        else:
+            entity_id = str(entity_id)
+            key = stable_hash(entity_id)
+        i = int(np.searchsorted(self.id_keys, key))
+        while i < len(self.id_keys) and self.id_keys[i] == key:
+            row = int(self.id_order[i])
+            if self.int_ids or self.ids[row] == entity_id:
+                return row
+            i += 1
+        return None
+
+    def entities(self, ids: Iterable[Any]) -> List[StoredEntity]:
+        """Views of the given ids, in order; ids the store doesn't have are skipped"""
+        rows = (self.row_of(entity_id) for entity_id in ids)
+        return [StoredEntity(self, row) for row in rows if row is not None]
+
+    def save_snapshot(self, writer) -> None:
+        """Write the store as flat arrays (index_snapshot.PartWriter)"""
+        writer.values('id', list(self.ids))
+        writer.array('id_keys', self.id_keys)
+        writer.array('id_order', self.id_order)
+        for column in TEXT_COLUMNS:
+            writer.strings(column, self.columns[column])
+        for column in LIST_COLUMNS:
+            writer.string_lists(column, [row or () for row in self.columns[column]])
+        for column in CATEGORICAL_COLUMNS:
+            writer.categorical(column, self.columns[column])
+        writer.array('is_pep', np.frombuffer(bytes(self.columns['is_pep'].flags), dtype=np.uint8))
+
+    @classmethod
+    def from_snapshot(cls, reader) -> 'EntityStore':
+        """Store backed by a memory-mapped snapshot part (index_snapshot.PartReader)"""
+        start = time.time()
+        store = cls()
+        store.ids = reader.values('id')
+        store.int_ids = reader.meta.get('id.kind') == 'int'
+        store.id_keys = reader.array('id_keys')
+        store.id_order = reader.array('id_order')
+        columns: Dict[str, Sequence] = {'id': store.ids}
+        for column in TEXT_COLUMNS:
+            columns[column] = reader.strings(column)
+        for column in LIST_COLUMNS:
+            columns[column] = reader.string_lists(column)
+        for column in CATEGORICAL_COLUMNS:
+            # JSON turned the tuple categories into lists
+            columns[column] = reader.categorical(
+                column, convert=lambda value: tuple(value) if isinstance(value, list) else value
+            )
+        columns['is_pep'] = _BoolColumn(reader.array('is_pep'))
+        store.columns = columns
+        store.loaded_at = time.time()
+        logger.info(
+            f"🗃️ Entity store mapped from snapshot: {len(store):,} entities "
+            f"in {(store.loaded_at - start) * 1000:.0f}ms"
+        )
+        return store
+
+
+def hydrate_entities(entities: Sequence[Any], conn) -> Tuple[List[Dict[str, Any]], bool]:
+    """Phase two: full rows for the final matches, fetched in one query.
+
+    Candidates carry only the scoring columns (store views or
+    scoring_projection rows); this adds remarks, jurisdiction and the rest.
+    Returns (rows, failed); failed rows lack those fields and shouldn't be cached.
+    """
+    ids = [entity.get('id') for entity in entities if entity.get('id') is not None]
+    rows: Dict[str, Dict[str, Any]] = {}
+    failed = False
+    if ids and conn is not None:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM sanctions_list WHERE id IN %s", (tuple(ids),))
+                rows = {str(row['id']): row for row in cursor.fetchall()}
+        except Exception as e:
+            conn.rollback()
+            failed = True
+            # Every screening field is already there; only remarks/jurisdiction go missing
+            logger.warning(f"⚠️ Match hydration failed: {e}")
+
+    hydrated = []
+    for entity in entities:
+        full = entity.to_dict() if isinstance(entity, StoredEntity) else dict(entity)
+        full.update(rows.get(str(full.get('id')), {}))
+        hydrated.append(full)
+    return hydrated, failed
+
+
+_shared = SharedIndex(EntityStore, 'entities', 'Entity store')
+
+
+def get_entity_store(conn, max_age: Optional[float] = None, snapshot=None) -> Optional[EntityStore]:
+    """Process-wide store, mapped or built on first use and refreshed in the background once stale"""
+    return _shared.get(conn, max_age, snapshot)
+
+
+def build_entity_store(rows: Iterable[Dict[str, Any]]) -> EntityStore:
+    """Build a store from already-fetched rows (demo data, fixtures)"""
+    store = EntityStore()
+    for row in rows:
+        store.add(row)
+    return store.finalize()
+
+
+def fetch_entities(ids: Sequence[Any], conn, store: Optional[EntityStore] = None) -> List[Any]:
+    """Candidate rows for index hits: views into the store, or SELECT * rows without one"""
+    if not ids:
+        return []
+    if store is not None:
+        return store.entities(ids)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT * FROM sanctions_list WHERE id IN %s", (tuple(ids),))
+        return cursor.fetchall()
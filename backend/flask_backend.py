@@ -1,15 +1,28 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 import os
+import json
 import logging
+import shutil
+import tempfile
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from fuzzywuzzy import fuzz
 from groq import Groq
-import psycopg2
-from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+from batch_scoring import score_entities
+from batch_screening import get_batch, iter_upload_rows, list_batches, start_batch
+from candidate_query import term_candidates
+from db_pool import get_db_connection, release_db_connection, pool_stats
+from entity_store import fetch_entities, get_entity_store, hydrate_entities, scoring_projection
+from index_snapshot import current_snapshot
+from name_forms import normalize_name
+from name_index import get_name_index, index_refresh_pending
+from result_cache import RESULT_CACHE_ENABLED, ResultCache, get_data_version, screening_cache_key
+from search_filters import SearchFilters
+from trigram_search import trigram_candidates
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
@@ -39,39 +52,34 @@ else:
     logger.info(f"✅ DATABASE_URL found: {DATABASE_URL[:20]}...")
     db_available = True
 
-def get_db_connection():
-    """Get database connection with proper error handling"""
-    database_url = os.environ.get("DATABASE_URL")
-    
-    if not database_url:
-        logger.error("❌ DATABASE_URL environment variable is not set!")
-        return None
-    
-    # Fix common Supabase URL issues
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        logger.info("🔧 Fixed postgres:// to postgresql://")
-    
-    logger.info(f"🔗 Database URL: {database_url[:60]}...")
-    
-    try:
-        conn = psycopg2.connect(database_url, cursor_factory=RealDictCursor)
-        
-        # Test the connection
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 as test")
-        cursor.close()
-        
-        logger.info("✅ Database connection successful and tested")
-        return conn
-        
-    except psycopg2.OperationalError as e:
-        logger.error(f"❌ Database operational error: {e}")
-        logger.error("💡 Check if your DATABASE_URL is correct and database is accessible")
-        return None
-    except Exception as e:
-        logger.error(f"❌ Unexpected database error: {e}")
-        return None
+# In-memory candidate index over sanctions_list names/aliases
+NAME_INDEX_ENABLED = os.environ.get("NAME_INDEX_ENABLED", "true").lower() == "true"
+NAME_INDEX_TOP_K = int(os.environ.get("NAME_INDEX_TOP_K", 200))
+# Reload interval without a data version; with one, the index follows the
+# version and is mapped from its snapshot (index_snapshot.py)
+NAME_INDEX_MAX_AGE = float(os.environ.get("NAME_INDEX_MAX_AGE", 3600))
+
+# Candidates are read from a compact columnar copy of the screening fields;
+# only the final matches are fetched in full
+ENTITY_STORE_ENABLED = os.environ.get("ENTITY_STORE_ENABLED", "true").lower() == "true"
+ENTITY_STORE_MAX_AGE = float(os.environ.get("ENTITY_STORE_MAX_AGE", 3600))
+
+# Screening responses, shared across workers through the on-disk tier
+result_cache = ResultCache()
+
+# Minimum fuzzy score for a candidate to be reported
+MATCH_THRESHOLD = 0.3
+# Matches in a /api/screen response
+RESPONSE_MATCHES = 10
+
+# ILIKE fallback: search terms per name and rows fetched per term
+MAX_SEARCH_TERMS = 5
+TERM_CANDIDATE_LIMIT = 500
+
+# Rows fetched and scored together by /api/screen/batch
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 500))
+BATCH_MAX_MATCHES = 5
+BATCH_SPOOL_MAX_MEMORY = 16 * 1024 * 1024
 
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
 groq_client = None
@@ -84,17 +92,6 @@ if GROQ_API_KEY:
 else:
     logger.warning("⚠️ GROQ_API_KEY not set - AI features disabled")
 
-def normalize_name(name: str) -> str:
-    """Normalize names for better matching"""
-    if not name:
-        return ""
-    normalized = ' '.join(name.lower().strip().split())
-    prefixes = ['mr.', 'mrs.', 'ms.', 'dr.', 'prof.', 'hon.']
-    for prefix in prefixes:
-        if normalized.startswith(prefix):
-            normalized = normalized[len(prefix):].strip()
-    return normalized
-
 def calculate_fuzzy_score(str1: str, str2: str) -> float:
     """Enhanced fuzzy matching with multiple algorithms"""
     if not str1 or not str2:
@@ -161,9 +158,8 @@ def calculate_risk_score(entity: Dict[str, Any], match_score: float) -> Dict[str
         'source': source
     }
 
-def search_database_flexible(name: str, entity_type: str, conn) -> List[Dict]:
-    """Search database with multiple strategies"""
-    all_results = []
+def build_search_terms(name: str) -> List[str]:
+    """Full name, significant words and first+last, deduplicated case-insensitively"""
     search_terms = []
 
     search_terms.append(name)
@@ -183,28 +179,85 @@ def search_database_flexible(name: str, entity_type: str, conn) -> List[Dict]:
             seen.add(term_lower)
             unique_terms.append(term)
 
+    return unique_terms[:MAX_SEARCH_TERMS]
+
+def search_database_flexible(name: str, entity_type: str, conn, filters: Optional[SearchFilters] = None) -> List[Dict]:
+    """Search database with multiple strategies"""
+    unique_terms = build_search_terms(name)
+
     logger.info(f"Searching with terms: {unique_terms}")
 
-    with conn.cursor() as cursor:
-        for term in unique_terms[:5]:
-            try:
-                query = """
-                SELECT * FROM sanctions_list
-                WHERE entity_type = %s
-                AND (entity_name ILIKE %s OR %s = ANY(aliases))
-                LIMIT 500;
-                """
-                cursor.execute(query, (entity_type, f'%{term}%', term))
-                results = cursor.fetchall()
-
-                if results:
-                    all_results.extend(results)
-                    logger.info(f"  '{term}': found {len(results)} matches")
-            except Exception as e:
-                logger.error(f"Search error for '{term}': {e}")
+    try:
+        return term_candidates(unique_terms, entity_type, conn, per_term_limit=TERM_CANDIDATE_LIMIT, filters=filters)
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Search error for {unique_terms}: {e}")
+        return []
 
-    unique_results = {item['id']: item for item in all_results}.values()
-    return list(unique_results)
+def load_entity_store(conn):
+    if not ENTITY_STORE_ENABLED:
+        return None
+    return get_entity_store(conn, max_age=ENTITY_STORE_MAX_AGE, snapshot=current_snapshot(conn))
+
+def search_name_index(name: str, entity_type: str, conn, filters: Optional[SearchFilters] = None) -> Optional[List[Dict]]:
+    """Pick candidate ids from the in-memory index, then fetch only those rows"""
+    if not NAME_INDEX_ENABLED:
+        return None
+
+    index = get_name_index(conn, max_age=NAME_INDEX_MAX_AGE, snapshot=current_snapshot(conn))
+    if index is None:
+        return None
+
+    ids = index.search(name, entity_type, limit=NAME_INDEX_TOP_K, filters=filters)
+    logger.info(f"📚 Name index: {len(ids)} candidates for '{name}'")
+    return fetch_entities(ids, conn, load_entity_store(conn))
+
+def fetch_batch_candidates(rows: List[Dict], conn) -> Dict[int, List[Dict]]:
+    """Candidates for a whole chunk of batch rows with one or two set-based queries"""
+    candidates: Dict[int, List[Dict]] = {row['row']: [] for row in rows}
+    if not rows:
+        return candidates
+
+    index = get_name_index(conn, max_age=NAME_INDEX_MAX_AGE, snapshot=current_snapshot(conn)) if NAME_INDEX_ENABLED else None
+    if index is not None:
+        row_ids = {row['row']: index.search(row['name'], row['type'], limit=NAME_INDEX_TOP_K) for row in rows}
+        all_ids = list({entity_id for ids in row_ids.values() for entity_id in ids})
+        by_id = {entity['id']: entity for entity in fetch_entities(all_ids, conn, load_entity_store(conn))}
+        for row_no, ids in row_ids.items():
+            candidates[row_no] = [by_id[entity_id] for entity_id in ids if entity_id in by_id]
+        return candidates
+
+    # Same terms and per-term LIMIT as search_database_flexible, but one round-trip per chunk
+    row_nos, types, terms = [], [], []
+    for row in rows:
+        for term in build_search_terms(row['name']):
+            row_nos.append(row['row'])
+            types.append(row['type'])
+            terms.append(term)
+
+    query = """
+    SELECT t.row_no AS batch_row_no, s.*
+    FROM unnest(%s::int[], %s::text[], %s::text[]) AS t(row_no, entity_type, term)
+    CROSS JOIN LATERAL (
+        SELECT {columns} FROM sanctions_list
+        WHERE entity_type = t.entity_type
+        AND (entity_name ILIKE '%%' || t.term || '%%' OR t.term = ANY(aliases))
+        LIMIT {limit}
+    ) s;
+    """
+    seen = set()
+    with conn.cursor() as cursor:
+        cursor.execute(
+            query.format(columns=scoring_projection(conn, alias=None), limit=int(TERM_CANDIDATE_LIMIT)),
+            (row_nos, types, terms)
+        )
+        for entity in cursor.fetchall():
+            entity = dict(entity)
+            row_no = entity.pop('batch_row_no')
+            if (row_no, entity['id']) not in seen:
+                seen.add((row_no, entity['id']))
+                candidates[row_no].append(entity)
+    return candidates
 
 def get_demo_data(name: str, entity_type: str) -> List[Dict]:
     """Provide demo data when database is not available"""
@@ -298,13 +351,15 @@ def health():
     conn = get_db_connection()
     db_status = "connected" if conn else "disconnected"
     if conn:
-        conn.close()
+        release_db_connection(conn)
     
     return jsonify({
         "status": "ok",
         "message": "Backend is running",
         "ai_enabled": groq_client is not None,
         "database": db_status,
+        "db_pool": pool_stats(),
+        "result_cache": result_cache.stats(),
         "demo_mode": not db_available
     }), 200
 
@@ -322,6 +377,7 @@ def debug_info():
         "database_url_exists": bool(os.environ.get("DATABASE_URL")),
         "database_url_length": len(os.environ.get("DATABASE_URL", "")),
         "database_connected": bool(conn),
+        "db_pool": pool_stats(),
         "groq_api_key_exists": bool(os.environ.get("GROQ_API_KEY")),
         "environment_variables": [key for key in os.environ.keys() if 'DATABASE' in key or 'GROQ' in key or 'POSTGRES' in key]
     }
@@ -335,17 +391,17 @@ def debug_info():
             debug_info["database_test_query"] = "success"
             debug_info["sample_count"] = result['count'] if result else 0
             cursor.close()
-            conn.close()
         except Exception as e:
             debug_info["database_test_query"] = f"failed: {str(e)}"
-            if conn:
-                conn.close()
+        finally:
+            release_db_connection(conn)
     
     return jsonify(debug_info)
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get database statistics"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -356,12 +412,11 @@ def get_stats():
             }), 200
         
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) as total FROM sanctions")
+        cursor.execute("SELECT COUNT(*) as total FROM sanctions_list")
         result = cursor.fetchone()
         total = result['total'] if result else 46597
         
         cursor.close()
-        conn.close()
         
         return jsonify({
             'status': 'active',
@@ -375,6 +430,9 @@ def get_stats():
             'total_sanctions': 46597,
             'error': str(e)
         }), 500
+    finally:
+        if conn:
+            release_db_connection(conn)
 
 @app.route('/api/screen', methods=['POST', 'OPTIONS'])
 def sanctions_screen():
@@ -399,12 +457,26 @@ def sanctions_screen():
 
         entity_type = data.get('type', 'individual')
         use_ai = data.get('use_ai', True)
-        nationality_filter = data.get('nationality', '').strip()
+        # Nationality, list and PEP restrictions are applied during retrieval
+        filters = SearchFilters.from_request(data)
 
         logger.info(f"🔍 Screening: {name} (type={entity_type})")
 
         # Try to connect to database
         conn = get_db_connection()
+
+        # Repeat screenings of the same counterparty against the same list data
+        cache_key = None
+        if conn and RESULT_CACHE_ENABLED:
+            data_version = get_data_version(conn)
+            if data_version is not None:
+                cache_key = screening_cache_key(
+                    data_version, normalize_name(name), type=entity_type, **filters.cache_options()
+                )
+                cached = result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"⚡ Cache hit for '{name}'")
+                    return jsonify(dict(cached, name=name, timestamp=datetime.now().isoformat(), cached=True)), 200
         
         if not conn:
             # Use demo data if database is not available
@@ -413,7 +485,14 @@ def sanctions_screen():
             is_demo_mode = True
         else:
             try:
-                all_matches = search_database_flexible(name, entity_type, conn)
+                if filters.lists:
+                    filters = filters.resolve(conn)
+                all_matches = search_name_index(name, entity_type, conn, filters)
+                if all_matches is None:
+                    # pg_trgm ranks in the database; ILIKE only if the migration isn't applied
+                    all_matches = trigram_candidates([name], entity_type, conn, filters=filters)
+                if all_matches is None:
+                    all_matches = search_database_flexible(name, entity_type, conn, filters)
                 logger.info(f"📊 Found {len(all_matches)} potential matches")
                 is_demo_mode = False
             except Exception as e:
@@ -423,91 +502,85 @@ def sanctions_screen():
                 all_matches = get_demo_data(name, entity_type)
                 is_demo_mode = True
 
+        # Retrieval already applied the filters; demo data and unmapped spellings still need this
+        if filters:
+            all_matches = [entity for entity in all_matches if filters.matches(entity)]
+
+        # Score every candidate name and alias in one batch (same values as calculate_fuzzy_score)
+        scores = score_entities(name, all_matches, score_cutoff=MATCH_THRESHOLD)
+
+        # Phase one ranked the scoring columns; phase two hydrates and formats only what is returned
+        ranked = [
+            (entity, name_score, best_fuzzy, matched_alias)
+            for entity, (name_score, best_fuzzy, matched_alias) in zip(all_matches, scores)
+            if best_fuzzy > MATCH_THRESHOLD
+        ]
+        ranked.sort(key=lambda item: round(item[2], 3), reverse=True)
+        ranked = ranked[:RESPONSE_MATCHES]
+        entities, hydration_failed = hydrate_entities([item[0] for item in ranked], conn)
+
         matches = []
-        for entity in all_matches:
-            if nationality_filter:
-                nats = entity.get('nationalities', []) or []
-                if not any(nationality_filter.lower() in (n or '').lower() for n in nats):
-                    continue
-
-            entity_name = entity.get('entity_name', '')
-            name_score = calculate_fuzzy_score(name, entity_name)
-
-            alias_scores = []
-            matched_alias = None
-            for alias in (entity.get('aliases', []) or [])[:10]:
-                if alias:
-                    alias_score = calculate_fuzzy_score(name, str(alias))
-                    alias_scores.append(alias_score)
-                    if alias_score > name_score and not matched_alias:
-                        matched_alias = alias
-
-            best_fuzzy = max([name_score] + alias_scores) if alias_scores else name_score
-
-            if best_fuzzy > 0.3:
-                risk = calculate_risk_score(entity, best_fuzzy)
-                
-                # Format aliases for display
-                aliases = entity.get('aliases', []) or []
-                aliases_str = ', '.join([a for a in aliases if a]) if aliases else 'None'
-                
-                # Format nationalities
-                nationalities = entity.get('nationalities', []) or []
-                nats_str = ', '.join([n for n in nationalities if n]) if nationalities else 'Not specified'
-                
-                # Get additional fields
-                dob = entity.get('date_of_birth') or entity.get('dob') or 'Not specified'
-                place_of_birth = entity.get('place_of_birth') or entity.get('pob') or 'Not specified'
-                remarks = entity.get('remarks', '') or ''
-                jurisdiction = entity.get('jurisdiction', '') or ''
-                
-                # Build comprehensive details
-                details_parts = []
-                details_parts.append(f"Program: {entity.get('program', 'N/A')}")
-                details_parts.append(f"Source: {entity.get('list_source', 'Unknown')}")
-                details_parts.append(f"Type: {'PEP' if entity.get('is_pep') else 'Sanctions'}")
-                if aliases_str != 'None':
-                    details_parts.append(f"Aliases: {aliases_str}")
-                details_parts.append(f"Nationalities: {nats_str}")
-                if dob != 'Not specified':
-                    details_parts.append(f"DOB: {dob}")
-                if place_of_birth != 'Not specified':
-                    details_parts.append(f"POB: {place_of_birth}")
-                if jurisdiction:
-                    details_parts.append(f"Jurisdiction: {jurisdiction}")
-                if remarks:
-                    details_parts.append(f"Remarks: {remarks}")
-                if matched_alias:
-                    details_parts.append(f"Matched via alias: {matched_alias}")
-                
-                matches.append({
-                    'id': entity.get('id'),
-                    'entity_name': entity.get('entity_name'),
-                    'entity_type': entity.get('entity_type'),
-                    'list_source': entity.get('list_source'),
-                    'program': entity.get('program'),
-                    'nationalities': nats_str,
-                    'aliases': aliases_str,
-                    'date_of_birth': dob,
-                    'place_of_birth': place_of_birth,
-                    'jurisdiction': jurisdiction,
-                    'remarks': remarks,
-                    'is_pep': entity.get('is_pep', False),
-                    'match_score': round(name_score, 3),
-                    'best_fuzzy_score': round(best_fuzzy, 3),
-                    'combined_score': round(best_fuzzy, 3),
-                    'risk_assessment': risk,
-                    'details': ' | '.join(details_parts)
-                })
-
-        matches.sort(key=lambda x: x.get('combined_score', 0), reverse=True)
-        matches = matches[:20]
+        for entity, (_, name_score, best_fuzzy, matched_alias) in zip(entities, ranked):
+            risk = calculate_risk_score(entity, best_fuzzy)
+            
+            # Format aliases for display
+            aliases = entity.get('aliases', []) or []
+            aliases_str = ', '.join([a for a in aliases if a]) if aliases else 'None'
+            
+            # Format nationalities
+            nationalities = entity.get('nationalities', []) or []
+            nats_str = ', '.join([n for n in nationalities if n]) if nationalities else 'Not specified'
+            
+            # Get additional fields
+            dob = entity.get('date_of_birth') or entity.get('dob') or 'Not specified'
+            place_of_birth = entity.get('place_of_birth') or entity.get('pob') or 'Not specified'
+            remarks = entity.get('remarks', '') or ''
+            jurisdiction = entity.get('jurisdiction', '') or ''
+            
+            # Build comprehensive details
+            details_parts = []
+            details_parts.append(f"Program: {entity.get('program', 'N/A')}")
+            details_parts.append(f"Source: {entity.get('list_source', 'Unknown')}")
+            details_parts.append(f"Type: {'PEP' if entity.get('is_pep') else 'Sanctions'}")
+            if aliases_str != 'None':
+                details_parts.append(f"Aliases: {aliases_str}")
+            details_parts.append(f"Nationalities: {nats_str}")
+            if dob != 'Not specified':
+                details_parts.append(f"DOB: {dob}")
+            if place_of_birth != 'Not specified':
+                details_parts.append(f"POB: {place_of_birth}")
+            if jurisdiction:
+                details_parts.append(f"Jurisdiction: {jurisdiction}")
+            if remarks:
+                details_parts.append(f"Remarks: {remarks}")
+            if matched_alias:
+                details_parts.append(f"Matched via alias: {matched_alias}")
+            
+            matches.append({
+                'id': entity.get('id'),
+                'entity_name': entity.get('entity_name'),
+                'entity_type': entity.get('entity_type'),
+                'list_source': entity.get('list_source'),
+                'program': entity.get('program'),
+                'nationalities': nats_str,
+                'aliases': aliases_str,
+                'date_of_birth': dob,
+                'place_of_birth': place_of_birth,
+                'jurisdiction': jurisdiction,
+                'remarks': remarks,
+                'is_pep': entity.get('is_pep', False),
+                'match_score': round(name_score, 3),
+                'best_fuzzy_score': round(best_fuzzy, 3),
+                'combined_score': round(best_fuzzy, 3),
+                'risk_assessment': risk,
+                'details': ' | '.join(details_parts)
+            })
 
         logger.info(f"✅ Returning {len(matches)} matches")
         if matches:
             logger.info(f"🎯 Top: {matches[0]['entity_name']} ({matches[0]['combined_score']})")
 
-        return jsonify({
+        response = {
             "name": name,
             "match_found": len(matches) > 0,
             "matches": [
@@ -525,19 +598,149 @@ def sanctions_screen():
                     "remarks": m.get('remarks', ''),
                     "is_pep": m.get('is_pep', False)
                 }
-                for m in matches[:10]
+                for m in matches
             ],
             "risk_level": matches[0]['risk_assessment']['level'] if matches else "Low",
             "timestamp": datetime.now().isoformat(),
             "demo_mode": is_demo_mode
-        }), 200
+        }
+        # Rows missing their hydrated fields, or from an index still being rebuilt, must not be cached
+        if cache_key and not is_demo_mode and not hydration_failed and not index_refresh_pending():
+            result_cache.set(cache_key, response)
+        return jsonify(response), 200
 
     except Exception as e:
         logger.error(f"❌ Screening error: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": f"Internal server error: {str(e)}"}), 500
     finally:
         if conn:
-            conn.close()
+            release_db_connection(conn)
+
+
+def screen_batch_row(row: Dict, candidates: List[Dict]) -> Dict:
+    """Score one batch row against its candidates; compact result for NDJSON"""
+    filters = SearchFilters.from_request(row)
+    if filters:
+        candidates = [entity for entity in candidates if filters.matches(entity)]
+
+    matches = []
+    for entity, (_, best_fuzzy, matched_alias) in zip(candidates, score_entities(row['name'], candidates, score_cutoff=MATCH_THRESHOLD)):
+        if best_fuzzy > MATCH_THRESHOLD:
+            risk = calculate_risk_score(entity, best_fuzzy)
+            matches.append({
+                'id': entity.get('id'),
+                'name': entity.get('entity_name'),
+                'list_type': entity.get('list_source', 'Unknown'),
+                'program': entity.get('program', 'N/A'),
+                'is_pep': entity.get('is_pep', False),
+                'confidence': round(best_fuzzy, 3),
+                'matched_alias': matched_alias,
+                'risk_assessment': risk
+            })
+
+    matches.sort(key=lambda x: x['confidence'], reverse=True)
+    matches = matches[:BATCH_MAX_MATCHES]
+    return {
+        'row': row['row'],
+        'reference': row['reference'],
+        'name': row['name'],
+        'match_found': len(matches) > 0,
+        'risk_level': matches[0]['risk_assessment']['level'] if matches else "Low",
+        'matches': matches
+    }
+
+def iter_chunks(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+@app.route('/api/screen/batch', methods=['POST', 'OPTIONS'])
+def sanctions_screen_batch():
+    """Screen a CSV or JSON-lines upload, streaming one NDJSON result per row"""
+    if request.method == 'OPTIONS':
+        return '', 204
+
+    upload = request.files.get('file')
+    if upload is not None:
+        # Werkzeug closes parsed uploads when the view returns, before the stream is consumed
+        spool = tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_MAX_MEMORY)
+        shutil.copyfileobj(upload.stream, spool)
+        spool.seek(0)
+        rows = iter_upload_rows(spool, upload.filename, upload.mimetype)
+    elif request.content_length:
+        rows = iter_upload_rows(request.stream, '', request.content_type)
+    else:
+        return jsonify({"success": False, "error": "Upload a CSV or JSON-lines file"}), 400
+
+    progress = start_batch()
+    logger.info(f"📦 Batch screening {progress.batch_id} started")
+
+    def generate():
+        conn = get_db_connection()
+        status = 'completed'
+        try:
+            for chunk in iter_chunks(rows, BATCH_CHUNK_SIZE):
+                bad = [row for row in chunk if 'error' in row or not row.get('name')]
+                good = [row for row in chunk if 'error' not in row and row.get('name')]
+
+                for row in bad:
+                    progress.record(processed=1, errors=1)
+                    yield json.dumps({'row': row['row'], 'error': row.get('error', 'Name is required')}) + "\n"
+
+                if conn:
+                    try:
+                        candidates = fetch_batch_candidates(good, conn)
+                    except Exception as e:
+                        logger.error(f"Batch DB error: {e}")
+                        conn.rollback()
+                        candidates = {row['row']: [] for row in good}
+                        for row in good:
+                            progress.record(processed=1, errors=1)
+                            yield json.dumps({'row': row['row'], 'reference': row['reference'], 'error': f"Search failed: {e}"}) + "\n"
+                        continue
+                else:
+                    candidates = {row['row']: get_demo_data(row['name'], row['type']) for row in good}
+
+                for row in good:
+                    result = screen_batch_row(row, candidates[row['row']])
+                    progress.record(processed=1, matched=int(result['match_found']))
+                    yield json.dumps(result, default=str) + "\n"
+
+            progress.finish(status)
+            yield json.dumps({'summary': progress.snapshot(), 'demo_mode': conn is None}) + "\n"
+        except GeneratorExit:
+            status = 'cancelled'
+            raise
+        except Exception as e:
+            status = 'failed'
+            logger.error(f"❌ Batch screening error: {str(e)}", exc_info=True)
+            yield json.dumps({'error': f"Internal server error: {str(e)}"}) + "\n"
+        finally:
+            if progress.finished_at is None:
+                progress.finish(status)
+            release_db_connection(conn)
+            logger.info(f"📦 Batch {progress.batch_id} {status}: {progress.snapshot()}")
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Batch-Id'] = progress.batch_id
+    return response
+
+@app.route('/api/screen/batch', methods=['GET'])
+def batch_status_list():
+    """Progress and throughput of running and recent batches"""
+    return jsonify({"batches": list_batches()}), 200
+
+@app.route('/api/screen/batch/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    progress = get_batch(batch_id)
+    if not progress:
+        return jsonify({"success": False, "error": "Unknown batch"}), 404
+    return jsonify(progress.snapshot()), 200
 
 
 # ============= AUTHENTICATION ENDPOINTS =============
@@ -546,6 +749,7 @@ def sanctions_screen():
 def register():
     if request.method == 'OPTIONS':
         return '', 204
+    conn = None
     try:
         data = request.json
         email = data.get('email')
@@ -560,22 +764,24 @@ def register():
         cursor.execute("SELECT id FROM public.profiles WHERE email = %s", (email,))
         if cursor.fetchone():
             cursor.close()
-            conn.close()
             return jsonify({'success': False, 'error': 'Email already registered'}), 400
         cursor.execute("INSERT INTO public.profiles (email, full_name, role) VALUES (%s, %s, 'user') RETURNING id, email, full_name, role", (email, full_name))
         user = cursor.fetchone()
         conn.commit()
         cursor.close()
-        conn.close()
         return jsonify({'success': True, 'user': dict(user), 'message': 'Registration successful'}), 201
     except Exception as e:
         logger.error(f"Registration error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if conn:
+            release_db_connection(conn)
 
 @app.route('/api/login', methods=['POST', 'OPTIONS'])
 def login():
     if request.method == 'OPTIONS':
         return '', 204
+    conn = None
     try:
         data = request.json
         email = data.get('email')
@@ -589,13 +795,15 @@ def login():
         cursor.execute("SELECT id, email, full_name, role, company FROM public.profiles WHERE email = %s", (email,))
         user = cursor.fetchone()
         cursor.close()
-        conn.close()
         if not user:
             return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
         return jsonify({'success': True, 'user': dict(user), 'message': 'Login successful'}), 200
     except Exception as e:
         logger.error(f"Login error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if conn:
+            release_db_connection(conn)
 
 @app.route('/api/logout', methods=['POST', 'OPTIONS'])
 def logout():
@@ -2,17 +2,30 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 import os
 import logging
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from typing import List, Dict, Any
 from fuzzywuzzy import fuzz
 from groq import Groq
-import psycopg2
-from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
-import jellyfish
-import re
 from rapidfuzz import process, fuzz as rfuzz
 
+from db_pool import get_db_connection, release_db_connection, pool_stats
+from entity_store import fetch_entities, get_entity_store, hydrate_entities
+from index_snapshot import current_snapshot
+from name_forms import contains_arabic, normalize_name, stored_name_forms, transliterate_arabic_to_english
+from name_index import index_refresh_pending
+from phonetic_index import get_phonetic_index, phonetic_codes, codes_similarity
+from result_cache import RESULT_CACHE_ENABLED, ResultCache, get_data_version, screening_cache_key
+from search_filters import SearchFilters
+from trigram_search import trigram_candidates
+from typo_index import get_typo_index
+from candidate_query import term_candidates
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
@@ -41,101 +54,72 @@ else:
     logger.info(f"✅ DATABASE_URL found: {DATABASE_URL[:20]}...")
     db_available = True
 
-def get_db_connection():
-    """Get database connection with proper error handling"""
-    database_url = os.environ.get("DATABASE_URL")
-    
-    if not database_url:
-        logger.error("❌ DATABASE_URL environment variable is not set!")
-        return None
-    
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-        logger.info("🔧 Fixed postgres:// to postgresql://")
-    
-    logger.info(f"🔗 Database URL: {database_url[:60]}...")
-    
-    try:
-        conn = psycopg2.connect(database_url, cursor_factory=RealDictCursor)
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 as test")
-        cursor.close()
-        logger.info("✅ Database connection successful and tested")
-        return conn
-    except psycopg2.OperationalError as e:
-        logger.error(f"❌ Database operational error: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"❌ Unexpected database error: {e}")
-        return None
+# AI analysis runs only for the matches we return, fanned out over a bounded pool
+AI_TOP_N = int(os.environ.get("AI_TOP_N", 10))
+AI_MAX_WORKERS = int(os.environ.get("AI_MAX_WORKERS", 4))
+AI_REQUEST_DEADLINE = float(os.environ.get("AI_REQUEST_DEADLINE", 20))
+AI_CACHE_SIZE = int(os.environ.get("AI_CACHE_SIZE", 4096))
 
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
 groq_client = None
 if GROQ_API_KEY:
     try:
-        groq_client = Groq(api_key=GROQ_API_KEY)
+        # A single call never outlives the request deadline, so a hung one can't hold a pool worker
+        groq_client = Groq(api_key=GROQ_API_KEY, timeout=AI_REQUEST_DEADLINE, max_retries=1)
         logger.info("✅ Groq AI initialized")
     except Exception as e:
         logger.warning(f"⚠️ Groq AI not available: {e}")
 else:
     logger.warning("⚠️ GROQ_API_KEY not set - AI features disabled")
 
-# Arabic to English transliteration mapping
-ARABIC_TO_ENGLISH = {
-    'ا': 'a', 'أ': 'a', 'إ': 'e', 'آ': 'a', 'ى': 'a', 'ة': 'h',
-    'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j', 'ح': 'h', 'خ': 'kh',
-    'د': 'd', 'ذ': 'th', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh',
-    'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh',
-    'ف': 'f', 'ق': 'q', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n',
-    'ه': 'h', 'و': 'w', 'ي': 'y', 'ئ': 'e', 'ؤ': 'o', 'ء': "'"
+# Minimum advanced match score for a candidate to be reported
+MATCH_THRESHOLD = 0.25
+
+# Components of calculate_advanced_match_score; they sum to 1
+MATCH_WEIGHTS = {
+    'ratio': 0.15,
+    'partial': 0.20,
+    'token_sort': 0.20,
+    'token_set': 0.20,
+    'rapidfuzz': 0.15,
+    'phonetic': 0.10
 }
 
-def contains_arabic(text):
-    """Check if text contains Arabic characters"""
-    arabic_pattern = re.compile('[\u0600-\u06FF]')
-    return bool(arabic_pattern.search(text))
-
-def transliterate_arabic_to_english(text):
-    """Transliterate Arabic text to English"""
-    result = []
-    for char in text:
-        if char in ARABIC_TO_ENGLISH:
-            result.append(ARABIC_TO_ENGLISH[char])
-        else:
-            result.append(char)
-    return ''.join(result)
+# ILIKE fallback rows per search name when pg_trgm isn't set up
+TERM_CANDIDATE_LIMIT = 50
+
+# Scores within the same 5-point bucket share a cached analysis
+AI_SCORE_BUCKET = 0.05
+
+# Phonetic candidates come from keys precomputed for every stored name. Both
+# indexes follow the data version and are mapped from its snapshot when one
+# exists (index_snapshot.py); MAX_AGE only applies without a data version.
+PHONETIC_INDEX_ENABLED = os.environ.get("PHONETIC_INDEX_ENABLED", "true").lower() == "true"
+PHONETIC_INDEX_TOP_K = int(os.environ.get("PHONETIC_INDEX_TOP_K", 50))
+PHONETIC_INDEX_MAX_AGE = float(os.environ.get("PHONETIC_INDEX_MAX_AGE", 3600))
+
+# Typo-tolerant candidates from a symmetric-delete index over name tokens
+TYPO_INDEX_ENABLED = os.environ.get("TYPO_INDEX_ENABLED", "true").lower() == "true"
+TYPO_INDEX_TOP_K = int(os.environ.get("TYPO_INDEX_TOP_K", 100))
+TYPO_INDEX_MAX_AGE = float(os.environ.get("TYPO_INDEX_MAX_AGE", 3600))
+
+# Candidates are read from a compact columnar copy of the screening fields;
+# only the final matches are fetched in full
+ENTITY_STORE_ENABLED = os.environ.get("ENTITY_STORE_ENABLED", "true").lower() == "true"
+ENTITY_STORE_MAX_AGE = float(os.environ.get("ENTITY_STORE_MAX_AGE", 3600))
+
+# Screening responses, shared across workers through the on-disk tier
+result_cache = ResultCache()
+
+ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix="groq")
+ai_analysis_cache = OrderedDict()
+ai_cache_lock = threading.Lock()
 
 def advanced_phonetic_matching(name1, name2):
     """Advanced phonetic matching using multiple algorithms"""
-    scores = []
-    
-    # Soundex
-    soundex1 = jellyfish.soundex(name1)
-    soundex2 = jellyfish.soundex(name2)
-    soundex_score = 1.0 if soundex1 == soundex2 else 0.0
-    
-    # Metaphone
-    metaphone1 = jellyfish.metaphone(name1)
-    metaphone2 = jellyfish.metaphone(name2)
-    metaphone_score = 1.0 if metaphone1 == metaphone2 else 0.0
-    
-    # NYSIIS
-    nysiis1 = jellyfish.nysiis(name1)
-    nysiis2 = jellyfish.nysiis(name2)
-    nysiis_score = 1.0 if nysiis1 == nysiis2 else 0.0
-    
-    # Match Rating Approach
-    try:
-        mra1 = jellyfish.match_rating_codex(name1)
-        mra2 = jellyfish.match_rating_codex(name2)
-        mra_score = 1.0 if mra1 == mra2 else 0.0
-    except:
-        mra_score = 0.0
-    
-    # Average phonetic scores
-    phonetic_score = (soundex_score + metaphone_score + nysiis_score + mra_score) / 4.0
-    
-    return phonetic_score
+    # Soundex, Metaphone, NYSIIS and Match Rating codes; indexed names reuse
+    # the codes computed when the phonetic index loaded
+    return codes_similarity(phonetic_codes(name1), phonetic_codes(name2))
 
 def generate_name_variations(name):
     """Generate common name variations and misspellings"""
@@ -183,40 +167,56 @@ def generate_name_variations(name):
     
     return list(variations)
 
-def calculate_advanced_match_score(search_name, target_name):
-    """Calculate advanced match score using multiple algorithms"""
+def calculate_advanced_match_score(search_name, target_name, search_norm=None, target_norm=None, score_cutoff=0.0):
+    """Calculate advanced match score using multiple algorithms
+
+    Returns 0.0 early once the score provably can't exceed score_cutoff.
+    """
     if not search_name or not target_name:
         return 0.0
     
-    search_norm = search_name.lower().strip()
-    target_norm = target_name.lower().strip()
+    # Stored candidates pass their ingest-time normalized forms
+    if search_norm is None:
+        search_norm = normalize_name(search_name)
+    if target_norm is None:
+        target_norm = normalize_name(target_name)
     
     # Exact match
     if search_norm == target_norm:
         return 0.95  # Never 100% to leave room for manual verification
     
+    # Penalty for significant length differences
+    length_penalty = min(1.0, len(search_norm) / len(target_norm)) if len(target_norm) > 0 else 0.5
+    # Every component is at most 1, so a short query against a long name can be ruled out unscored
+    if min(0.91, length_penalty) <= score_cutoff:
+        return 0.0
+    
+    # Calculate weighted composite score
+    weights = MATCH_WEIGHTS
+    
     # Multiple fuzzy matching algorithms with different weights
     ratio_score = fuzz.ratio(search_norm, target_norm) / 100.0
     partial_score = fuzz.partial_ratio(search_norm, target_norm) / 100.0
     token_sort_score = fuzz.token_sort_ratio(search_norm, target_norm) / 100.0
     token_set_score = fuzz.token_set_ratio(search_norm, target_norm) / 100.0
     
+    # Even perfect WRatio and phonetic scores wouldn't lift it over the cutoff
+    best_possible = (
+        ratio_score * weights['ratio'] +
+        partial_score * weights['partial'] +
+        token_sort_score * weights['token_sort'] +
+        token_set_score * weights['token_set'] +
+        weights['rapidfuzz'] + weights['phonetic']
+    )
+    if best_possible * length_penalty <= score_cutoff:
+        return 0.0
+    
     # RapidFuzz weighted ratio (more advanced)
     rapidfuzz_score = rfuzz.WRatio(search_norm, target_norm) / 100.0
     
     # Phonetic matching score
     phonetic_score = advanced_phonetic_matching(search_norm, target_norm)
     
-    # Calculate weighted composite score
-    weights = {
-        'ratio': 0.15,
-        'partial': 0.20,
-        'token_sort': 0.20,
-        'token_set': 0.20,
-        'rapidfuzz': 0.15,
-        'phonetic': 0.10
-    }
-    
     composite_score = (
         ratio_score * weights['ratio'] +
         partial_score * weights['partial'] +
@@ -226,8 +226,6 @@ def calculate_advanced_match_score(search_name, target_name):
         phonetic_score * weights['phonetic']
     )
     
-    # Apply penalties for significant differences
-    length_penalty = min(1.0, len(search_norm) / len(target_norm)) if len(target_norm) > 0 else 0.5
     composite_score *= length_penalty
     
     # Ensure score is between 0 and 0.91
@@ -321,6 +319,50 @@ def get_ai_enhanced_analysis(entity, match_score, search_name, match_context):
         logger.error(f"AI enhanced analysis error: {e}")
         return None, None, None
 
+def ai_cache_key(search_name, entity, match_score):
+    """Content address for an analysis: (search name, entity id, score bucket)"""
+    bucket = int(match_score / AI_SCORE_BUCKET)
+    payload = json.dumps([' '.join(search_name.lower().split()), str(entity.get('id')), bucket])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_cached_ai_analysis(entity, match_score, search_name, match_context):
+    """get_ai_enhanced_analysis behind an LRU cache so repeat pairs never hit the LLM"""
+    key = ai_cache_key(search_name, entity, match_score)
+    with ai_cache_lock:
+        if key in ai_analysis_cache:
+            ai_analysis_cache.move_to_end(key)
+            return ai_analysis_cache[key]
+
+    result = get_ai_enhanced_analysis(entity, match_score, search_name, match_context)
+    if result[0] is not None:
+        with ai_cache_lock:
+            ai_analysis_cache[key] = result
+            ai_analysis_cache.move_to_end(key)
+            while len(ai_analysis_cache) > AI_CACHE_SIZE:
+                ai_analysis_cache.popitem(last=False)
+    return result
+
+def run_parallel_ai_analysis(matches, entities, search_name, search_params):
+    """Analyse the top matches and the session concurrently, bounded by a per-request deadline"""
+    overall_future = ai_executor.submit(get_overall_ai_intelligence, matches, search_name, search_params)
+    futures = {
+        ai_executor.submit(get_cached_ai_analysis, entity, match['combined_score'], search_name, match['match_context']): match
+        for match, entity in zip(matches[:AI_TOP_N], entities[:AI_TOP_N])
+    }
+
+    done, not_done = wait(list(futures) + [overall_future], timeout=AI_REQUEST_DEADLINE)
+    if not_done:
+        # Queued analyses are dropped; running ones end at the client timeout and still fill the cache
+        for future in not_done:
+            future.cancel()
+        logger.warning(f"⏱️ AI deadline hit: {len(not_done)} analyses still pending after {AI_REQUEST_DEADLINE}s")
+
+    for future, match in futures.items():
+        if future in done:
+            match['risk_analysis'], match['match_analysis'], match['recommendations'] = future.result()
+
+    return overall_future.result() if overall_future in done else None
+
 def get_overall_ai_intelligence(matches, search_name, search_params):
     """Get overall AI intelligence for the screening session"""
     if not groq_client or not matches:
@@ -424,56 +466,77 @@ def calculate_intelligent_risk_score(entity, match_score, match_context):
         }
     }
 
-def enhanced_bilingual_search(name, entity_type, conn, language='english'):
+def load_entity_store(conn):
+    if not ENTITY_STORE_ENABLED:
+        return None
+    return get_entity_store(conn, max_age=ENTITY_STORE_MAX_AGE, snapshot=current_snapshot(conn))
+
+def search_phonetic_index(names, entity_type, conn, filters=None):
+    """Rows whose name tokens sound like the query, via the precomputed phonetic keys"""
+    if not PHONETIC_INDEX_ENABLED:
+        return []
+
+    index = get_phonetic_index(conn, max_age=PHONETIC_INDEX_MAX_AGE, snapshot=current_snapshot(conn))
+    if index is None:
+        return []
+
+    ids = []
+    for name in names:
+        ids.extend(i for i in index.search(name, entity_type, limit=PHONETIC_INDEX_TOP_K, filters=filters) if i not in ids)
+    logger.info(f"🔊 Phonetic index: {len(ids)} candidates")
+    return fetch_entities(ids, conn, load_entity_store(conn))
+
+def search_typo_index(names, entity_type, conn, filters=None):
+    """Rows with name tokens within a couple of typos of the query's tokens"""
+    if not TYPO_INDEX_ENABLED:
+        return []
+
+    index = get_typo_index(conn, max_age=TYPO_INDEX_MAX_AGE, snapshot=current_snapshot(conn))
+    if index is None:
+        return []
+
+    ids = []
+    for name in names:
+        ids.extend(i for i in index.search(name, entity_type, limit=TYPO_INDEX_TOP_K, filters=filters) if i not in ids)
+    logger.info(f"⌨️ Typo index: {len(ids)} candidates")
+    return fetch_entities(ids, conn, load_entity_store(conn))
+
+def enhanced_bilingual_search(name, entity_type, conn, language='english', phonetic=True, filters=None):
     """Enhanced search with bilingual support and advanced matching"""
     all_results = []
-    search_terms = set()
-    
-    # Base search terms
-    search_terms.add(name)
-    
-    # Generate name variations
-    name_variations = generate_name_variations(name)
-    search_terms.update(name_variations[:10])  # Limit variations
+    search_names = [name]
     
     # Bilingual processing
     if language == 'arabic' or contains_arabic(name):
-        english_translation = transliterate_arabic_to_english(name)
-        search_terms.add(english_translation)
-        # Generate variations for English translation too
-        english_variations = generate_name_variations(english_translation)
-        search_terms.update(english_variations[:5])
-    
-    # Phonetic variations
-    phonetic_terms = [
-        jellyfish.soundex(name),
-        jellyfish.metaphone(name),
-        jellyfish.nysiis(name)
-    ]
-    search_terms.update(phonetic_terms)
+        search_names.append(transliterate_arabic_to_english(name))
     
-    logger.info(f"🔍 Enhanced bilingual search with {len(search_terms)} terms")
+    # Phonetic candidates are a key lookup, not ILIKE on soundex codes
+    if phonetic:
+        try:
+            all_results.extend(search_phonetic_index(search_names, entity_type, conn, filters))
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Phonetic search error: {e}")
     
-    with conn.cursor() as cursor:
-        for term in list(search_terms)[:15]:  # Limit total queries
-            try:
-                query = """
-                SELECT * FROM sanctions_list
-                WHERE entity_type = %s
-                AND (
-                    entity_name ILIKE %s 
-                    OR %s = ANY(aliases)
-                    OR entity_name ILIKE %s
-                )
-                LIMIT 50;
-                """
-                cursor.execute(query, (entity_type, f'%{term}%', term, f'{term}%'))
-                results = cursor.fetchall()
-                
-                if results:
-                    all_results.extend(results)
-            except Exception as e:
-                logger.error(f"Search error for '{term}': {e}")
+    # Misspellings come from the symmetric-delete index instead of one ILIKE
+    # per hand-written variation
+    try:
+        all_results.extend(search_typo_index(search_names, entity_type, conn, filters))
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Typo search error: {e}")
+    
+    # Trigram similarity ranks the rest in one query per name when pg_trgm is set up
+    trigram_results = trigram_candidates(search_names, entity_type, conn, filters=filters)
+    if trigram_results is not None:
+        all_results.extend(trigram_results)
+    else:
+        logger.info(f"🔍 Enhanced bilingual search with {len(search_names)} terms")
+        try:
+            all_results.extend(term_candidates(search_names, entity_type, conn, per_term_limit=TERM_CANDIDATE_LIMIT, filters=filters))
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Search error: {e}")
     
     # Remove duplicates by ID
     unique_results = {item['id']: item for item in all_results}.values()
@@ -570,13 +633,15 @@ def health():
     conn = get_db_connection()
     db_status = "connected" if conn else "disconnected"
     if conn:
-        conn.close()
+        release_db_connection(conn)
     
     return jsonify({
         "status": "ok",
         "message": "Backend is running",
         "ai_enabled": groq_client is not None,
         "database": db_status,
+        "db_pool": pool_stats(),
+        "result_cache": result_cache.stats(),
         "demo_mode": not db_available
     }), 200
 
@@ -593,6 +658,7 @@ def debug_info():
         "database_url_exists": bool(os.environ.get("DATABASE_URL")),
         "database_url_length": len(os.environ.get("DATABASE_URL", "")),
         "database_connected": bool(conn),
+        "db_pool": pool_stats(),
         "groq_api_key_exists": bool(os.environ.get("GROQ_API_KEY")),
         "environment_variables": [key for key in os.environ.keys() if 'DATABASE' in key or 'GROQ' in key or 'POSTGRES' in key]
     }
@@ -605,17 +671,17 @@ def debug_info():
             debug_info["database_test_query"] = "success"
             debug_info["sample_count"] = result['count'] if result else 0
             cursor.close()
-            conn.close()
         except Exception as e:
             debug_info["database_test_query"] = f"failed: {str(e)}"
-            if conn:
-                conn.close()
+        finally:
+            release_db_connection(conn)
     
     return jsonify(debug_info)
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """Get database statistics"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -631,7 +697,6 @@ def get_stats():
         total = result['total'] if result else 0
         
         cursor.close()
-        conn.close()
         
         return jsonify({
             'status': 'active',
@@ -645,6 +710,9 @@ def get_stats():
             'total_sanctions': 0,
             'error': str(e)
         }), 500
+    finally:
+        if conn:
+            release_db_connection(conn)
 
 @app.route('/api/screen', methods=['POST', 'OPTIONS'])
 def sanctions_screen():
@@ -660,6 +728,8 @@ def sanctions_screen():
         phonetic_search = data.get('phonetic_search', True)
         language = data.get('language', 'english')
         nationality_filter = data.get('nationality', '').strip()
+        # Nationality, list and PEP restrictions are applied during retrieval
+        filters = SearchFilters.from_request(data)
 
         if not name:
             return jsonify({"success": False, "error": "Name required"}), 400
@@ -677,13 +747,33 @@ def sanctions_screen():
             logger.info(f"🌍 Bilingual processing: {name} -> {english_translation}")
 
         conn = get_db_connection()
+
+        # Repeat screenings of the same counterparty against the same list data
+        ai_requested = bool(use_ai and groq_client)
+        cache_key = None
+        if conn and RESULT_CACHE_ENABLED:
+            data_version = get_data_version(conn)
+            if data_version is not None:
+                cache_key = screening_cache_key(
+                    data_version, normalize_name(name), type=entity_type, **filters.cache_options(),
+                    language=language, phonetic=bool(phonetic_search), ai=ai_requested
+                )
+                cached = result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"⚡ Cache hit for '{name}'")
+                    return jsonify(dict(
+                        cached, name=name, timestamp=datetime.now().isoformat(),
+                        phonetic_suggestions=phonetic_suggestions[:8], cached=True
+                    )), 200
         
         if not conn:
             all_matches = get_demo_data(name, entity_type)
             is_demo_mode = True
         else:
             try:
-                all_matches = enhanced_bilingual_search(name, entity_type, conn, language)
+                if filters.lists:
+                    filters = filters.resolve(conn)
+                all_matches = enhanced_bilingual_search(name, entity_type, conn, language, phonetic_search, filters)
                 logger.info(f"📊 Found {len(all_matches)} potential matches")
                 is_demo_mode = False
             except Exception as e:
@@ -691,91 +781,100 @@ def sanctions_screen():
                 all_matches = get_demo_data(name, entity_type)
                 is_demo_mode = True
 
-        matches = []
+        query_norm = normalize_name(name)
+        query_is_arabic = contains_arabic(name)
+
+        ranked = []
         for entity in all_matches:
-            if nationality_filter:
-                nats = entity.get('nationalities', []) or []
-                if not any(nationality_filter.lower() in (n or '').lower() for n in nats):
-                    continue
+            # Retrieval already applied the filters; demo data and unmapped spellings still need this
+            if filters and not filters.matches(entity):
+                continue
 
             entity_name = entity.get('entity_name', '')
+            name_norm, alias_norms = stored_name_forms(entity)
             
-            # Advanced matching with context detection
-            match_score = calculate_advanced_match_score(name, entity_name)
+            # Advanced matching with context detection; scores at or below the
+            # threshold come back as 0.0 without running every scorer
+            match_score = calculate_advanced_match_score(name, entity_name, query_norm, name_norm, MATCH_THRESHOLD)
             match_context = "exact" if match_score > 0.9 else "phonetic" if match_score > 0.7 else "fuzzy"
             
-            # Check aliases with advanced matching
+            # Check aliases with advanced matching; only one that beats the best so far matters
             alias_scores = []
-            for alias in (entity.get('aliases', []) or [])[:10]:
+            for alias, alias_norm in zip((entity.get('aliases', []) or [])[:10], alias_norms):
                 if alias:
-                    alias_score = calculate_advanced_match_score(name, str(alias))
+                    cutoff = max([MATCH_THRESHOLD, match_score] + alias_scores)
+                    alias_score = calculate_advanced_match_score(name, str(alias), query_norm, alias_norm, cutoff)
                     alias_scores.append(alias_score)
 
+            # Latin queries also meet Arabic-script names through their stored transliteration
+            transliteration = entity.get('latin_transliteration')
+            if transliteration and not query_is_arabic:
+                alias_scores.append(calculate_advanced_match_score(
+                    name, transliteration, query_norm, transliteration, max([MATCH_THRESHOLD, match_score] + alias_scores)
+                ))
+
             best_score = max([match_score] + alias_scores) if alias_scores else match_score
 
-            if best_score > 0.25:  # Reasonable threshold for advanced matching
-                risk = calculate_intelligent_risk_score(entity, best_score, match_context)
-                
-                # Enhanced AI analysis
-                risk_analysis = None
-                match_analysis = None
-                recommendations = None
-                if use_ai and groq_client:
-                    risk_analysis, match_analysis, recommendations = get_ai_enhanced_analysis(
-                        entity, best_score, name, match_context
-                    )
-                
-                # Format data for response
-                aliases = entity.get('aliases', []) or []
-                aliases_str = ', '.join([a for a in aliases if a]) if aliases else 'None'
-                nationalities = entity.get('nationalities', []) or []
-                nats_str = ', '.join([n for n in nationalities if n]) if nationalities else 'Not specified'
-                dob = entity.get('date_of_birth') or entity.get('dob') or 'Not specified'
-                place_of_birth = entity.get('place_of_birth') or entity.get('pob') or 'Not specified'
-                remarks = entity.get('remarks', '') or ''
-                jurisdiction = entity.get('jurisdiction', '') or ''
-                
-                matches.append({
-                    'id': entity.get('id'),
-                    'entity_name': entity.get('entity_name'),
-                    'entity_type': entity.get('entity_type'),
-                    'list_source': entity.get('list_source'),
-                    'program': entity.get('program'),
-                    'nationalities': nats_str,
-                    'aliases': aliases_str,
-                    'date_of_birth': dob,
-                    'place_of_birth': place_of_birth,
-                    'jurisdiction': jurisdiction,
-                    'remarks': remarks,
-                    'is_pep': entity.get('is_pep', False),
-                    'match_score': round(match_score, 3),
-                    'best_fuzzy_score': round(best_score, 3),
-                    'combined_score': round(best_score, 3),
-                    'risk_assessment': risk,
-                    'risk_analysis': risk_analysis,
-                    'match_analysis': match_analysis,
-                    'recommendations': recommendations,
-                    'match_context': match_context,
-                    'phonetic_matches': phonetic_suggestions[:5]
-                })
-
-        matches.sort(key=lambda x: x.get('combined_score', 0), reverse=True)
-        matches = matches[:12]
-
-        # Overall AI intelligence
+            if best_score > MATCH_THRESHOLD:
+                ranked.append((entity, match_score, best_score, match_context))
+
+        # Phase two: only the final matches are hydrated, risk-scored and formatted
+        ranked.sort(key=lambda item: round(item[2], 3), reverse=True)
+        ranked = ranked[:12]
+        match_entities, hydration_failed = hydrate_entities([item[0] for item in ranked], conn)
+
+        matches = []
+        for entity, (_, match_score, best_score, match_context) in zip(match_entities, ranked):
+            risk = calculate_intelligent_risk_score(entity, best_score, match_context)
+            
+            # Format data for response
+            aliases = entity.get('aliases', []) or []
+            aliases_str = ', '.join([a for a in aliases if a]) if aliases else 'None'
+            nationalities = entity.get('nationalities', []) or []
+            nats_str = ', '.join([n for n in nationalities if n]) if nationalities else 'Not specified'
+            dob = entity.get('date_of_birth') or entity.get('dob') or 'Not specified'
+            place_of_birth = entity.get('place_of_birth') or entity.get('pob') or 'Not specified'
+            remarks = entity.get('remarks', '') or ''
+            jurisdiction = entity.get('jurisdiction', '') or ''
+            
+            matches.append({
+                'id': entity.get('id'),
+                'entity_name': entity.get('entity_name'),
+                'entity_type': entity.get('entity_type'),
+                'list_source': entity.get('list_source'),
+                'program': entity.get('program'),
+                'nationalities': nats_str,
+                'aliases': aliases_str,
+                'date_of_birth': dob,
+                'place_of_birth': place_of_birth,
+                'jurisdiction': jurisdiction,
+                'remarks': remarks,
+                'is_pep': entity.get('is_pep', False),
+                'match_score': round(match_score, 3),
+                'best_fuzzy_score': round(best_score, 3),
+                'combined_score': round(best_score, 3),
+                'risk_assessment': risk,
+                'risk_analysis': None,
+                'match_analysis': None,
+                'recommendations': None,
+                'match_context': match_context,
+                'phonetic_matches': phonetic_suggestions[:5]
+            })
+
+        # AI analysis only for the final matches, fanned out concurrently
         overall_ai_intelligence = None
         risk_level = matches[0]['risk_assessment']['level'] if matches else "LOW"
-        if use_ai and groq_client:
+        if use_ai and groq_client and matches:
             search_params = {
                 'type': entity_type,
                 'nationality': nationality_filter,
                 'language': language
             }
-            overall_ai_intelligence = get_overall_ai_intelligence(matches, name, search_params)
+            overall_ai_intelligence = run_parallel_ai_analysis(matches, match_entities, name, search_params)
 
         logger.info(f"✅ Returning {len(matches)} enhanced matches with advanced AI analysis")
 
-        return jsonify({
+        response = {
             "name": name,
             "match_found": len(matches) > 0,
             "matches": [
@@ -805,20 +904,27 @@ def sanctions_screen():
             "ai_intelligence": overall_ai_intelligence,
             "phonetic_suggestions": phonetic_suggestions[:8],
             "total_matches": len(matches)
-        }), 200
+        }
+        # An AI call that timed out would otherwise stay missing until the entry expires
+        ai_complete = not ai_requested or all(m.get('risk_analysis') for m in matches[:AI_TOP_N])
+        # Rows missing their hydrated fields, or from an index still being rebuilt, must not be cached
+        if cache_key and not is_demo_mode and ai_complete and not hydration_failed and not index_refresh_pending():
+            result_cache.set(cache_key, response)
+        return jsonify(response), 200
 
     except Exception as e:
         logger.error(f"❌ Advanced screening error: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": f"Internal server error: {str(e)}"}), 500
     finally:
         if conn:
-            conn.close()
+            release_db_connection(conn)
 
 # Keep other endpoints (register, login, logout) the same as before
 @app.route('/api/register', methods=['POST', 'OPTIONS'])
 def register():
     if request.method == 'OPTIONS':
         return '', 204
+    conn = None
     try:
         data = request.json
         email = data.get('email')
@@ -833,22 +939,24 @@ def register():
         cursor.execute("SELECT id FROM public.profiles WHERE email = %s", (email,))
         if cursor.fetchone():
             cursor.close()
-            conn.close()
             return jsonify({'success': False, 'error': 'Email already registered'}), 400
         cursor.execute("INSERT INTO public.profiles (email, full_name, role) VALUES (%s, %s, 'user') RETURNING id, email, full_name, role", (email, full_name))
         user = cursor.fetchone()
         conn.commit()
         cursor.close()
-        conn.close()
         return jsonify({'success': True, 'user': dict(user), 'message': 'Registration successful'}), 201
     except Exception as e:
         logger.error(f"Registration error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if conn:
+            release_db_connection(conn)
 
 @app.route('/api/login', methods=['POST', 'OPTIONS'])
 def login():
     if request.method == 'OPTIONS':
         return '', 204
+    conn = None
     try:
         data = request.json
         email = data.get('email')
@@ -862,13 +970,15 @@ def login():
         cursor.execute("SELECT id, email, full_name, role, company FROM public.profiles WHERE email = %s", (email,))
         user = cursor.fetchone()
         cursor.close()
-        conn.close()
         if not user:
             return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
         return jsonify({'success': True, 'user': dict(user), 'message': 'Login successful'}), 200
     except Exception as e:
         logger.error(f"Login error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        if conn:
+            release_db_connection(conn)
 
 @app.route('/api/logout', methods=['POST', 'OPTIONS'])
 def logout():
@@ -876,6 +986,25 @@ def logout():
         return '', 204
     return jsonify({'success': True, 'message': 'Logout successful'}), 200
 
+def warm_search_indexes():
+    """Map (or build) the in-memory indexes at startup instead of on the first request"""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        if TYPO_INDEX_ENABLED:
+            get_typo_index(conn, max_age=TYPO_INDEX_MAX_AGE, snapshot=current_snapshot(conn))
+        if PHONETIC_INDEX_ENABLED:
+            get_phonetic_index(conn, max_age=PHONETIC_INDEX_MAX_AGE, snapshot=current_snapshot(conn))
+        load_entity_store(conn)
+    except Exception as e:
+        logger.error(f"❌ Index warm-up failed: {e}")
+    finally:
+        release_db_connection(conn)
+
+if db_available:
+    threading.Thread(target=warm_search_indexes, name="index-warmup", daemon=True).start()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
     logger.info(f"🚀 Starting advanced AI screening server on port {port}")
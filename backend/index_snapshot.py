@@ -0,0 +1,428 @@
+"""
+Versioned, memory-mapped snapshots of the in-memory search indexes.
+
+Building the name, phonetic and typo indexes means a full sanctions_list
+scan per worker per cold start. A snapshot stores each index as flat numpy
+arrays (strings as one UTF-8 blob plus offsets, postings as CSR, key
+lookup through sorted 64-bit hashes). Workers np.load them with
+mmap_mode='r', so opening one takes milliseconds and every process on the
+host shares the same page-cache copy.
+
+Layout: {INDEX_SNAPSHOT_DIR}/v{data_version}/{part}/*.npy + meta.json, one
+part per index. The import pipeline writes all parts once it has bumped
+the data version. Otherwise, the first worker to build an index from the
+database writes that part under a file lock, and the other workers wait
+and map it.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from result_cache import get_data_version
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_SNAPSHOT_ENABLED = os.environ.get("INDEX_SNAPSHOT_ENABLED", "true").lower() == "true"
+INDEX_SNAPSHOT_DIR = os.environ.get(
+    "INDEX_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "complianceai_index_snapshot")
+)
+# Bumped whenever the on-disk layout changes; older parts are ignored
+SNAPSHOT_FORMAT = 1
+# Versions kept on disk besides the current one (workers may still map them)
+KEEP_VERSIONS = 1
+
+
+def stable_hash(text: str) -> int:
+    """64-bit hash that is the same in every process (str.__hash__ is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+class StringColumn(Sequence):
+    """Strings stored as one UTF-8 blob plus offsets; rows flagged in nulls read as None"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, nulls: Optional[np.ndarray] = None):
+        self.blob = blob
+        self.offsets = offsets
+        self.nulls = nulls
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode('utf-8')
+
+
+class ListColumn(Sequence):
+    """Row i is the tuple items[offsets[i]:offsets[i + 1]] of a flat StringColumn"""
+
+    def __init__(self, items: StringColumn, offsets: np.ndarray):
+        self.items = items
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return tuple(self.items[j] for j in range(self.offsets[i], self.offsets[i + 1]))
+
+
+class IntColumn(Sequence):
+    """int64 array that hands out Python ints (psycopg2 can't adapt numpy scalars)"""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return int(self.values[i])
+
+
+class Categorical(Sequence):
+    """Per-row codes into a short list of distinct values"""
+
+    def __init__(self, codes: np.ndarray, categories: List[Any]):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.categories[self.codes[i]]
+
+
+class CSR(Sequence):
+    """Row i is values[offsets[i]:offsets[i + 1]], a zero-copy slice"""
+
+    def __init__(self, offsets: np.ndarray, values: np.ndarray):
+        self.offsets = offsets
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+
+class KeyLookup:
+    """str -> row number through sorted stable hashes, verified against the stored key"""
+
+    def __init__(self, keys: StringColumn, hashes: np.ndarray, order: np.ndarray):
+        self.keys = keys
+        self.hashes = hashes
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def find(self, key: str) -> Optional[int]:
+        h = stable_hash(key)
+        i = int(np.searchsorted(self.hashes, h))
+        while i < len(self.hashes) and self.hashes[i] == h:
+            row = int(self.order[i])
+            if self.keys[row] == key:
+                return row
+            i += 1
+        return None
+
+    def __contains__(self, key) -> bool:
+        return self.find(key) is not None
+
+    def __getitem__(self, key: str) -> int:
+        row = self.find(key)
+        if row is None:
+            raise KeyError(key)
+        return row
+
+    def get(self, key: str, default=None):
+        row = self.find(key)
+        return default if row is None else row
+
+
+class FrozenPostings(Mapping):
+    """Read-only key -> doc list mapping with the dict interface the indexes use"""
+
+    def __init__(self, lookup: KeyLookup, rows: CSR):
+        self.lookup = lookup
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.lookup)
+
+    def __iter__(self):
+        return iter(self.lookup.keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self.lookup
+
+    def __getitem__(self, key: str) -> List[int]:
+        return self.rows[self.lookup[key]].tolist()
+
+    def get(self, key: str, default=None):
+        row = self.lookup.find(key)
+        return default if row is None else self.rows[row].tolist()
+
+
+class FrozenMap(Mapping):
+    """Read-only str -> value mapping over a KeyLookup and an encoded StringColumn"""
+
+    def __init__(self, lookup: KeyLookup, values: StringColumn, decode=None):
+        self.lookup = lookup
+        self.values = values
+        self.decode = decode or (lambda value: value)
+
+    def __len__(self) -> int:
+        return len(self.lookup)
+
+    def __iter__(self):
+        return iter(self.lookup.keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self.lookup
+
+    def __getitem__(self, key: str):
+        return self.decode(self.values[self.lookup[key]])
+
+    def get(self, key: str, default=None):
+        row = self.lookup.find(key)
+        return default if row is None else self.decode(self.values[row])
+
+
+class PartWriter:
+    """Collects one index's arrays into a directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta: Dict[str, Any] = {'format': SNAPSHOT_FORMAT}
+        os.makedirs(path)
+
+    def array(self, name: str, values: np.ndarray) -> None:
+        np.save(os.path.join(self.path, f"{name}.npy"), np.ascontiguousarray(values))
+
+    def strings(self, name: str, values: Iterable[Optional[str]]) -> None:
+        values = list(values)
+        if any(v is None for v in values):
+            self.array(f"{name}.nulls", np.fromiter((v is None for v in values), dtype=np.bool_, count=len(values)))
+            self.meta[f"{name}.nullable"] = True
+        encoded = [(v or '').encode('utf-8') for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        self.array(f"{name}.offsets", offsets)
+        self.array(f"{name}.blob", np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+    def string_lists(self, name: str, rows: Sequence[Sequence[str]]) -> None:
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in rows], out=offsets[1:])
+        self.strings(f"{name}.items", [item for row in rows for item in row])
+        self.array(f"{name}.offsets", offsets)
+
+    def values(self, name: str, values: Sequence[Any]) -> None:
+        """Entity ids: int64 when they are all integers, strings otherwise"""
+        if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in values):
+            self.array(name, np.asarray(values, dtype=np.int64))
+            self.meta[f"{name}.kind"] = 'int'
+        else:
+            self.strings(name, [str(v) for v in values])
+            self.meta[f"{name}.kind"] = 'str'
+
+    def lookup(self, name: str, keys: Sequence[str]) -> None:
+        self.strings(f"{name}.keys", keys)
+        hashes = np.fromiter((stable_hash(k) for k in keys), dtype=np.int64, count=len(keys))
+        order = np.argsort(hashes, kind='stable')
+        self.array(f"{name}.hashes", hashes[order])
+        self.array(f"{name}.order", order.astype(np.int64))
+
+    def csr(self, name: str, rows: Sequence[Iterable[int]]) -> None:
+        rows = [np.fromiter(r, dtype=np.int32) if not isinstance(r, np.ndarray) else r for r in rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in rows], out=offsets[1:])
+        self.array(f"{name}.offsets", offsets)
+        self.array(f"{name}.values", np.concatenate(rows).astype(np.int32) if rows else np.empty(0, np.int32))
+
+    def postings(self, name: str, postings: Mapping[str, Iterable[int]]) -> None:
+        keys = list(postings)
+        self.lookup(name, keys)
+        self.csr(name, [sorted(postings[k]) for k in keys])
+
+    def mapping(self, name: str, mapping: Mapping[str, Any], encode=None) -> None:
+        keys = list(mapping)
+        self.lookup(name, keys)
+        encode = encode or (lambda value: value)
+        self.strings(f"{name}.values", [encode(mapping[k]) for k in keys])
+
+    def categorical(self, name: str, values: Sequence[Any]) -> None:
+        categories: Dict[Any, int] = {}
+        codes = np.fromiter((categories.setdefault(v, len(categories)) for v in values),
+                            dtype=np.uint32, count=len(values))
+        self.array(name, codes)
+        self.meta[f"{name}.categories"] = list(categories)
+
+    def close(self) -> None:
+        # meta.json last: a part without it is incomplete and never opened
+        with open(os.path.join(self.path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+
+
+class PartReader:
+    """Memory-mapped view of one index's arrays"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"snapshot format {self.meta.get('format')} != {SNAPSHOT_FORMAT}")
+
+    def array(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+
+    def strings(self, name: str) -> StringColumn:
+        nulls = self.array(f"{name}.nulls") if self.meta.get(f"{name}.nullable") else None
+        return StringColumn(self.array(f"{name}.blob"), self.array(f"{name}.offsets"), nulls)
+
+    def string_lists(self, name: str) -> ListColumn:
+        return ListColumn(self.strings(f"{name}.items"), self.array(f"{name}.offsets"))
+
+    def values(self, name: str) -> Sequence[Any]:
+        if self.meta.get(f"{name}.kind") == 'int':
+            return IntColumn(self.array(name))
+        return self.strings(name)
+
+    def lookup(self, name: str) -> KeyLookup:
+        return KeyLookup(self.strings(f"{name}.keys"), self.array(f"{name}.hashes"), self.array(f"{name}.order"))
+
+    def csr(self, name: str) -> CSR:
+        return CSR(self.array(f"{name}.offsets"), self.array(f"{name}.values"))
+
+    def postings(self, name: str) -> FrozenPostings:
+        return FrozenPostings(self.lookup(name), self.csr(name))
+
+    def mapping(self, name: str, decode=None) -> FrozenMap:
+        return FrozenMap(self.lookup(name), self.strings(f"{name}.values"), decode)
+
+    def categorical(self, name: str, convert=None) -> Categorical:
+        categories = self.meta[f"{name}.categories"]
+        if convert is not None:
+            categories = [convert(c) for c in categories]
+        return Categorical(self.array(name), categories)
+
+
+class Snapshot:
+    """The snapshot directory for one sanctions data version"""
+
+    def __init__(self, base_dir: str, version: int):
+        self.base_dir = base_dir
+        self.version = version
+        self.path = os.path.join(base_dir, f"v{version}")
+
+    def _part_path(self, part: str) -> str:
+        return os.path.join(self.path, part)
+
+    def has(self, part: str) -> bool:
+        return os.path.exists(os.path.join(self._part_path(part), 'meta.json'))
+
+    def built_at(self, part: str) -> Optional[float]:
+        """When `part` was written, None if it doesn't exist"""
+        try:
+            return os.path.getmtime(os.path.join(self._part_path(part), 'meta.json'))
+        except OSError:
+            return None
+
+    def part(self, part: str) -> PartReader:
+        return PartReader(self._part_path(part))
+
+    @contextmanager
+    def lock(self, part: str):
+        """Host-wide lock so only one worker builds a missing part"""
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            lock_file = open(os.path.join(self.path, f"{part}.lock"), 'w')
+        except OSError as e:
+            # Read-only or missing volume: build without coordinating rather than not at all
+            logger.warning(f"⚠️ Index snapshot lock unavailable: {e}")
+            yield
+            return
+        with lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self, part: str, index) -> bool:
+        """Write index.save_snapshot() output as this version's `part`; False if it could not be written"""
+        start = time.time()
+        tmp_path = f"{self._part_path(part)}.tmp-{os.getpid()}"
+        try:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+            writer = PartWriter(tmp_path)
+            index.save_snapshot(writer)
+            writer.close()
+            # A part rebuilt after max_age replaces the old one; workers that mapped it keep their open files
+            old_path = f"{self._part_path(part)}.old-{os.getpid()}"
+            if os.path.exists(self._part_path(part)):
+                os.rename(self._part_path(part), old_path)
+            os.rename(tmp_path, self._part_path(part))
+            shutil.rmtree(old_path, ignore_errors=True)
+        except OSError as e:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if self.has(part):
+                # Another process finished the same part first
+                return True
+            logger.warning(f"⚠️ Index snapshot {part} v{self.version} not written: {e}")
+            return False
+        logger.info(f"💾 Index snapshot {part} v{self.version} written in {time.time() - start:.1f}s")
+        prune_snapshots(self.base_dir, self.version)
+        return True
+
+
+def prune_snapshots(base_dir: str, current: int, keep: int = KEEP_VERSIONS) -> None:
+    """Delete all but the `keep` newest versions older than current; mapped files stay valid until unmapped"""
+    try:
+        versions = sorted(
+            int(name[1:]) for name in os.listdir(base_dir)
+            if name.startswith('v') and name[1:].isdigit()
+        )
+    except OSError:
+        return
+    older = [v for v in versions if v < current]
+    for version in older[:max(0, len(older) - keep)]:
+        shutil.rmtree(os.path.join(base_dir, f"v{version}"), ignore_errors=True)
+
+
+_snapshot: Optional[Snapshot] = None
+
+
+def current_snapshot(conn, base_dir: str = INDEX_SNAPSHOT_DIR) -> Optional[Snapshot]:
+    """Snapshot for the current data version; None if snapshots are off or the version is unknown"""
+    global _snapshot
+    if not INDEX_SNAPSHOT_ENABLED:
+        return None
+    version = get_data_version(conn)
+    if version is None:
+        return None
+    if _snapshot is None or _snapshot.version != version or _snapshot.base_dir != base_dir:
+        _snapshot = Snapshot(base_dir, version)
+    return _snapshot
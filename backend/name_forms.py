@@ -0,0 +1,103 @@
+"""
+Normalized and transliterated name forms shared by ingestion and scoring.
+
+The importers store normalized_name, normalized_aliases and
+latin_transliteration on every sanctions_list row using these functions,
+and the screening endpoints read the stored values instead of normalizing
+each candidate per request. Rows loaded by older scripts have NULLs and
+are normalized on the fly by the same code.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+NAME_PREFIXES = ['mr.', 'mrs.', 'ms.', 'dr.', 'prof.', 'hon.']
+
+NAME_FORM_COLUMNS = ['normalized_name', 'normalized_aliases', 'latin_transliteration']
+
+SCHEMA_SQL = [
+    "ALTER TABLE sanctions_list ADD COLUMN IF NOT EXISTS normalized_name TEXT",
+    "ALTER TABLE sanctions_list ADD COLUMN IF NOT EXISTS normalized_aliases TEXT[]",
+    "ALTER TABLE sanctions_list ADD COLUMN IF NOT EXISTS latin_transliteration TEXT",
+]
+
+# Arabic to English transliteration mapping
+ARABIC_TO_ENGLISH = {
+    'ا': 'a', 'أ': 'a', 'إ': 'e', 'آ': 'a', 'ى': 'a', 'ة': 'h',
+    'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j', 'ح': 'h', 'خ': 'kh',
+    'د': 'd', 'ذ': 'th', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh',
+    'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh',
+    'ف': 'f', 'ق': 'q', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n',
+    'ه': 'h', 'و': 'w', 'ي': 'y', 'ئ': 'e', 'ؤ': 'o', 'ء': "'"
+}
+
+_ARABIC = re.compile('[\u0600-\u06FF]')
+
+
+def normalize_name(name: str) -> str:
+    """Normalize names for better matching"""
+    if not name:
+        return ""
+    normalized = ' '.join(name.lower().strip().split())
+    for prefix in NAME_PREFIXES:
+        if normalized.startswith(prefix):
+            normalized = normalized[len(prefix):].strip()
+    return normalized
+
+
+def contains_arabic(text):
+    """Check if text contains Arabic characters"""
+    return bool(_ARABIC.search(text))
+
+
+def transliterate_arabic_to_english(text):
+    """Transliterate Arabic text to English"""
+    result = []
+    for char in text:
+        if char in ARABIC_TO_ENGLISH:
+            result.append(ARABIC_TO_ENGLISH[char])
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def normalize_aliases(aliases: Any) -> Optional[List[str]]:
+    """normalize_name of each alias, index-aligned with the stored aliases array"""
+    if not isinstance(aliases, (list, tuple)):
+        return None
+    return [normalize_name(str(a)) if a else '' for a in aliases]
+
+
+def latin_transliteration(entity_name: Any) -> Optional[str]:
+    """Normalized Latin spelling of an Arabic-script name, None for other scripts"""
+    if not entity_name or not contains_arabic(str(entity_name)):
+        return None
+    return normalize_name(transliterate_arabic_to_english(str(entity_name)))
+
+
+def with_name_forms(record: Dict[str, Any]) -> Dict[str, Any]:
+    """record with normalized_name, normalized_aliases and latin_transliteration filled in"""
+    name = str(record.get('entity_name') or '')
+    record['normalized_name'] = normalize_name(name)
+    record['normalized_aliases'] = normalize_aliases(record.get('aliases'))
+    record['latin_transliteration'] = latin_transliteration(name)
+    return record
+
+
+def stored_name_forms(entity: Dict[str, Any]):
+    """(normalized_name, normalized_aliases) of a sanctions_list row, computed if the row predates them"""
+    name_norm = entity.get('normalized_name')
+    if name_norm is None:
+        name_norm = normalize_name(entity.get('entity_name', '') or '')
+    aliases = entity.get('aliases', []) or []
+    alias_norms = entity.get('normalized_aliases')
+    if alias_norms is None or len(alias_norms) != len(aliases):
+        alias_norms = [normalize_name(str(a)) if a else '' for a in aliases]
+    return name_norm, alias_norms
+
+
+def ensure_name_form_columns(conn) -> None:
+    """Add the normalized name columns if this database predates them"""
+    with conn.cursor() as cursor:
+        for statement in SCHEMA_SQL:
+            cursor.execute(statement)
+    conn.commit()
@@ -0,0 +1,346 @@
+"""
+In-memory candidate index over sanctions_list names and aliases.
+
+Holds a token inverted index and a character trigram index so screening
+can pick candidate ids without running ILIKE scans against Postgres.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+LOAD_BATCH_SIZE = 20000
+# Trigrams that appear in more than this share of all keys carry almost no
+# signal ("moh", "ali", "ahm") and are skipped once rarer grams are available.
+MAX_GRAM_DF_RATIO = 0.05
+
+_NON_WORD = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_key(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    if not text:
+        return ""
+    return ' '.join(_NON_WORD.sub(' ', str(text).lower()).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a normalized key into tokens worth indexing"""
+    return [t for t in normalize_key(text).split() if len(t) > 1]
+
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> set:
+    """Padded character n-grams of a normalized key"""
+    key = normalize_key(text)
+    if not key:
+        return set()
+    padded = f" {key} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def coerce_aliases(aliases: Any) -> List[str]:
+    """Aliases are stored as arrays, JSON strings or delimited text depending on the importer"""
+    if not aliases:
+        return []
+    if isinstance(aliases, (list, tuple)):
+        return [str(a) for a in aliases if a]
+    text = str(aliases).strip()
+    if text.startswith('['):
+        try:
+            return [str(a) for a in json.loads(text) if a]
+        except ValueError:
+            pass
+    if text.startswith('{') and text.endswith('}'):
+        text = text[1:-1]
+    separator = '|' if '|' in text else ','
+    return [a.strip().strip('"') for a in text.split(separator) if a.strip().strip('"')]
+
+
+_interned: Dict[Any, Any] = {}
+
+
+def filter_fields(list_source: Any, is_pep: Any, nationalities: Any) -> tuple:
+    """(list_source, is_pep, nationalities) an index keeps per entity for SearchFilters.admits"""
+    fields = (
+        None if list_source is None else str(list_source),
+        bool(is_pep),
+        tuple(coerce_aliases(nationalities)),
+    )
+    # A million rows share a few hundred distinct combinations
+    return _interned.setdefault(fields, fields)
+
+
+class NameIndex:
+    """Token + trigram inverted index mapping name keys to sanctions_list ids"""
+
+    def __init__(self, ngram_size: int = NGRAM_SIZE):
+        self.ngram_size = ngram_size
+        self.entity_ids: List[Any] = []
+        self.entity_types: List[str] = []
+        # (list_source, is_pep, nationalities) per entity, checked by SearchFilters.admits
+        self.doc_fields: List[tuple] = []
+        self.token_postings: Dict[str, set] = defaultdict(set)
+        self.gram_postings: Dict[str, set] = defaultdict(set)
+        self.key_count = 0
+        self.loaded_at: Optional[float] = None
+        # Sanctions data version the index was built or mapped for, when known
+        self.data_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.entity_ids)
+
+    def add(self, entity_id: Any, entity_name: str, aliases: Any = None, entity_type: str = '',
+            list_source: Optional[str] = None, is_pep: Any = False, nationalities: Any = None) -> int:
+        """Index one entity under its name and every alias"""
+        doc = len(self.entity_ids)
+        self.entity_ids.append(entity_id)
+        self.entity_types.append((entity_type or '').lower())
+        self.doc_fields.append(filter_fields(list_source, is_pep, nationalities))
+
+        for key in [entity_name] + coerce_aliases(aliases):
+            if not key:
+                continue
+            self.key_count += 1
+            for token in tokenize(key):
+                self.token_postings[token].add(doc)
+            for gram in char_ngrams(key, self.ngram_size):
+                self.gram_postings[gram].add(doc)
+        return doc
+
+    def load_from_db(self, conn, batch_size: int = LOAD_BATCH_SIZE) -> 'NameIndex':
+        """Stream names, aliases and filter fields from sanctions_list into the index"""
+        start = time.time()
+        # Named cursor keeps the result set server-side and pages through it
+        with conn.cursor(name='name_index_load') as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(
+                "SELECT id, entity_name, entity_type, aliases, list_source, is_pep, nationalities FROM sanctions_list"
+            )
+            for row in cursor:
+                self.add(row['id'], row['entity_name'], row['aliases'], row['entity_type'],
+                         row['list_source'], row['is_pep'], row['nationalities'])
+        conn.commit()
+        self.loaded_at = time.time()
+        logger.info(
+            f"📚 Name index loaded: {len(self):,} entities, {self.key_count:,} keys, "
+            f"{len(self.token_postings):,} tokens, {len(self.gram_postings):,} grams "
+            f"in {self.loaded_at - start:.1f}s"
+        )
+        return self
+
+    def save_snapshot(self, writer) -> None:
+        """Write the index as flat arrays (index_snapshot.PartWriter)"""
+        writer.values('entity_ids', self.entity_ids)
+        writer.categorical('entity_types', self.entity_types)
+        writer.categorical('doc_fields', self.doc_fields)
+        writer.postings('tokens', self.token_postings)
+        writer.postings('grams', self.gram_postings)
+        writer.meta.update(ngram_size=self.ngram_size, key_count=self.key_count)
+
+    @classmethod
+    def from_snapshot(cls, reader) -> 'NameIndex':
+        """Index backed by a memory-mapped snapshot part (index_snapshot.PartReader)"""
+        start = time.time()
+        index = cls(reader.meta['ngram_size'])
+        index.entity_ids = reader.values('entity_ids')
+        index.entity_types = reader.categorical('entity_types')
+        index.doc_fields = reader.categorical('doc_fields', convert=lambda fields: filter_fields(*fields))
+        index.token_postings = reader.postings('tokens')
+        index.gram_postings = reader.postings('grams')
+        index.key_count = reader.meta['key_count']
+        index.loaded_at = time.time()
+        logger.info(
+            f"📚 Name index mapped from snapshot: {len(index):,} entities, {len(index.gram_postings):,} grams "
+            f"in {(index.loaded_at - start) * 1000:.0f}ms"
+        )
+        return index
+
+    def candidate_scores(self, name: str, entity_type: Optional[str] = None, filters=None) -> Dict[int, float]:
+        """Score index docs by shared tokens and trigrams with the query"""
+        grams = char_ngrams(name, self.ngram_size)
+        if not grams:
+            return {}
+
+        max_df = max(1, int(self.key_count * MAX_GRAM_DF_RATIO))
+        postings = [self.gram_postings[g] for g in grams if g in self.gram_postings]
+        selective = [p for p in postings if len(p) <= max_df]
+        if selective:
+            postings = selective
+
+        scores: Dict[int, float] = defaultdict(float)
+        gram_weight = 1.0 / len(grams)
+        for posting in postings:
+            for doc in posting:
+                scores[doc] += gram_weight
+
+        # A whole shared token is worth far more than a couple of trigrams
+        for token in tokenize(name):
+            for doc in self.token_postings.get(token, ()):
+                scores[doc] += 1.0
+
+        if entity_type:
+            wanted = entity_type.lower()
+            scores = {doc: s for doc, s in scores.items() if self.entity_types[doc] == wanted}
+        if filters:
+            scores = {doc: s for doc, s in scores.items() if filters.admits(*self.doc_fields[doc])}
+        return scores
+
+    def search(self, name: str, entity_type: Optional[str] = None, limit: int = 200,
+               filters=None) -> List[Any]:
+        """Return the ids of the top `limit` candidates for a query name"""
+        scores = self.candidate_scores(name, entity_type, filters)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [self.entity_ids[doc] for doc, _ in best]
+
+
+def index_is_fresh(index, max_age: Optional[float] = None, snapshot=None) -> bool:
+    """True while an index matches the snapshot's data version and its data is younger than max_age.
+
+    max_age bounds the age even when the version is unchanged: scripts
+    writing through the Supabase API don't always move the version.
+    """
+    if index is None:
+        return False
+    if max_age is not None and time.time() - index.loaded_at >= max_age:
+        return False
+    if snapshot is not None and index.data_version is not None:
+        return index.data_version == snapshot.version
+    return True
+
+
+def load_index(cls, part: str, conn, snapshot=None, max_age: Optional[float] = None):
+    """Map `part` from the snapshot if it exists, else build cls from the database and save it there.
+
+    snapshot is an index_snapshot.Snapshot (or None). Only one worker per
+    host builds a missing part, or one older than max_age; the others wait
+    on its lock, then map it. A mapped index's loaded_at is when the part
+    was built, so its age is the age of the data.
+    """
+    if snapshot is None:
+        return cls().load_from_db(conn)
+    with snapshot.lock(part):
+        built_at = snapshot.built_at(part)
+        if built_at is not None and (max_age is None or time.time() - built_at < max_age):
+            try:
+                index = cls.from_snapshot(snapshot.part(part))
+                index.data_version = snapshot.version
+                index.loaded_at = built_at
+                return index
+            except Exception as e:
+                logger.warning(f"⚠️ Snapshot {part} v{snapshot.version} unreadable, loading from database: {e}")
+        index = cls().load_from_db(conn)
+        index.data_version = snapshot.version
+        snapshot.save(part, index)
+        return index
+
+
+# Seconds before a failed background refresh is tried again
+INDEX_REFRESH_RETRY = 30
+
+
+_shared_indexes: List['SharedIndex'] = []
+
+
+class SharedIndex:
+    """Process-wide index that is rebuilt off the request path.
+
+    The first request loads it inline, as there is nothing to serve yet.
+    After that a stale index keeps being returned while one background
+    thread loads the replacement on its own pooled connection and swaps it in.
+    `stale` is set meanwhile, so callers can keep those results out of caches.
+    """
+
+    def __init__(self, cls, part: str, label: str):
+        self.cls = cls
+        self.part = part
+        self.label = label
+        self.current = None
+        self.stale = False
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh: Optional[threading.Thread] = None
+        self._failed_at = 0.0
+        _shared_indexes.append(self)
+
+    def get(self, conn, max_age: Optional[float] = None, snapshot=None):
+        index = self.current
+        if index_is_fresh(index, max_age, snapshot):
+            return index
+        if index is not None:
+            self.stale = True
+            self._start_refresh(max_age, snapshot)
+            return index
+
+        with self._load_lock:
+            if self.current is not None:
+                return self.current
+            try:
+                self.current = load_index(self.cls, self.part, conn, snapshot, max_age)
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"❌ {self.label} load failed: {e}")
+            return self.current
+
+    def _start_refresh(self, max_age: Optional[float], snapshot) -> None:
+        with self._refresh_lock:
+            if self._refresh is not None and self._refresh.is_alive():
+                return
+            if time.time() - self._failed_at < INDEX_REFRESH_RETRY:
+                return
+            self._refresh = threading.Thread(
+                target=self._reload, args=(max_age, snapshot), name=f"{self.part}-index-refresh", daemon=True)
+            self._refresh.start()
+
+    def _reload(self, max_age: Optional[float], snapshot) -> None:
+        # Imported here: scripts load this module as backend.name_index, without db_pool on the path
+        from db_pool import get_db_connection, release_db_connection
+
+        conn = get_db_connection()
+        if conn is None:
+            self._failed_at = time.time()
+            logger.error(f"❌ {self.label} refresh skipped: no database connection")
+            return
+        try:
+            index = load_index(self.cls, self.part, conn, snapshot, max_age)
+        except Exception as e:
+            conn.rollback()
+            self._failed_at = time.time()
+            # Keep serving from the stale index rather than failing every request
+            logger.error(f"❌ {self.label} refresh failed, still serving the old one: {e}")
+            return
+        finally:
+            release_db_connection(conn)
+        self.current = index
+        self.stale = False
+        logger.info(f"🔄 {self.label} refreshed in the background")
+
+
+def index_refresh_pending() -> bool:
+    """True while any shared index is serving data older than the current version"""
+    return any(shared.stale for shared in _shared_indexes)
+
+
+_shared = SharedIndex(NameIndex, 'name', 'Name index')
+
+
+def get_name_index(conn, max_age: Optional[float] = None, snapshot=None) -> Optional[NameIndex]:
+    """Process-wide index, mapped or built on first use and refreshed in the background once stale"""
+    return _shared.get(conn, max_age, snapshot)
+
+
+def build_name_index(rows: Iterable[Dict[str, Any]]) -> NameIndex:
+    """Build an index from already-fetched rows (demo data, fixtures)"""
+    index = NameIndex()
+    for row in rows:
+        index.add(row.get('id'), row.get('entity_name'), row.get('aliases'), row.get('entity_type'),
+                  row.get('list_source'), row.get('is_pep'), row.get('nationalities'))
+    index.loaded_at = time.time()
+    return index
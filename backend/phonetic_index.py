@@ -0,0 +1,214 @@
+"""
+Phonetic keys for sanctions_list names, computed once when the index loads.
+
+Every name and alias gets its full-string soundex / metaphone / NYSIIS /
+match-rating codes (what advanced_phonetic_matching compares) plus
+per-token metaphone and NYSIIS keys in an inverted index, so phonetic
+candidate retrieval is a dict lookup and candidate codes are never
+recomputed while scoring a request.
+"""
+import logging
+import sys
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import jellyfish
+
+from name_forms import normalize_name
+from name_index import SharedIndex, coerce_aliases, filter_fields, tokenize
+
+logger = logging.getLogger(__name__)
+
+LOAD_BATCH_SIZE = 20000
+QUERY_CODE_CACHE_SIZE = 50000
+# Token keys shared by more than this share of all names ("MHMT") are only
+# used when the query has nothing rarer to go on
+MAX_KEY_DF_RATIO = 0.02
+
+Codes = Tuple[str, str, str, Optional[str]]
+CODES_SEPARATOR = '\x1f'
+
+
+def compute_codes(text: str) -> Codes:
+    """(soundex, metaphone, nysiis, match_rating_codex) of a whole string"""
+    try:
+        mra = jellyfish.match_rating_codex(text)
+    except Exception:
+        # Digits and punctuation are rejected; such names never match on MRA
+        mra = None
+    return (
+        sys.intern(jellyfish.soundex(text)),
+        sys.intern(jellyfish.metaphone(text)),
+        sys.intern(jellyfish.nysiis(text)),
+        None if mra is None else sys.intern(mra),
+    )
+
+
+_cached_codes = lru_cache(maxsize=QUERY_CODE_CACHE_SIZE)(compute_codes)
+
+
+def token_keys(text: str) -> set:
+    """Per-token metaphone and NYSIIS keys used for retrieval"""
+    keys = set()
+    for token in tokenize(text):
+        metaphone = jellyfish.metaphone(token)
+        if metaphone:
+            keys.add('M:' + metaphone)
+        nysiis = jellyfish.nysiis(token)
+        if nysiis:
+            keys.add('N:' + nysiis)
+    return keys
+
+
+def encode_codes(codes: Codes) -> str:
+    """One snapshot string per name; an empty match-rating code stands for None"""
+    return CODES_SEPARATOR.join(code or '' for code in codes)
+
+
+def decode_codes(text: str) -> Codes:
+    soundex, metaphone, nysiis, mra = text.split(CODES_SEPARATOR)
+    return soundex, metaphone, nysiis, mra or None
+
+
+def codes_similarity(codes1: Codes, codes2: Codes) -> float:
+    """Share of the four phonetic codes two strings have in common"""
+    matched = sum(1 for a, b in zip(codes1[:3], codes2[:3]) if a == b)
+    if codes1[3] is not None and codes1[3] == codes2[3]:
+        matched += 1
+    return matched / 4.0
+
+
+class PhoneticIndex:
+    """Per-name phonetic codes plus a token-key inverted index over sanctions_list ids"""
+
+    def __init__(self):
+        self.entity_ids: List[Any] = []
+        self.entity_types: List[str] = []
+        # (list_source, is_pep, nationalities) per entity, checked by SearchFilters.admits
+        self.doc_fields: List[tuple] = []
+        self.codes: Dict[str, Codes] = {}
+        self.key_postings: Dict[str, set] = defaultdict(set)
+        self.key_count = 0
+        self.loaded_at: Optional[float] = None
+        self.data_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.entity_ids)
+
+    def add(self, entity_id: Any, entity_name: str, aliases: Any = None, entity_type: str = '',
+            list_source: Optional[str] = None, is_pep: Any = False, nationalities: Any = None) -> int:
+        """Index one entity under the phonetic keys of its name and every alias"""
+        doc = len(self.entity_ids)
+        self.entity_ids.append(entity_id)
+        self.entity_types.append((entity_type or '').lower())
+        self.doc_fields.append(filter_fields(list_source, is_pep, nationalities))
+
+        for name in [entity_name] + coerce_aliases(aliases):
+            key = normalize_name(name or '')
+            if not key:
+                continue
+            self.key_count += 1
+            if key not in self.codes:
+                self.codes[key] = compute_codes(key)
+            for token_key in token_keys(key):
+                self.key_postings[token_key].add(doc)
+        return doc
+
+    def load_from_db(self, conn, batch_size: int = LOAD_BATCH_SIZE) -> 'PhoneticIndex':
+        """Stream names, aliases and filter fields from sanctions_list into the index"""
+        start = time.time()
+        with conn.cursor(name='phonetic_index_load') as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(
+                "SELECT id, entity_name, entity_type, aliases, list_source, is_pep, nationalities FROM sanctions_list"
+            )
+            for row in cursor:
+                self.add(row['id'], row['entity_name'], row['aliases'], row['entity_type'],
+                         row['list_source'], row['is_pep'], row['nationalities'])
+        conn.commit()
+        self.loaded_at = time.time()
+        logger.info(
+            f"🔊 Phonetic index loaded: {len(self):,} entities, {len(self.codes):,} names, "
+            f"{len(self.key_postings):,} keys in {self.loaded_at - start:.1f}s"
+        )
+        return self
+
+    def save_snapshot(self, writer) -> None:
+        """Write the index as flat arrays (index_snapshot.PartWriter)"""
+        writer.values('entity_ids', self.entity_ids)
+        writer.categorical('entity_types', self.entity_types)
+        writer.categorical('doc_fields', self.doc_fields)
+        writer.mapping('codes', self.codes, encode=encode_codes)
+        writer.postings('keys', self.key_postings)
+        writer.meta.update(key_count=self.key_count)
+
+    @classmethod
+    def from_snapshot(cls, reader) -> 'PhoneticIndex':
+        """Index backed by a memory-mapped snapshot part (index_snapshot.PartReader)"""
+        start = time.time()
+        index = cls()
+        index.entity_ids = reader.values('entity_ids')
+        index.entity_types = reader.categorical('entity_types')
+        index.doc_fields = reader.categorical('doc_fields', convert=lambda fields: filter_fields(*fields))
+        index.codes = reader.mapping('codes', decode=decode_codes)
+        index.key_postings = reader.postings('keys')
+        index.key_count = reader.meta['key_count']
+        index.loaded_at = time.time()
+        logger.info(
+            f"🔊 Phonetic index mapped from snapshot: {len(index):,} entities, {len(index.codes):,} names "
+            f"in {(index.loaded_at - start) * 1000:.0f}ms"
+        )
+        return index
+
+    def search(self, name: str, entity_type: Optional[str] = None, limit: int = 50,
+               filters=None) -> List[Any]:
+        """Ids of the entities sharing the most token keys with the query"""
+        keys = token_keys(name)
+        postings = [self.key_postings[k] for k in keys if k in self.key_postings]
+        max_df = max(1, int(self.key_count * MAX_KEY_DF_RATIO))
+        selective = [p for p in postings if len(p) <= max_df]
+        if selective:
+            postings = selective
+
+        scores: Dict[int, int] = defaultdict(int)
+        for posting in postings:
+            for doc in posting:
+                scores[doc] += 1
+
+        if entity_type:
+            wanted = entity_type.lower()
+            scores = {doc: s for doc, s in scores.items() if self.entity_types[doc] == wanted}
+        if filters:
+            scores = {doc: s for doc, s in scores.items() if filters.admits(*self.doc_fields[doc])}
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [self.entity_ids[doc] for doc, _ in best]
+
+
+_shared = SharedIndex(PhoneticIndex, 'phonetic', 'Phonetic index')
+
+
+def get_phonetic_index(conn, max_age: Optional[float] = None, snapshot=None) -> Optional[PhoneticIndex]:
+    """Process-wide index, mapped or built on first use and refreshed in the background once stale"""
+    return _shared.get(conn, max_age, snapshot)
+
+
+def build_phonetic_index(rows: Iterable[Dict[str, Any]]) -> PhoneticIndex:
+    """Build an index from already-fetched rows (demo data, fixtures)"""
+    index = PhoneticIndex()
+    for row in rows:
+        index.add(row.get('id'), row.get('entity_name'), row.get('aliases'), row.get('entity_type'),
+                  row.get('list_source'), row.get('is_pep'), row.get('nationalities'))
+    index.loaded_at = time.time()
+    return index
+
+
+def phonetic_codes(text: str) -> Codes:
+    """Codes of a normalize_name()d name: precomputed for indexed names, cached for queries"""
+    index = _shared.current
+    if index is not None:
+        codes = index.codes.get(text)
+        if codes is not None:
+            return codes
+    return _cached_codes(text)
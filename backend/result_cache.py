@@ -0,0 +1,241 @@
+"""
+Two-tier cache for /api/screen responses.
+
+Keys combine the normalized query, the request options that change the
+response and the sanctions data version. Loaders bump the version in
+sanctions_data_version, and a statement trigger on sanctions_list bumps it
+for any other writer, so a list change makes every older entry
+unreachable without any explicit purge. The first tier is a per-process
+LRU with a TTL; the second is a directory of JSON files shared by every
+worker on the host.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 2048))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 900))
+RESULT_CACHE_DIR = os.environ.get(
+    "RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "complianceai_result_cache")
+)
+# A backstop for writes that move no version (trigger not installed yet, edits
+# to other tables): a stale "no match" is never served for long
+RESULT_CACHE_DISK_TTL = float(os.environ.get("RESULT_CACHE_DISK_TTL", 1800))
+# How long a worker trusts the data version it last read before asking again
+DATA_VERSION_TTL = float(os.environ.get("DATA_VERSION_TTL", 30))
+# Expired files are swept after this many disk writes
+DISK_PRUNE_EVERY = 500
+
+DATA_VERSION_SCHEMA_SQL = [
+    "CREATE TABLE IF NOT EXISTS sanctions_data_version ("
+    " id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),"
+    " version BIGINT NOT NULL DEFAULT 0,"
+    " updated_at TIMESTAMPTZ NOT NULL DEFAULT now())",
+    "INSERT INTO sanctions_data_version (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING",
+    # Writers that never call bump_data_version (Supabase API scripts, the SQL
+    # editor) still move the version, once per statement
+    """
+    CREATE OR REPLACE FUNCTION bump_sanctions_data_version() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE sanctions_data_version SET version = version + 1, updated_at = now();
+        RETURN NULL;
+    END
+    $$
+    """,
+    "DROP TRIGGER IF EXISTS sanctions_data_version_bump ON sanctions_list",
+    "CREATE TRIGGER sanctions_data_version_bump AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sanctions_list"
+    " FOR EACH STATEMENT EXECUTE PROCEDURE bump_sanctions_data_version()",
+]
+
+
+def ensure_data_version_table(conn) -> None:
+    """Create the single-row version table and its sanctions_list trigger if this database predates them"""
+    with conn.cursor() as cursor:
+        for statement in DATA_VERSION_SCHEMA_SQL:
+            cursor.execute(statement)
+    conn.commit()
+
+
+def bump_data_version(conn) -> int:
+    """Mark the sanctions data as changed; cached screening results stop matching"""
+    ensure_data_version_table(conn)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "UPDATE sanctions_data_version SET version = version + 1, updated_at = now() RETURNING version"
+        )
+        row = cursor.fetchone()
+    conn.commit()
+    return row['version'] if isinstance(row, dict) else row[0]
+
+
+_version: Optional[int] = None
+_version_checked_at = 0.0
+_version_lock = threading.Lock()
+
+
+def get_data_version(conn, max_age: float = DATA_VERSION_TTL) -> Optional[int]:
+    """Current data version, re-read at most every max_age seconds; None if unknown"""
+    global _version, _version_checked_at
+    if time.time() - _version_checked_at < max_age:
+        return _version
+
+    with _version_lock:
+        if time.time() - _version_checked_at < max_age:
+            return _version
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT version FROM sanctions_data_version")
+                row = cursor.fetchone()
+            conn.commit()
+            version = None if row is None else (row['version'] if isinstance(row, dict) else row[0])
+        except Exception as e:
+            conn.rollback()
+            # No version table means no safe invalidation, so results are not cached
+            logger.warning(f"⚠️ Data version unavailable, result cache bypassed: {e}")
+            version = None
+        if version != _version and _version is not None:
+            logger.info(f"🔄 Sanctions data version {_version} -> {version}")
+        _version, _version_checked_at = version, time.time()
+        return version
+
+
+def screening_cache_key(data_version: int, name: str, **options: Any) -> str:
+    """Stable key for a normalized query, its response-affecting options and the data version"""
+    payload = json.dumps({'v': data_version, 'name': name, **options}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """In-process LRU+TTL in front of a shared on-disk JSON tier"""
+
+    def __init__(self, size: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL,
+                 cache_dir: Optional[str] = RESULT_CACHE_DIR, disk_ttl: float = RESULT_CACHE_DISK_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.disk_ttl = disk_ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"⚠️ Result cache directory unavailable, memory tier only: {e}")
+                self.cache_dir = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value, now)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, value, time.time())
+        self._write_disk(key, value)
+
+    def _remember(self, key: str, value: Dict[str, Any], now: float) -> None:
+        self._memory[key] = (now + self.ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) > self.disk_ttl:
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False, default=str)
+            # Readers in other workers see the old file or the new one, never half of it
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Result cache write failed: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._disk_writes += 1
+        if self._disk_writes % DISK_PRUNE_EVERY == 0:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Delete expired files; entries of superseded data versions are unreachable and age out too"""
+        if not self.cache_dir:
+            return 0
+        cutoff = time.time() - self.disk_ttl
+        removed = 0
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+                            removed += 1
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'enabled': RESULT_CACHE_ENABLED,
+                'data_version': _version,
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                'disk_dir': self.cache_dir,
+            }
@@ -0,0 +1,173 @@
+"""
+Screening filters pushed down into candidate retrieval.
+
+Nationality, list source and PEP restrictions used to be applied in Python
+after every candidate had been fetched. SearchFilters turns them into SQL
+predicates on indexed sanctions_list columns (nationality_codes GIN,
+(entity_type, list_source, is_pep) btree) and into checks the in-memory
+indexes run before they rank and truncate, so filtered-out rows never use
+up a top-K slot.
+"""
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from countries import canonical_country
+
+logger = logging.getLogger(__name__)
+
+# Distinct list_source values change only on import
+SOURCES_MAX_AGE = 600
+
+_sources: Optional[List[str]] = None
+_sources_loaded_at = 0.0
+_sources_lock = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _source_pattern(requested: str):
+    # "UN" selects "UN Consolidated List" but not "UNITED KINGDOM"
+    return re.compile(r'(?<!\w)' + re.escape(requested) + r'(?!\w)', re.IGNORECASE)
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(v).strip() for v in value if v and str(v).strip()]
+
+
+def _as_bool(value: Any) -> Optional[bool]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def list_sources(conn, max_age: float = SOURCES_MAX_AGE) -> List[str]:
+    """Distinct sanctions_list.list_source values, re-read at most every max_age seconds"""
+    global _sources, _sources_loaded_at
+    if _sources is not None and time.time() - _sources_loaded_at < max_age:
+        return _sources
+
+    with _sources_lock:
+        if _sources is not None and time.time() - _sources_loaded_at < max_age:
+            return _sources
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT list_source FROM sanctions_list WHERE list_source IS NOT NULL GROUP BY list_source")
+            rows = cursor.fetchall()
+        conn.commit()
+        _sources = [row['list_source'] for row in rows]
+        _sources_loaded_at = time.time()
+        return _sources
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Nationality, list-source and PEP restrictions for one screening request"""
+    nationality: Optional[str] = None
+    # Requested names ("OFAC", "UN"); a source matches if it contains one as a word
+    lists: Tuple[str, ...] = ()
+    is_pep: Optional[bool] = None
+    # Stored list_source values the requested lists resolved to, once a connection was available
+    resolved_sources: Optional[Tuple[str, ...]] = None
+
+    @classmethod
+    def from_request(cls, data: Dict[str, Any]) -> 'SearchFilters':
+        """Filters from an /api/screen body: nationality, lists (or list_sources) and is_pep"""
+        nationality = (data.get('nationality') or '').strip()
+        lists = _as_list(data.get('lists') or data.get('list_sources'))
+        return cls(
+            nationality=nationality or None,
+            lists=tuple(dict.fromkeys(lists)),
+            is_pep=_as_bool(data.get('is_pep')),
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.nationality or self.lists or self.is_pep is not None)
+
+    @property
+    def nationality_code(self) -> Optional[str]:
+        return canonical_country(self.nationality)
+
+    def resolve(self, conn) -> 'SearchFilters':
+        """Copy with the requested lists mapped to the exact list_source values in the database"""
+        if not self.lists:
+            return self
+        try:
+            known = list_sources(conn)
+        except Exception as e:
+            conn.rollback()
+            # Unresolved lists are still enforced on the fetched rows by matches()
+            logger.warning(f"⚠️ List sources unavailable, list filter applied after retrieval: {e}")
+            return self
+        sources = tuple(s for s in known if self.source_allowed(s))
+        logger.info(f"🗂️ Lists {list(self.lists)} -> {list(sources)}")
+        return SearchFilters(self.nationality, self.lists, self.is_pep, sources)
+
+    def source_allowed(self, list_source: Optional[str]) -> bool:
+        if not self.lists:
+            return True
+        return bool(list_source) and any(_source_pattern(r).search(list_source) for r in self.lists)
+
+    def admits(self, list_source: Optional[str], is_pep: Any, nationalities: Sequence[str]) -> bool:
+        """Whether a row with these fields passes; nationalities may be codes or raw spellings"""
+        if self.is_pep is not None and bool(is_pep) != self.is_pep:
+            return False
+        code = self.nationality_code
+        # A nationality we can't map to a country is left to matches()
+        if code is not None and not any(canonical_country(n) == code for n in nationalities or ()):
+            return False
+        return self.source_allowed(list_source)
+
+    def matches(self, entity: Dict[str, Any]) -> bool:
+        """Whether a fetched sanctions_list row (or demo record) passes"""
+        if self.nationality and self.nationality_code is None:
+            # The old substring match on the raw nationalities
+            wanted = self.nationality.lower()
+            if not any(wanted in (n or '').lower() for n in (entity.get('nationalities', []) or [])):
+                return False
+        codes = entity.get('nationality_codes')
+        if codes is None:
+            codes = entity.get('nationalities')
+        return self.admits(entity.get('list_source'), entity.get('is_pep'), codes)
+
+    def sql(self, alias: str = 's') -> Tuple[str, Dict[str, Any]]:
+        """(" AND ..." predicate on the aliased sanctions_list, its named parameters)"""
+        clauses, params = [], {}
+        code = self.nationality_code
+        if code:
+            # Rows loaded without codes are kept here and checked by matches() on the raw nationalities
+            clauses.append(
+                f"({alias}.nationality_codes @> ARRAY[%(f_nationality)s]::text[] OR {alias}.nationality_codes IS NULL)"
+            )
+            params['f_nationality'] = code
+        if self.is_pep is not None:
+            clauses.append(f"{alias}.is_pep = %(f_is_pep)s")
+            params['f_is_pep'] = self.is_pep
+        if self.lists and self.resolved_sources is not None:
+            clauses.append(f"{alias}.list_source = ANY(%(f_sources)s::text[])")
+            params['f_sources'] = list(self.resolved_sources)
+        return ''.join(f"\n  AND {c}" for c in clauses), params
+
+    def cache_options(self) -> Dict[str, Any]:
+        """Filter values for the result cache key"""
+        return {
+            'nationality': self.nationality_code or (self.nationality or '').lower(),
+            'lists': sorted(r.lower() for r in self.lists),
+            'is_pep': self.is_pep,
+        }
+
+
+def filter_sql(filters: Optional[SearchFilters], alias: str = 's') -> Tuple[str, Dict[str, Any]]:
+    """SearchFilters.sql, or nothing when there are no filters"""
+    if not filters:
+        return '', {}
+    return filters.sql(alias)
+
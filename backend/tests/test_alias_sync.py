@@ -0,0 +1,142 @@
+"""sanctions_alias stays in step with sanctions_list whichever way a row is written.
+
+Needs a scratch Postgres with pg_trgm available: set TEST_DATABASE_URL. Each
+test runs in its own schema, dropped afterwards.
+"""
+import importlib.util
+import os
+import uuid
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2.extras import RealDictCursor
+
+from backend.alias_table import backfill_missing_aliases, ensure_alias_table
+from backend.name_index import coerce_aliases, normalize_key
+from trigram_search import trigram_candidates
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCREENING_SCRIPT = os.path.join(os.path.dirname(__file__), '..', '..', 'scripts', 'add_screening_function.py')
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+MADBOULY = {
+    'id': 'eg-pep-2', 'entity_name': 'Mostafa Madbouly', 'entity_type': 'individual',
+    'list_source': 'Egypt-Government-PEP', 'is_pep': True, 'nationalities': ['EG', 'Egypt'],
+    'aliases': ['Moustafa Madbouli'],
+}
+
+
+@pytest.fixture
+def conn():
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor)
+    schema = f"alias_sync_test_{uuid.uuid4().hex[:8]}"
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(f"CREATE SCHEMA {schema}")
+        cursor.execute(f"SET search_path TO {schema}, public")
+        cursor.execute("""
+            CREATE TABLE sanctions_list (
+                id TEXT PRIMARY KEY, entity_name TEXT, entity_type TEXT, list_source TEXT,
+                program TEXT, is_pep BOOLEAN, nationalities TEXT[], nationality_codes TEXT[],
+                aliases TEXT[], date_of_birth TEXT
+            )
+        """)
+    conn.commit()
+    ensure_alias_table(conn)
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+def insert(conn, entity):
+    """A plain INSERT, as the Supabase and upload scripts write"""
+    columns = list(entity)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO sanctions_list ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+            [entity[c] for c in columns]
+        )
+    conn.commit()
+
+
+def alias_norms(conn, entity_id):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT alias_norm FROM sanctions_alias WHERE entity_id = %s ORDER BY alias_norm", (entity_id,))
+        return [row['alias_norm'] for row in cursor.fetchall()]
+
+
+def retrieved_ids(conn, name):
+    return [row['id'] for row in trigram_candidates([name], 'individual', conn) or []]
+
+
+def test_inserted_row_without_alias_rows_is_still_retrievable(conn):
+    insert(conn, MADBOULY)
+    assert alias_norms(conn, MADBOULY['id']) == ['mostafa madbouly', 'moustafa madbouli']
+    assert MADBOULY['id'] in retrieved_ids(conn, 'Mostafa Madbouly')
+    assert MADBOULY['id'] in retrieved_ids(conn, 'Moustafa Madbouli')
+
+
+def test_updates_and_deletes_follow_the_row(conn):
+    insert(conn, MADBOULY)
+    with conn.cursor() as cursor:
+        cursor.execute("UPDATE sanctions_list SET aliases = %s WHERE id = %s", (['Mustafa Madbuli'], MADBOULY['id']))
+        # Columns other than the name and aliases leave the alias rows alone
+        cursor.execute("UPDATE sanctions_list SET is_pep = false WHERE id = %s", (MADBOULY['id'],))
+    conn.commit()
+    assert alias_norms(conn, MADBOULY['id']) == ['mostafa madbouly', 'mustafa madbuli']
+
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM sanctions_list WHERE id = %s", (MADBOULY['id'],))
+    conn.commit()
+    assert alias_norms(conn, MADBOULY['id']) == []
+    assert MADBOULY['id'] not in retrieved_ids(conn, 'Mostafa Madbouly')
+
+
+def test_backfill_covers_rows_written_without_the_triggers(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("ALTER TABLE sanctions_list DISABLE TRIGGER USER")
+    insert(conn, MADBOULY)
+    with conn.cursor() as cursor:
+        cursor.execute("ALTER TABLE sanctions_list ENABLE TRIGGER USER")
+    conn.commit()
+    assert alias_norms(conn, MADBOULY['id']) == []
+
+    assert backfill_missing_aliases(conn) == 1
+    assert MADBOULY['id'] in retrieved_ids(conn, 'Mostafa Madbouly')
+    assert backfill_missing_aliases(conn) == 0
+
+
+def test_screen_sanctions_returns_rows_written_outside_the_importer(conn):
+    spec = importlib.util.spec_from_file_location('add_screening_function', SCREENING_SCRIPT)
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+    with conn.cursor() as cursor:
+        for statement in script.sql_commands:
+            cursor.execute(statement)
+    conn.commit()
+
+    insert(conn, MADBOULY)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT id FROM screen_sanctions(%s, p_entity_type => 'individual')", ('Mostafa Madbouly',))
+        assert [row['id'] for row in cursor.fetchall()] == [MADBOULY['id']]
+
+
+@pytest.mark.parametrize("name", ["AL-QAIDA", "RI U’N SO’NG", "Abdel Fattah el-Sisi", "  Kim  Jong_Un ", "مصطفى مدبولي"])
+def test_sql_key_matches_normalize_key(conn, name):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sanctions_alias_key(%s) AS key", (name,))
+        assert cursor.fetchone()['key'] == normalize_key(name)
+
+
+@pytest.mark.parametrize("aliases", ['["Al-Sisi", "El-Sisi"]', '{"Al-Sisi","El-Sisi"}', 'Al-Sisi|El-Sisi', 'Al-Sisi, El-Sisi'])
+def test_sql_alias_parsing_matches_coerce_aliases(conn, aliases):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT sanctions_alias_array(%s::text) AS items", (aliases,))
+        assert cursor.fetchone()['items'] == coerce_aliases(aliases)
@@ -0,0 +1,78 @@
+"""batch_scoring must give exactly the scores of the fuzzywuzzy calculate_fuzzy_score composite"""
+import pytest
+
+fuzz = pytest.importorskip("fuzzywuzzy.fuzz")
+# Without python-Levenshtein fuzzywuzzy falls back to difflib, which the production scores never used
+pytest.importorskip("Levenshtein")
+
+from batch_scoring import fuzzy_scores, score_entities
+from name_forms import normalize_name
+
+PAIRS = [
+    ("Vladimir Putin", "Vladimir Putin"),
+    ("Madbouly", "Mostafa Madbouly"),
+    ("Putin Vladimir", "Vladimir Putin"),
+    ("Vladmir Putn", "Vladimir Putin"),
+    ("Vladimir Vladimirovich Putin", "Vladimir Putin"),
+    ("Usama bin Ladin", "Osama Bin Laden"),
+    ("Muammar Gaddafi", "MUAMMAR MOHAMMED ABU MINYAR QADHAFI"),
+    ("Kim Jong Eun", "Kim Jong Un"),
+    ("Hizballah", "Hezbollah"),
+    ("Rossiya Bank", "Bank Rossiya"),
+    ("Al-Shabab", "AL-SHABAAB"),
+    ("Mr. Sameh Shoukry", "Sameh Shukri"),
+    ("José Álvarez", "Jose Alvarez"),
+    ("Maria Gonzalez Ortega", "Mostafa Madbouly"),
+    ("Northwind Traders", "Blue Meadow Dairy Cooperative"),
+    ("Kim Jong Un", ""),
+]
+
+
+def reference_score(str1: str, str2: str) -> float:
+    """calculate_fuzzy_score from the Flask backends, on fuzzywuzzy"""
+    if not str1 or not str2:
+        return 0.0
+    str1_norm = normalize_name(str1)
+    str2_norm = normalize_name(str2)
+    if str1_norm == str2_norm:
+        return 1.0
+    if str1_norm in str2_norm or str2_norm in str1_norm:
+        return 0.95
+    ratio = fuzz.ratio(str1_norm, str2_norm) / 100.0
+    partial = fuzz.partial_ratio(str1_norm, str2_norm) / 100.0
+    token_sort = fuzz.token_sort_ratio(str1_norm, str2_norm) / 100.0
+    token_set = fuzz.token_set_ratio(str1_norm, str2_norm) / 100.0
+    score = (ratio * 0.15 + partial * 0.25 + token_sort * 0.25 + token_set * 0.35)
+    return round(score, 3)
+
+
+@pytest.mark.parametrize("query,choice", PAIRS)
+def test_single_pair_matches_reference(query, choice):
+    assert fuzzy_scores(query, [choice]) == [reference_score(query, choice)]
+
+
+def test_batch_matches_reference():
+    query = "Vladimir Putin"
+    choices = [choice for _, choice in PAIRS]
+    assert fuzzy_scores(query, choices) == [reference_score(query, c) for c in choices]
+
+
+def test_cutoff_only_zeroes_scores_below_it():
+    query = "Muammar Gaddafi"
+    choices = [choice for _, choice in PAIRS]
+    cutoff = 0.5
+    expected = [s if s >= cutoff else 0.0 for s in (reference_score(query, c) for c in choices)]
+    assert fuzzy_scores(query, choices, score_cutoff=cutoff) == expected
+
+
+def test_score_entities_uses_best_of_name_and_aliases():
+    entity = {
+        'entity_name': 'AIMAN MUHAMMED RABI AL-ZAWAHIRI',
+        'aliases': ['Ayman al-Zawahiri', 'Dr. Ayman'],
+    }
+    query = "Ayman al-Zawahiri"
+    name_score, best, matched_alias = score_entities(query, [entity])[0]
+    alias_scores = [reference_score(query, a) for a in entity['aliases']]
+    assert name_score == reference_score(query, entity['entity_name'])
+    assert best == max([name_score] + alias_scores)
+    assert matched_alias == 'Ayman al-Zawahiri'
@@ -0,0 +1,69 @@
+"""plan_delta round trips: a plan applied to the stored keys leaves nothing to do on the next run"""
+from backend.delta_sync import keyed_record, plan_delta
+
+
+def make_records():
+    return [
+        {'list_source': 'UN', 'source_key': 'QDi.001', 'entity_name': 'Aiman Al-Zawahiri', 'entity_type': 'individual'},
+        {'list_source': 'UN', 'source_key': 'QDe.004', 'entity_name': 'Al-Qaida', 'entity_type': 'entity'},
+        {'list_source': 'OFAC', 'source_key': '12345', 'entity_name': 'Bank Rossiya', 'entity_type': 'entity'},
+        {'list_source': 'OFAC', 'source_key': None, 'entity_name': 'Hezbollah', 'entity_type': 'entity'},
+    ]
+
+
+def stored_after(plan, stored=None):
+    """The (list_source, source_key) -> (id, content_hash) map once plan has been applied"""
+    stored = dict(stored or {})
+    for row_id in plan.deletes:
+        stored = {identity: value for identity, value in stored.items() if value[0] != row_id}
+    for record in plan.inserts + plan.updates:
+        stored[(record['list_source'], record['source_key'])] = (record['id'], record['content_hash'])
+    return stored
+
+
+def test_first_run_inserts_everything():
+    plan = plan_delta(make_records(), {})
+    assert plan.summary() == {'inserted': 4, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'skipped': 0}
+    assert plan.sources == ['OFAC', 'UN']
+    assert len({record['id'] for record in plan.inserts}) == 4
+
+
+def test_second_run_with_same_records_is_a_no_op():
+    stored = stored_after(plan_delta(make_records(), {}))
+    plan = plan_delta(make_records(), stored)
+    assert plan.summary() == {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 4, 'skipped': 0}
+
+
+def test_changed_and_removed_records():
+    stored = stored_after(plan_delta(make_records(), {}))
+    records = make_records()
+    records[0]['entity_name'] = 'Ayman al-Zawahiri'
+    del records[1]
+
+    plan = plan_delta(records, stored)
+    assert plan.summary() == {'inserted': 0, 'updated': 1, 'deleted': 1, 'unchanged': 2, 'skipped': 0}
+    # An update keeps the stored id, so references to the row stay valid
+    assert plan.updates[0]['id'] == stored[('UN', 'QDi.001')][0]
+    assert plan.deletes == [stored[('UN', 'QDe.004')][0]]
+
+    stored = stored_after(plan, stored)
+    assert plan_delta(records, stored).summary()['unchanged'] == 3
+
+
+def test_sources_missing_from_the_run_keep_their_rows():
+    stored = stored_after(plan_delta(make_records(), {}))
+    un_only = [r for r in make_records() if r['list_source'] == 'UN']
+    plan = plan_delta(un_only, stored)
+    assert plan.sources == ['UN']
+    assert plan.deletes == []
+
+
+def test_duplicate_keys_are_skipped():
+    records = make_records() + [make_records()[0]]
+    assert plan_delta(records, {}).skipped == 1
+
+
+def test_content_hash_ignores_bookkeeping_columns():
+    record = make_records()[2]
+    assert keyed_record(record)['content_hash'] == keyed_record(dict(record, id='x', created_at='2024-01-01'))['content_hash']
+    assert keyed_record(record)['content_hash'] != keyed_record(dict(record, program='RUSSIA-EO14024'))['content_hash']
@@ -0,0 +1,93 @@
+"""A snapshot part maps back to an index that answers exactly like the one that was saved"""
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from index_snapshot import Snapshot
+from name_index import NameIndex, build_name_index, index_is_fresh, load_index
+
+ROWS = [
+    {'id': 101, 'entity_name': 'Vladimir Putin', 'aliases': ['Vladimir Vladimirovich Putin'],
+     'entity_type': 'individual', 'list_source': 'EU', 'is_pep': True, 'nationalities': ['Russia']},
+    {'id': 102, 'entity_name': 'Bank Rossiya', 'aliases': None,
+     'entity_type': 'entity', 'list_source': 'OFAC', 'is_pep': False, 'nationalities': None},
+    {'id': 103, 'entity_name': 'AIMAN MUHAMMED RABI AL-ZAWAHIRI', 'aliases': '["Ayman al-Zawahiri", "Dr. Ayman"]',
+     'entity_type': 'individual', 'list_source': 'UN', 'is_pep': False, 'nationalities': ['Egypt']},
+    {'id': 104, 'entity_name': 'Hezbollah', 'aliases': 'Hizballah|Party of God',
+     'entity_type': 'entity', 'list_source': 'UN', 'is_pep': False, 'nationalities': None},
+]
+QUERIES = ['Vladimir Putin', 'Rossiya', 'Ayman Zawahiri', 'Hizbollah', 'Maria Gonzalez Ortega']
+
+
+def fixture_index_class(loads):
+    class FixtureIndex(NameIndex):
+        """NameIndex whose "database" is ROWS"""
+
+        def load_from_db(self, conn, batch_size=0):
+            loads.append(conn)
+            for row in ROWS:
+                self.add(row['id'], row['entity_name'], row['aliases'], row['entity_type'],
+                         row['list_source'], row['is_pep'], row['nationalities'])
+            self.loaded_at = time.time()
+            return self
+
+    return FixtureIndex
+
+
+def test_name_index_round_trip(tmp_path):
+    built = build_name_index(ROWS)
+    snapshot = Snapshot(str(tmp_path), 7)
+    assert snapshot.save('name', built)
+
+    mapped = NameIndex.from_snapshot(snapshot.part('name'))
+    assert len(mapped) == len(built)
+    assert list(mapped.entity_ids) == built.entity_ids
+    assert [mapped.entity_types[i] for i in range(len(built))] == built.entity_types
+    assert [mapped.doc_fields[i] for i in range(len(built))] == built.doc_fields
+    assert mapped.key_count == built.key_count
+    for token, docs in built.token_postings.items():
+        assert sorted(mapped.token_postings[token]) == sorted(docs)
+    for query in QUERIES:
+        assert mapped.candidate_scores(query) == pytest.approx(built.candidate_scores(query))
+        assert mapped.candidate_scores(query, 'entity') == pytest.approx(built.candidate_scores(query, 'entity'))
+
+
+def test_load_index_builds_once_then_maps(tmp_path):
+    loads = []
+    cls = fixture_index_class(loads)
+    snapshot = Snapshot(str(tmp_path), 7)
+
+    built = load_index(cls, 'name', 'conn', snapshot)
+    assert loads == ['conn']
+    assert snapshot.has('name')
+    assert built.data_version == 7
+
+    mapped = load_index(cls, 'name', 'conn', snapshot)
+    assert loads == ['conn']
+    assert mapped.data_version == 7
+    # A mapped index is as old as the part, not as the mapping
+    assert mapped.loaded_at == snapshot.built_at('name')
+    assert list(mapped.entity_ids) == built.entity_ids
+
+
+def test_load_index_rebuilds_a_part_older_than_max_age(tmp_path):
+    loads = []
+    cls = fixture_index_class(loads)
+    snapshot = Snapshot(str(tmp_path), 7)
+    load_index(cls, 'name', 'conn', snapshot)
+
+    rebuilt = load_index(cls, 'name', 'conn', snapshot, max_age=0)
+    assert len(loads) == 2
+    assert len(rebuilt) == len(ROWS)
+    assert snapshot.has('name')
+
+
+def test_index_is_fresh_follows_version_and_age():
+    index = build_name_index(ROWS)
+    index.data_version = 7
+    assert index_is_fresh(index, max_age=60, snapshot=Snapshot('/nonexistent', 7))
+    assert not index_is_fresh(index, max_age=60, snapshot=Snapshot('/nonexistent', 8))
+    index.loaded_at = time.time() - 120
+    assert not index_is_fresh(index, max_age=60, snapshot=Snapshot('/nonexistent', 7))
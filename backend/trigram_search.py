@@ -0,0 +1,116 @@
+"""
+pg_trgm candidate retrieval for sanctions_list.
+
+Prefers the sanctions_alias table (backend/alias_table.py), where names and
+aliases share one trigram index, and otherwise uses the sanctions_norm()/
+sanctions_alias_norm() expression indexes from scripts/add_trigram_index.py.
+Postgres picks the top-K rows by similarity in one indexed query; the
+Python scorers only rerank that short list.
+"""
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Sequence
+
+from entity_store import scoring_projection
+from name_index import normalize_key
+from search_filters import filter_sql
+
+logger = logging.getLogger(__name__)
+
+TRGM_SEARCH_ENABLED = os.environ.get("TRGM_SEARCH_ENABLED", "true").lower() == "true"
+TRGM_TOP_K = int(os.environ.get("TRGM_TOP_K", 200))
+# pg_trgm's default is 0.3; a little lower keeps transliteration variants
+TRGM_MIN_SIMILARITY = float(os.environ.get("TRGM_MIN_SIMILARITY", 0.25))
+# After a failure (migration not applied yet) don't retry on every request
+TRGM_RETRY_AFTER = 300
+
+# {filters} takes SearchFilters.sql() so nationality/list/PEP restrictions
+# apply before LIMIT rather than after. {columns} is the scoring projection;
+# the full rows of the final matches are fetched afterwards.
+TRGM_QUERY = """
+WITH q AS (SELECT sanctions_norm(%(name)s) AS q)
+SELECT {columns},
+       GREATEST(similarity(sanctions_norm(s.entity_name), q.q),
+                word_similarity(q.q, sanctions_alias_norm(s.aliases))) AS trgm_score
+FROM sanctions_list s, q
+WHERE s.entity_type = %(entity_type)s
+  AND (sanctions_norm(s.entity_name) %% q.q OR q.q <%% sanctions_alias_norm(s.aliases)){filters}
+ORDER BY trgm_score DESC
+LIMIT %(limit)s
+"""
+
+# alias_norm is written by alias_table.alias_rows with the same normalize_key;
+# word_similarity keeps short partial queries against long aliases, as TRGM_QUERY does
+ALIAS_QUERY = """
+WITH hits AS (
+    SELECT entity_id,
+           MAX(GREATEST(similarity(alias_norm, %(q)s), word_similarity(%(q)s, alias_norm))) AS trgm_score
+    FROM sanctions_alias
+    WHERE alias_norm %% %(q)s OR %(q)s <%% alias_norm
+    GROUP BY entity_id
+)
+SELECT {columns}, h.trgm_score
+FROM hits h
+JOIN sanctions_list s ON s.id = h.entity_id
+WHERE s.entity_type = %(entity_type)s{filters}
+ORDER BY h.trgm_score DESC
+LIMIT %(limit)s
+"""
+
+_unavailable_until = 0.0
+_alias_table_unavailable_until = 0.0
+
+
+def _query_names(cursor, query: str, columns: str, names: Sequence[str], entity_type: str, limit: int,
+                 filters=None) -> Dict:
+    clause, filter_params = filter_sql(filters)
+    query = query.format(columns=columns, filters=clause)
+    results: Dict = {}
+    for name in names:
+        if not name:
+            continue
+        params = {'name': name, 'q': normalize_key(name), 'entity_type': entity_type, 'limit': limit}
+        cursor.execute(query, {**params, **filter_params})
+        for row in cursor.fetchall():
+            current = results.get(row['id'])
+            if current is None or row['trgm_score'] > current['trgm_score']:
+                results[row['id']] = row
+    return results
+
+
+def trigram_candidates(names: Sequence[str], entity_type: str, conn, limit: int = TRGM_TOP_K,
+                       min_similarity: float = TRGM_MIN_SIMILARITY, filters=None) -> Optional[List[Dict]]:
+    """Top-`limit` most similar rows for each name, or None when trigram search is unavailable"""
+    global _unavailable_until, _alias_table_unavailable_until
+    if not TRGM_SEARCH_ENABLED or time.time() < _unavailable_until:
+        return None
+
+    results = None
+    if time.time() >= _alias_table_unavailable_until:
+        try:
+            with conn.cursor() as cursor:
+                # SET LOCAL only lasts until the request's transaction ends
+                cursor.execute("SET LOCAL pg_trgm.similarity_threshold = %s", (min_similarity,))
+                cursor.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", (min_similarity,))
+                results = _query_names(cursor, ALIAS_QUERY, scoring_projection(conn), names, entity_type, limit, filters)
+        except Exception as e:
+            conn.rollback()
+            _alias_table_unavailable_until = time.time() + TRGM_RETRY_AFTER
+            logger.warning(f"⚠️ sanctions_alias unavailable, using expression indexes: {e}")
+
+    if results is None:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SET LOCAL pg_trgm.similarity_threshold = %s", (min_similarity,))
+                cursor.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", (min_similarity,))
+                results = _query_names(cursor, TRGM_QUERY, scoring_projection(conn), names, entity_type, limit, filters)
+        except Exception as e:
+            conn.rollback()
+            _unavailable_until = time.time() + TRGM_RETRY_AFTER
+            logger.warning(f"⚠️ Trigram search unavailable, falling back to ILIKE: {e}")
+            return None
+
+    ranked = sorted(results.values(), key=lambda row: row['trgm_score'], reverse=True)
+    logger.info(f"🔤 Trigram search: {len(ranked)} candidates")
+    return ranked
@@ -0,0 +1,250 @@
+"""
+SymSpell-style typo index over sanctions_list name tokens.
+
+Every distinct token is stored under all strings reachable by deleting up
+to max_distance characters from its prefix (symmetric delete). A query
+token generates its own deletes, so candidate tokens within the edit
+distance are found with a handful of lookups instead of trying spelling
+variants one ILIKE at a time. Deletes are kept as sorted hash arrays rather
+than a dict of strings, which keeps a few million entries in tens of MB.
+Snapshots store them under stable_hash instead of the per-process hash().
+"""
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from rapidfuzz.distance import OSA
+
+from index_snapshot import stable_hash
+from name_index import SharedIndex, coerce_aliases, filter_fields, tokenize
+
+logger = logging.getLogger(__name__)
+
+LOAD_BATCH_SIZE = 20000
+MAX_EDIT_DISTANCE = 2
+# SymSpell's prefix trick: only deletes of the first PREFIX_LENGTH characters are indexed
+PREFIX_LENGTH = 7
+# Tokens shared by more than this share of all entities ("mohammed") are only
+# used when the query has nothing rarer to go on
+MAX_TOKEN_DF_RATIO = 0.02
+
+
+def allowed_distance(token: str, max_distance: int = MAX_EDIT_DISTANCE) -> int:
+    """Edit budget for a token: two typos in a 3-letter token match almost anything"""
+    if len(token) <= 3:
+        return 0
+    if len(token) <= 5:
+        return min(1, max_distance)
+    return max_distance
+
+
+def deletes(word: str, max_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH) -> Set[str]:
+    """word's prefix plus every string made by deleting up to max_distance characters from it"""
+    prefix = word[:prefix_length]
+    results = {prefix}
+    frontier = {prefix}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+class TypoIndex:
+    """Token vocabulary with symmetric-delete lookup and token -> entity postings"""
+
+    def __init__(self, max_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.entity_ids: List[Any] = []
+        self.entity_types: List[str] = []
+        # (list_source, is_pep, nationalities) per entity, checked by SearchFilters.admits
+        self.doc_fields: List[tuple] = []
+        self.tokens: List[str] = []
+        self.token_ids: Dict[str, int] = {}
+        self.postings: List[Any] = []
+        self.delete_hashes = np.empty(0, dtype=np.int64)
+        self.delete_tokens = np.empty(0, dtype=np.int32)
+        # hash() is fastest to build with but differs per process; mapped snapshots use stable_hash
+        self.hash = hash
+        self.loaded_at: Optional[float] = None
+        self.data_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.entity_ids)
+
+    def add(self, entity_id: Any, entity_name: str, aliases: Any = None, entity_type: str = '',
+            list_source: Optional[str] = None, is_pep: Any = False, nationalities: Any = None) -> int:
+        """Record the tokens of one entity's name and aliases; call finalize() when done"""
+        doc = len(self.entity_ids)
+        self.entity_ids.append(entity_id)
+        self.entity_types.append((entity_type or '').lower())
+        self.doc_fields.append(filter_fields(list_source, is_pep, nationalities))
+
+        tokens = set()
+        for name in [entity_name] + coerce_aliases(aliases):
+            tokens.update(tokenize(name or ''))
+        for token in tokens:
+            token_id = self.token_ids.get(token)
+            if token_id is None:
+                token_id = self.token_ids[token] = len(self.tokens)
+                self.tokens.append(token)
+                self.postings.append([])
+            self.postings[token_id].append(doc)
+        return doc
+
+    def delete_arrays(self, hash_fn) -> Tuple[np.ndarray, np.ndarray]:
+        """(sorted delete hashes, owning token ids) of the whole vocabulary under hash_fn"""
+        hashes: List[int] = []
+        owners: List[int] = []
+        for token_id, token in enumerate(self.tokens):
+            for delete in deletes(token, allowed_distance(token, self.max_distance), self.prefix_length):
+                hashes.append(hash_fn(delete))
+                owners.append(token_id)
+        order = np.argsort(np.asarray(hashes, dtype=np.int64), kind='stable')
+        return np.asarray(hashes, dtype=np.int64)[order], np.asarray(owners, dtype=np.int32)[order]
+
+    def finalize(self) -> 'TypoIndex':
+        """Build the delete arrays and compact the postings"""
+        self.delete_hashes, self.delete_tokens = self.delete_arrays(self.hash)
+        self.postings = [np.asarray(p, dtype=np.int32) for p in self.postings]
+        self.loaded_at = time.time()
+        return self
+
+    def load_from_db(self, conn, batch_size: int = LOAD_BATCH_SIZE) -> 'TypoIndex':
+        """Stream names, aliases and filter fields from sanctions_list into the index"""
+        start = time.time()
+        with conn.cursor(name='typo_index_load') as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(
+                "SELECT id, entity_name, entity_type, aliases, list_source, is_pep, nationalities FROM sanctions_list"
+            )
+            for row in cursor:
+                self.add(row['id'], row['entity_name'], row['aliases'], row['entity_type'],
+                         row['list_source'], row['is_pep'], row['nationalities'])
+        conn.commit()
+        self.finalize()
+        logger.info(
+            f"⌨️ Typo index loaded: {len(self):,} entities, {len(self.tokens):,} tokens, "
+            f"{len(self.delete_hashes):,} deletes in {self.loaded_at - start:.1f}s"
+        )
+        return self
+
+    def save_snapshot(self, writer) -> None:
+        """Write the index as flat arrays (index_snapshot.PartWriter)"""
+        writer.values('entity_ids', self.entity_ids)
+        writer.categorical('entity_types', self.entity_types)
+        writer.categorical('doc_fields', self.doc_fields)
+        writer.lookup('tokens', self.tokens)
+        writer.csr('postings', self.postings)
+        if self.hash is stable_hash:
+            delete_hashes, delete_tokens = self.delete_hashes, self.delete_tokens
+        else:
+            delete_hashes, delete_tokens = self.delete_arrays(stable_hash)
+        writer.array('delete_hashes', delete_hashes)
+        writer.array('delete_tokens', delete_tokens)
+        writer.meta.update(max_distance=self.max_distance, prefix_length=self.prefix_length)
+
+    @classmethod
+    def from_snapshot(cls, reader) -> 'TypoIndex':
+        """Index backed by a memory-mapped snapshot part (index_snapshot.PartReader)"""
+        start = time.time()
+        index = cls(reader.meta['max_distance'], reader.meta['prefix_length'])
+        index.entity_ids = reader.values('entity_ids')
+        index.entity_types = reader.categorical('entity_types')
+        index.doc_fields = reader.categorical('doc_fields', convert=lambda fields: filter_fields(*fields))
+        index.token_ids = reader.lookup('tokens')
+        index.tokens = index.token_ids.keys
+        index.postings = reader.csr('postings')
+        index.delete_hashes = reader.array('delete_hashes')
+        index.delete_tokens = reader.array('delete_tokens')
+        index.hash = stable_hash
+        index.loaded_at = time.time()
+        logger.info(
+            f"⌨️ Typo index mapped from snapshot: {len(index):,} entities, {len(index.tokens):,} tokens "
+            f"in {(index.loaded_at - start) * 1000:.0f}ms"
+        )
+        return index
+
+    def lookup(self, token: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Indexed tokens within the edit distance of token, closest first"""
+        token = token.lower()
+        budget = allowed_distance(token, self.max_distance if max_distance is None else max_distance)
+        query_hashes = np.fromiter(
+            (self.hash(d) for d in deletes(token, budget, self.prefix_length)), dtype=np.int64
+        )
+        left = np.searchsorted(self.delete_hashes, query_hashes, side='left')
+        right = np.searchsorted(self.delete_hashes, query_hashes, side='right')
+
+        candidates = set()
+        for lo, hi in zip(left.tolist(), right.tolist()):
+            if hi > lo:
+                candidates.update(self.delete_tokens[lo:hi].tolist())
+
+        matches = []
+        for token_id in candidates:
+            candidate = self.tokens[token_id]
+            distance = OSA.distance(token, candidate, score_cutoff=budget)
+            if distance <= budget:
+                matches.append((candidate, distance))
+        matches.sort(key=lambda item: (item[1], item[0]))
+        return matches
+
+    def search(self, name: str, entity_type: Optional[str] = None, limit: int = 200,
+               filters=None) -> List[Any]:
+        """Ids of the entities whose tokens are closest to the query's tokens"""
+        max_df = max(1, int(len(self.entity_ids) * MAX_TOKEN_DF_RATIO))
+        per_token = []
+        for query_token in set(tokenize(name)):
+            best: Dict[int, int] = {}
+            for candidate, distance in self.lookup(query_token):
+                token_id = self.token_ids[candidate]
+                if best.get(token_id, distance + 1) > distance:
+                    best[token_id] = distance
+            if best:
+                per_token.append(best)
+
+        # Common tokens only add noise once a rarer token has matched
+        selective = [
+            best for best in per_token
+            if sum(len(self.postings[t]) for t in best) <= max_df
+        ]
+        if selective:
+            per_token = selective
+
+        scores: Dict[int, float] = defaultdict(float)
+        for best in per_token:
+            doc_scores: Dict[int, float] = {}
+            for token_id, distance in best.items():
+                weight = 1.0 - distance / (self.max_distance + 1)
+                for doc in self.postings[token_id].tolist():
+                    if doc_scores.get(doc, 0.0) < weight:
+                        doc_scores[doc] = weight
+            for doc, weight in doc_scores.items():
+                scores[doc] += weight
+
+        if entity_type:
+            wanted = entity_type.lower()
+            scores = {doc: s for doc, s in scores.items() if self.entity_types[doc] == wanted}
+        if filters:
+            scores = {doc: s for doc, s in scores.items() if filters.admits(*self.doc_fields[doc])}
+        best_docs = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [self.entity_ids[doc] for doc, _ in best_docs]
+
+
+_shared = SharedIndex(TypoIndex, 'typo', 'Typo index')
+
+
+def get_typo_index(conn, max_age: Optional[float] = None, snapshot=None) -> Optional[TypoIndex]:
+    """Process-wide index, mapped or built on first use and refreshed in the background once stale"""
+    return _shared.get(conn, max_age, snapshot)
+
+
+def build_typo_index(rows: Iterable[Dict[str, Any]]) -> TypoIndex:
+    """Build an index from already-fetched rows (demo data, fixtures)"""
+    index = TypoIndex()
+    for row in rows:
+        index.add(row.get('id'), row.get('entity_name'), row.get('aliases'), row.get('entity_type'),
+                  row.get('list_source'), row.get('is_pep'), row.get('nationalities'))
+    return index.finalize()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Create and backfill the sanctions_alias table
+
+One row per entity name and alias with its normalized form, script and
+metaphone key, behind btree and trigram indexes. Triggers on sanctions_list
+keep it current afterwards, whichever script writes; their rows lack the
+script and metaphone columns, which rerunning this fills in.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.db_pool import get_database_url, get_db_connection, release_db_connection
+from backend.alias_table import rebuild_alias_table
+from backend.result_cache import bump_data_version
+
+
+def main():
+    if not get_database_url():
+        print("❌ DATABASE_URL environment variable is not set!")
+        sys.exit(1)
+
+    print("🏷️  Building sanctions_alias from sanctions_list...")
+    print("=" * 60)
+
+    conn = get_db_connection()
+    try:
+        loaded = rebuild_alias_table(conn)
+        # Trigram retrieval reads sanctions_alias, so cached results predate the rebuild
+        version = bump_data_version(conn)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+    finally:
+        release_db_connection(conn)
+
+    print("\n" + "=" * 60)
+    print(f"✅ {loaded:,} NAMES AND ALIASES INDEXED! (data version {version})")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
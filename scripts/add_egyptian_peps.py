@@ -57,6 +57,8 @@ egyptian_officials = [
 
 print("🇪🇬 Adding Egyptian government officials to PEP database...")
 try:
+    # The sanctions_data_version trigger (backend/result_cache.py) moves the data version,
+    # so running workers reload their indexes and drop cached results for these names
     result = supabase.table('sanctions_list').insert(egyptian_officials).execute()
     print(f"✅ Successfully added {len(egyptian_officials)} Egyptian officials!")
     print("\nAdded:")
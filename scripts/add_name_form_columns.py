@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Add and backfill the precomputed name columns on sanctions_list
+
+normalized_name, normalized_aliases and latin_transliteration hold what the
+screening endpoints used to compute for every candidate on every request.
+import_all_sanctions.py fills them on import; this backfills rows loaded
+before the columns existed or by other scripts.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.db_pool import get_database_url, get_db_connection, release_db_connection
+from backend.bulk_load import copy_rows
+from backend.name_forms import NAME_FORM_COLUMNS, ensure_name_form_columns, with_name_forms
+from backend.result_cache import bump_data_version
+
+FETCH_SIZE = 20000
+
+
+def main():
+    if not get_database_url():
+        print("❌ DATABASE_URL environment variable is not set!")
+        sys.exit(1)
+
+    print("🔤 Backfilling normalized name columns...")
+    print("=" * 60)
+
+    conn = get_db_connection()
+    try:
+        ensure_name_form_columns(conn)
+
+        # Read everything first: COPY cannot run while a named cursor is still fetching
+        with conn.cursor(name='name_forms_backfill') as cursor:
+            cursor.itersize = FETCH_SIZE
+            cursor.execute("SELECT id, entity_name, aliases FROM sanctions_list")
+            records = [with_name_forms(dict(row)) for row in cursor]
+        print(f"   {len(records):,} rows normalized")
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE sanctions_name_forms ON COMMIT DROP AS "
+                "SELECT id, normalized_name, normalized_aliases, latin_transliteration FROM sanctions_list WITH NO DATA"
+            )
+            copy_rows(cursor, 'sanctions_name_forms', ['id'] + NAME_FORM_COLUMNS, records)
+            cursor.execute("""
+                UPDATE sanctions_list s
+                SET normalized_name = f.normalized_name,
+                    normalized_aliases = f.normalized_aliases,
+                    latin_transliteration = f.latin_transliteration
+                FROM sanctions_name_forms f
+                WHERE s.id = f.id
+            """)
+            updated = cursor.rowcount
+        conn.commit()
+        # Running workers reload their indexes and stop serving cached results for the old data
+        version = bump_data_version(conn)
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+    finally:
+        release_db_connection(conn)
+
+    print("\n" + "=" * 60)
+    print(f"✅ {updated:,} ROWS UPDATED! (data version {version})")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
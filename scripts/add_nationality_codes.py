@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Add and backfill sanctions_list.nationality_codes
+
+The screening nationality filter compares ISO alpha-2 codes through a GIN
+index instead of substring-matching whatever spelling each list uses.
+import_all_sanctions.py fills the column on import; this backfills rows
+loaded before it existed or by other scripts.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.db_pool import get_database_url, get_db_connection, release_db_connection
+from backend.bulk_load import copy_rows
+from backend.countries import ensure_nationality_codes_column, with_nationality_codes
+from backend.result_cache import bump_data_version
+
+FETCH_SIZE = 20000
+
+
+def main():
+    if not get_database_url():
+        print("❌ DATABASE_URL environment variable is not set!")
+        sys.exit(1)
+
+    print("🌍 Backfilling nationality codes...")
+    print("=" * 60)
+
+    conn = get_db_connection()
+    try:
+        ensure_nationality_codes_column(conn)
+
+        # Read everything first: COPY cannot run while a named cursor is still fetching
+        with conn.cursor(name='nationality_codes_backfill') as cursor:
+            cursor.itersize = FETCH_SIZE
+            cursor.execute("SELECT id, nationalities FROM sanctions_list")
+            records = [with_nationality_codes(dict(row)) for row in cursor]
+        print(f"   {len(records):,} rows mapped")
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE sanctions_nationality_codes ON COMMIT DROP AS "
+                "SELECT id, nationality_codes FROM sanctions_list WITH NO DATA"
+            )
+            copy_rows(cursor, 'sanctions_nationality_codes', ['id', 'nationality_codes'], records)
+            cursor.execute("""
+                UPDATE sanctions_list s
+                SET nationality_codes = c.nationality_codes
+                FROM sanctions_nationality_codes c
+                WHERE s.id = c.id
+            """)
+            updated = cursor.rowcount
+            cursor.execute("ANALYZE sanctions_list")
+        conn.commit()
+        # Running workers reload their indexes and stop serving cached results for the old data
+        version = bump_data_version(conn)
+    except Exception as e:
+        conn.rollback()
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+    finally:
+        release_db_connection(conn)
+
+    print("\n" + "=" * 60)
+    print(f"✅ {updated:,} ROWS UPDATED! (data version {version})")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
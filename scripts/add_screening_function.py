@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Add the screen_sanctions() SQL function for ranked screening over RPC
+
+One call retrieves candidates through the sanctions_alias trigram index,
+scores them in the database, applies the entity type / nationality /
+list / PEP filters and returns the top rows ranked by score. The FastAPI
+service calls it with asyncpg, or through Supabase RPC
+(supabase.rpc('screen_sanctions', {...})), so a screening is one round trip.
+
+Candidates come only from sanctions_alias, so this first creates the table
+with its sync triggers (every later write to sanctions_list rewrites the
+changed entities' alias rows) and backfills entities that have no rows
+yet, such as ones loaded by the upload or Supabase insert scripts. The
+nationality filter needs sanctions_list.nationality_codes (add_nationality_codes.py).
+Rows whose nationality_codes is NULL pass the nationality filter here, so
+callers filter them on their raw nationalities.
+"""
+import os
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.alias_table import backfill_missing_aliases, ensure_alias_table
+from backend.db_pool import get_database_url
+
+sql_commands = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+
+    # Every output column is cast, so the signature doesn't depend on how
+    # an older import typed id or date_of_birth
+    r"""
+    CREATE OR REPLACE FUNCTION screen_sanctions(
+        q text,
+        p_entity_type text DEFAULT NULL,
+        p_nationality text DEFAULT NULL,
+        p_list_sources text[] DEFAULT NULL,
+        p_is_pep boolean DEFAULT NULL,
+        p_limit integer DEFAULT 10,
+        p_min_score real DEFAULT 0.3
+    ) RETURNS TABLE (
+        id text,
+        entity_name text,
+        entity_type text,
+        list_source text,
+        program text,
+        nationalities text[],
+        aliases text[],
+        date_of_birth text,
+        is_pep boolean,
+        matched_name text,
+        match_score real
+    )
+    LANGUAGE plpgsql STABLE AS $$
+    DECLARE
+        -- Same normalization as backend/name_index.normalize_key, which wrote alias_norm
+        qn text := btrim(regexp_replace(lower(coalesce(q, '')), '[^[:alnum:]_]+', ' ', 'g'));
+    BEGIN
+        IF qn = '' THEN
+            RETURN;
+        END IF;
+        -- Local to the caller's transaction; lets the GIN index prune at p_min_score
+        PERFORM set_config('pg_trgm.similarity_threshold', p_min_score::text, true);
+        PERFORM set_config('pg_trgm.word_similarity_threshold', p_min_score::text, true);
+
+        RETURN QUERY
+        WITH hits AS (
+            SELECT DISTINCT ON (a.entity_id)
+                   a.entity_id, a.alias,
+                   GREATEST(similarity(a.alias_norm, qn), word_similarity(qn, a.alias_norm)) AS score
+            FROM sanctions_alias a
+            WHERE a.alias_norm % qn OR qn <% a.alias_norm
+            ORDER BY a.entity_id,
+                     GREATEST(similarity(a.alias_norm, qn), word_similarity(qn, a.alias_norm)) DESC
+        )
+        SELECT s.id::text, s.entity_name::text, s.entity_type::text, s.list_source::text,
+               s.program::text, s.nationalities::text[], s.aliases::text[], s.date_of_birth::text,
+               coalesce(s.is_pep, false), h.alias, h.score::real
+        FROM hits h
+        JOIN sanctions_list s ON s.id = h.entity_id
+        WHERE h.score >= p_min_score
+          AND (p_entity_type IS NULL OR s.entity_type = p_entity_type)
+          -- Rows loaded without codes are kept; the caller checks their raw nationalities
+          AND (p_nationality IS NULL OR s.nationality_codes @> ARRAY[lower(p_nationality)]
+               OR s.nationality_codes IS NULL)
+          -- List names match as whole words: 'UN' selects 'UN Consolidated List', not 'UNITED KINGDOM'
+          AND (p_list_sources IS NULL OR EXISTS (
+                SELECT 1 FROM unnest(p_list_sources) AS l(name)
+                WHERE s.list_source ~* ('\m' || regexp_replace(l.name, '([^[:alnum:][:space:]])', '\\\1', 'g') || '\M')))
+          AND (p_is_pep IS NULL OR s.is_pep = p_is_pep)
+        ORDER BY h.score DESC, s.entity_name
+        LIMIT p_limit;
+    END
+    $$;
+    """,
+
+    # PostgREST only exposes functions the API roles can execute
+    "GRANT EXECUTE ON FUNCTION screen_sanctions(text, text, text, text[], boolean, integer, real) TO PUBLIC;",
+]
+
+
+def main():
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL environment variable is not set!")
+        sys.exit(1)
+
+    print("🔧 Adding screen_sanctions() ranking function...")
+    print("=" * 60)
+
+    conn = psycopg2.connect(database_url)
+    try:
+        print("\n0. sanctions_alias sync triggers and backfill")
+        try:
+            ensure_alias_table(conn)
+            covered = backfill_missing_aliases(conn)
+        except Exception as e:
+            print(f"\n❌ Error: {e}")
+            print("\n⚠️  screen_sanctions() only reads sanctions_alias; fix the error above and rerun")
+            sys.exit(1)
+        print(f"   ✅ Done ({covered:,} entities backfilled)")
+
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            for i, sql in enumerate(sql_commands, 1):
+                print(f"\n{i}. {sql.strip().splitlines()[0]}")
+                cursor.execute(sql)
+                print("   ✅ Done")
+            # Supabase's PostgREST caches the schema; this makes the RPC visible right away
+            cursor.execute("NOTIFY pgrst, 'reload schema';")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        print("\n⚠️  Run these SQL commands in the Supabase SQL Editor instead:\n")
+        for sql in sql_commands:
+            print(sql.strip())
+            print()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 60)
+    print("✅ screen_sanctions() READY!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
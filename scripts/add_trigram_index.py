@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Add pg_trgm trigram indexes for name search
+
+The btree on LOWER(entity_name) from add_search_index.py cannot serve
+ILIKE '%term%' or similarity searches. This creates normalized-name
+functions and GIN trigram indexes on names and aliases, which
+backend/trigram_search.py queries with similarity() ordering.
+
+Indexes are built CONCURRENTLY so screening keeps working while they build.
+"""
+import os
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.db_pool import get_database_url
+
+sql_commands = [
+    # Trigram operators and GIN operator class
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+
+    # Lowercase, punctuation to spaces; IMMUTABLE so it can back an index
+    """
+    CREATE OR REPLACE FUNCTION sanctions_norm(t text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+    $$ SELECT btrim(regexp_replace(lower(coalesce(t, '')), '[^[:alnum:]]+', ' ', 'g')) $$;
+    """,
+
+    # All aliases as one normalized string, searched with word_similarity
+    """
+    CREATE OR REPLACE FUNCTION sanctions_alias_norm(a text[]) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+    $$ SELECT sanctions_norm(array_to_string(a, ' ')) $$;
+    """,
+
+    # Trigram index for normalized entity names
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sanctions_name_trgm
+    ON sanctions_list USING gin (sanctions_norm(entity_name) gin_trgm_ops);
+    """,
+
+    # Trigram index for normalized aliases
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sanctions_aliases_trgm
+    ON sanctions_list USING gin (sanctions_alias_norm(aliases) gin_trgm_ops);
+    """,
+
+    "ANALYZE sanctions_list;",
+]
+
+
+def main():
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL environment variable is not set!")
+        sys.exit(1)
+
+    print("🔧 Adding trigram indexes for similarity search...")
+    print("=" * 60)
+
+    conn = psycopg2.connect(database_url)
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            for i, sql in enumerate(sql_commands, 1):
+                print(f"\n{i}. {sql.strip().splitlines()[0]}")
+                cursor.execute(sql)
+                print("   ✅ Done")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        print("\n⚠️  Run these SQL commands in the Supabase SQL Editor instead:\n")
+        for sql in sql_commands:
+            print(sql.strip())
+            print()
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print("\n" + "=" * 60)
+    print("✅ TRIGRAM INDEXES READY!")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
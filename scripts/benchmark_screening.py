@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the screening hot paths, offline, over the bundled data files.
+
+Builds a sanctions_list corpus from data/un_consolidated_full.xml, the OFAC
+alias file data/alt.csv (the SDN file itself isn't bundled, so each
+entity's first alt name stands in for its primary name, with nationalities
+from data/add.csv) and the named rows of data/sample_sanctions.csv.
+--scale N tiles it to N times its size with names recombined from real
+name tokens, so postings and candidate lists grow the way a bigger list
+would. It then times:
+- parsing: the UN XML (iter_un_records) and data/ofac_unified.csv (ofac_records)
+- normalization: with_name_forms + with_nationality_codes per row
+- index builds and candidate retrieval (name, phonetic, typo index)
+- calculate_fuzzy_score vs calculate_advanced_match_score vs score_entities
+- risk scoring, both backends
+- POST /api/screen end to end through each Flask backend's test client,
+  with the database replaced by StubConnection
+
+Every run is appended to --history with the commit it ran on and compared
+with the last run of the same configuration; timings more than
+--tolerance slower are reported as regressions (exit 1 with --check).
+
+Usage: python3 benchmark_screening.py [--scale 1] [--queries 200] [--repeat 3] [--check]
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Offline: no result cache (repeats would be cache hits), no on-disk index
+# snapshots, no database pool and no Groq calls. Set before the backend
+# modules read them at import.
+os.environ.update({
+    'RESULT_CACHE_ENABLED': 'false',
+    'INDEX_SNAPSHOT_ENABLED': 'false',
+    'DATABASE_URL': '',
+    'GROQ_API_KEY': '',
+})
+
+# The backend modules import their siblings directly, as the Flask app does
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from batch_scoring import score_entities
+from countries import with_nationality_codes
+from entity_store import STORE_COLUMNS, build_entity_store
+from name_forms import normalize_name, stored_name_forms, with_name_forms
+from name_index import build_name_index
+from phonetic_index import build_phonetic_index
+from typo_index import build_typo_index
+
+from parse_un_full import iter_un_records
+from record_builder import ofac_records
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+HISTORY_FILE = os.path.join(DATA_DIR, 'benchmark_history.json')
+
+# Same candidate depth as flask_backend's NAME_INDEX_TOP_K
+CANDIDATES_PER_QUERY = 200
+QUERY_KINDS = ('exact', 'typo', 'reordered', 'partial', 'miss')
+
+
+# --- corpus -------------------------------------------------------------------
+
+def corpus_row(entity_id: int, **fields: Any) -> Dict[str, Any]:
+    """sanctions_list row with every scoring column present"""
+    row = {column: None for column in STORE_COLUMNS}
+    row.update(is_pep=False, remarks=None, jurisdiction=None, place_of_birth=None)
+    row.update(fields, id=entity_id)
+    return row
+
+
+def load_un_rows(path: str) -> List[Dict[str, Any]]:
+    """UN individuals and entities, shaped like SanctionsImporter.load_un's records"""
+    rows = []
+    for parsed in iter_un_records(path):
+        if parsed['entity_name'] == 'UNKNOWN':
+            continue
+        rows.append(corpus_row(
+            len(rows) + 1,
+            entity_name=parsed['entity_name'],
+            entity_type=parsed['entity_type'],
+            list_source='UN',
+            program=parsed['program'],
+            nationalities=parsed['nationalities'] or None,
+            aliases=parsed['aliases'] or None,
+            date_of_birth=parsed['date_of_birth'],
+            place_of_birth=parsed['place_of_birth'],
+            remarks=parsed['remarks'],
+        ))
+    return rows
+
+
+def load_ofac_rows(alt_path: str, add_path: str, first_id: int) -> List[Dict[str, Any]]:
+    """OFAC entities from the headerless ALT/ADD files, grouped by Ent_Num"""
+    names: Dict[str, List[str]] = {}
+    with open(alt_path, encoding='latin-1', newline='') as f:
+        for fields in csv.reader(f):
+            # The files end with a DOS EOF (^Z) line
+            alt_name = fields[3].strip() if len(fields) > 3 else ''
+            if alt_name and alt_name != '-0-':
+                names.setdefault(fields[0].strip(), []).append(alt_name)
+
+    countries: Dict[str, List[str]] = {}
+    with open(add_path, encoding='latin-1', newline='') as f:
+        for fields in csv.reader(f):
+            country = fields[4].strip() if len(fields) > 4 else ''
+            if country and country != '-0-':
+                entity_countries = countries.setdefault(fields[0].strip(), [])
+                if country not in entity_countries:
+                    entity_countries.append(country)
+
+    rows = []
+    for ent_num, entity_names in names.items():
+        rows.append(corpus_row(
+            first_id + len(rows),
+            entity_name=entity_names[0],
+            # SDN individuals are written "LAST, First"
+            entity_type='individual' if ', ' in entity_names[0] else 'entity',
+            list_source='OFAC',
+            program='SDN',
+            nationalities=countries.get(ent_num),
+            aliases=entity_names[1:] or None,
+        ))
+    return rows
+
+
+def load_sample_rows(path: str, first_id: int) -> List[Dict[str, Any]]:
+    """Named rows of sample_sanctions.csv (Putin, Kim Jong Un, ...)"""
+    frame = pd.read_csv(path).replace({np.nan: None})
+    return [
+        corpus_row(
+            first_id + i,
+            entity_name=record['name'],
+            entity_type=record['type'],
+            list_source='OFAC',
+            program=record['program'],
+            nationalities=[record['nationality']] if record['nationality'] else None,
+            aliases=record['aliases'].split(';') if record['aliases'] else None,
+        )
+        for i, record in enumerate(frame.to_dict('records'))
+    ]
+
+
+def load_corpus(data_dir: str = DATA_DIR) -> List[Dict[str, Any]]:
+    """Raw (not yet normalized) rows from every bundled source"""
+    rows = load_un_rows(os.path.join(data_dir, 'un_consolidated_full.xml'))
+    rows += load_ofac_rows(os.path.join(data_dir, 'alt.csv'), os.path.join(data_dir, 'add.csv'), len(rows) + 1)
+    rows += load_sample_rows(os.path.join(data_dir, 'sample_sanctions.csv'), len(rows) + 1)
+    return rows
+
+
+def normalize_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The ingest-time name forms and nationality codes clean_data() stores"""
+    return [with_nationality_codes(with_name_forms(row)) for row in rows]
+
+
+def scale_corpus(rows: List[Dict[str, Any]], scale: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """rows plus (scale - 1) synthetic copies whose names recombine tokens of real names.
+
+    Run on raw rows; the copies are normalized along with the originals.
+    """
+    if scale <= 1:
+        return list(rows)
+    rng = random.Random(seed)
+    tokens: Dict[str, List[str]] = {}
+    for row in rows:
+        tokens.setdefault(row['entity_type'], []).extend(row['entity_name'].split())
+
+    def recombine(name: str, pool: List[str]) -> str:
+        return ' '.join(rng.choice(pool) for _ in name.split())
+
+    scaled = list(rows)
+    for _ in range(scale - 1):
+        for row in rows:
+            pool = tokens[row['entity_type']]
+            aliases = [recombine(a, pool) for a in (row['aliases'] or [])[:3]]
+            scaled.append(dict(
+                row, id=len(scaled) + 1, entity_name=recombine(row['entity_name'], pool), aliases=aliases or None
+            ))
+    return scaled
+
+
+# --- query workload -------------------------------------------------------------
+
+def with_typo(name: str, rng: random.Random) -> str:
+    """name with one letter substituted, dropped or doubled"""
+    positions = [i for i, c in enumerate(name) if c.isalpha()]
+    if not positions:
+        return name
+    i = rng.choice(positions)
+    edit = rng.randrange(3)
+    if edit == 0:
+        return name[:i] + rng.choice('aeiounrst') + name[i + 1:]
+    if edit == 1 and len(positions) > 4:
+        return name[:i] + name[i + 1:]
+    return name[:i] + name[i] + name[i:]
+
+
+def reordered(name: str, rng: random.Random) -> str:
+    tokens = name.replace(',', '').split()
+    if len(tokens) < 2:
+        return name
+    rng.shuffle(tokens)
+    return ' '.join(tokens)
+
+
+def partial(name: str) -> str:
+    """First and last token only, the way a middle name goes missing"""
+    tokens = name.replace(',', '').split()
+    return ' '.join([tokens[0], tokens[-1]]) if len(tokens) > 2 else name
+
+
+def build_queries(rows: List[Dict[str, Any]], count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """count screening requests cycling through QUERY_KINDS, drawn from the corpus"""
+    rng = random.Random(seed)
+    tokens = [t for row in rows for t in row['entity_name'].split()]
+    queries = []
+    for i in range(count):
+        kind = QUERY_KINDS[i % len(QUERY_KINDS)]
+        row = rng.choice(rows)
+        name = row['entity_name']
+        if kind == 'typo':
+            name = with_typo(name, rng)
+        elif kind == 'reordered':
+            name = reordered(name, rng)
+        elif kind == 'partial':
+            name = partial(name)
+        elif kind == 'miss':
+            name = ' '.join(rng.choice(tokens) for _ in range(rng.randint(2, 3)))
+        queries.append({'name': name, 'type': row['entity_type'], 'kind': kind, 'target_id': row['id']})
+    return queries
+
+
+# --- stub database --------------------------------------------------------------
+
+class StubUnsupported(Exception):
+    """A query the stub doesn't emulate; the backends treat it like any database error"""
+
+
+class StubCursor:
+    def __init__(self, conn: 'StubConnection'):
+        self.conn = conn
+        self.rows: List[Dict[str, Any]] = []
+        self.description = None
+        self.itersize = 2000
+
+    def __enter__(self) -> 'StubCursor':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        pass
+
+    def execute(self, query: str, params: Any = None) -> None:
+        start = time.perf_counter()
+        try:
+            self.conn.queries += 1
+            self.rows = self.conn.answer(' '.join(query.split()), params, self)
+        finally:
+            self.conn.db_seconds += time.perf_counter() - start
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return list(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class StubConnection:
+    """Enough of a psycopg2 RealDictCursor connection for the screening endpoints, over in-memory rows.
+
+    Emulates the data version, column probe, index/store full scans, hydration
+    by id and the ILIKE terms query (filters are not emulated). pg_trgm is
+    reported missing, so retrieval takes the same fallback it does on a
+    database without the trigram migration. Time spent answering is summed
+    in db_seconds, so callers can separate application time from the stub.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], version: int = 1):
+        self.rows = rows
+        self.version = version
+        self.columns = list(dict.fromkeys(column for row in rows[:1] for column in row))
+        self.by_id = {str(row['id']): row for row in rows}
+        self.by_type: Dict[str, List[tuple]] = {}
+        for row in rows:
+            self.by_type.setdefault(row['entity_type'], []).append(
+                (row, (row['entity_name'] or '').lower(), frozenset(row['aliases'] or ()))
+            )
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def cursor(self, name: Optional[str] = None, **kwargs) -> StubCursor:
+        return StubCursor(self)
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def answer(self, query: str, params: Any, cursor: StubCursor) -> List[Dict[str, Any]]:
+        if 'sanctions_data_version' in query:
+            return [{'version': self.version}]
+        if query.endswith('LIMIT 0'):
+            cursor.description = [(column,) for column in self.columns]
+            return []
+        if 'WHERE id IN' in query:
+            return [dict(self.by_id[str(i)]) for i in params[0] if str(i) in self.by_id]
+        if 'matched_terms' in query:
+            return self._terms(query, params)
+        if 'GROUP BY list_source' in query:
+            return [{'list_source': s} for s in sorted({row['list_source'] for row in self.rows if row['list_source']})]
+        scan = re.fullmatch(r'SELECT (.+) FROM sanctions_list', query)
+        if scan:
+            columns = [c.strip() for c in scan.group(1).split(',')]
+            return [{c: row.get(c) for c in columns} for row in self.rows]
+        if 'pg_trgm' in query:
+            raise StubUnsupported('pg_trgm is not installed in the stub database')
+        raise StubUnsupported(f'stub database cannot answer: {query[:80]}')
+
+    def _terms(self, query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        columns = re.match(r'SELECT (.+?), ARRAY\(', query).group(1)
+        columns = None if columns == 's.*' else [c.split('.')[-1].strip() for c in columns.split(',')]
+        terms = params['terms']
+        lowered = [t.lower() for t in terms]
+        results = []
+        for row, name, aliases in self.by_type.get(params['entity_type'], []):
+            matched = [t for t, low in zip(terms, lowered) if low in name or t in aliases]
+            if matched:
+                result = dict(row) if columns is None else {c: row.get(c) for c in columns}
+                result['matched_terms'] = matched
+                results.append(result)
+                if len(results) >= params['limit']:
+                    break
+        return results
+
+
+# --- measurement ----------------------------------------------------------------
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    """Fastest of repeat runs, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    samples = np.array(seconds) * 1000
+    return {
+        'n': len(samples),
+        'mean_ms': round(float(samples.mean()), 3),
+        'p50_ms': round(float(np.percentile(samples, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples, 95)), 3),
+    }
+
+
+def per_item_us(seconds: float, items: int) -> float:
+    return round(seconds / max(items, 1) * 1e6, 3)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: Dict[str, Any], prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare_runs(previous: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> List[str]:
+    """Timings (keys ending _s/_ms/_us) more than tolerance slower than the previous run"""
+    before, after = flatten(previous['results']), flatten(current['results'])
+    regressions = []
+    for key, value in after.items():
+        old = before.get(key)
+        if not key.endswith(('_s', '_ms', '_us')) or not old:
+            continue
+        if value > old * (1 + tolerance):
+            regressions.append(f"{key}: {old:g} -> {value:g} (+{(value / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(path: str, history: List[Dict[str, Any]]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp, path)
+
+
+# --- stages -------------------------------------------------------------------
+
+def bench_parsing(repeat: int) -> Dict[str, Any]:
+    un_path = os.path.join(DATA_DIR, 'un_consolidated_full.xml')
+    ofac_path = os.path.join(DATA_DIR, 'ofac_unified.csv')
+    un_records = sum(1 for _ in iter_un_records(un_path))
+    ofac_rows = len(ofac_records(pd.read_csv(ofac_path, low_memory=False), 'OFAC'))
+    return {
+        'un_xml_s': round(best_of(lambda: list(iter_un_records(un_path)), repeat), 4),
+        'un_records': un_records,
+        'ofac_csv_s': round(best_of(lambda: ofac_records(pd.read_csv(ofac_path, low_memory=False), 'OFAC'), repeat), 4),
+        'ofac_rows': ofac_rows,
+    }
+
+
+def bench_normalization(raw_rows: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    seconds = best_of(lambda: normalize_rows(dict(row) for row in raw_rows), repeat)
+    return {'rows': len(raw_rows), 'total_s': round(seconds, 4), 'per_row_us': per_item_us(seconds, len(raw_rows))}
+
+
+def bench_indexes(rows: List[Dict[str, Any]], queries: List[Dict[str, Any]]):
+    builders = {
+        'name_index': build_name_index,
+        'phonetic_index': build_phonetic_index,
+        'typo_index': build_typo_index,
+        'entity_store': build_entity_store,
+    }
+    built, build_times = {}, {}
+    for label, build in builders.items():
+        start = time.perf_counter()
+        built[label] = build(rows)
+        build_times[f'{label}_s'] = round(time.perf_counter() - start, 4)
+
+    retrieval = {}
+    for label, limit in (('name_index', 200), ('phonetic_index', 50), ('typo_index', 100)):
+        seconds = []
+        for query in queries:
+            start = time.perf_counter()
+            built[label].search(query['name'], query['type'], limit=limit)
+            seconds.append(time.perf_counter() - start)
+        retrieval[label] = latency_summary(seconds)
+    return built, build_times, retrieval
+
+
+def bench_scoring(rows: List[Dict[str, Any]], queries: List[Dict[str, Any]], name_index, repeat: int):
+    import flask_backend
+    import flask_backend_enhanced
+
+    by_id = {row['id']: row for row in rows}
+    workload = [
+        (query['name'], [by_id[i] for i in name_index.search(query['name'], query['type'], limit=CANDIDATES_PER_QUERY)])
+        for query in queries
+    ]
+    pairs = sum(len(candidates) for _, candidates in workload)
+
+    def fuzzy():
+        for name, candidates in workload:
+            for entity in candidates:
+                flask_backend.calculate_fuzzy_score(name, entity['entity_name'])
+
+    def batch():
+        for name, candidates in workload:
+            score_entities(name, candidates, score_cutoff=flask_backend.MATCH_THRESHOLD)
+
+    def advanced(cutoff: float):
+        def run():
+            for name, candidates in workload:
+                query_norm = normalize_name(name)
+                for entity in candidates:
+                    name_norm, _ = stored_name_forms(entity)
+                    flask_backend_enhanced.calculate_advanced_match_score(
+                        name, entity['entity_name'], query_norm, name_norm, cutoff
+                    )
+        return run
+
+    def risk(fn: Callable[[Dict[str, Any]], Any]):
+        def run():
+            for _, candidates in workload:
+                for entity in candidates:
+                    fn(entity)
+        return run
+
+    scoring = {
+        'pairs': pairs,
+        'calculate_fuzzy_score_us': per_item_us(best_of(fuzzy, repeat), pairs),
+        # name and up to MAX_ALIASES aliases per entity, one batch per query
+        'score_entities_us': per_item_us(best_of(batch, repeat), pairs),
+        'calculate_advanced_match_score_us': per_item_us(best_of(advanced(0.0), repeat), pairs),
+        'calculate_advanced_match_score_cutoff_us': per_item_us(
+            best_of(advanced(flask_backend_enhanced.MATCH_THRESHOLD), repeat), pairs
+        ),
+    }
+    risk_times = {
+        'calculate_risk_score_us': per_item_us(
+            best_of(risk(lambda e: flask_backend.calculate_risk_score(e, 0.8)), repeat), pairs
+        ),
+        'calculate_intelligent_risk_score_us': per_item_us(
+            best_of(risk(lambda e: flask_backend_enhanced.calculate_intelligent_risk_score(e, 0.8, 'fuzzy')), repeat),
+            pairs
+        ),
+    }
+    return scoring, risk_times
+
+
+def install_stub(module, conn: StubConnection) -> None:
+    """Point a Flask backend's connection pool at conn"""
+    module.get_db_connection = lambda: conn
+    module.release_db_connection = lambda c: None
+
+
+def screen_requests(module, conn: StubConnection, queries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Latency of POST /api/screen per query; the first request also loads the indexes"""
+    client = module.app.test_client()
+    # Both backends accept both flags; each reads its own
+    payload = {'use_ai': False, 'enhanced_ai': False}
+
+    start = time.perf_counter()
+    client.post('/api/screen', json=dict(payload, name=queries[0]['name'], type=queries[0]['type']))
+    cold_start = time.perf_counter() - start
+
+    seconds, db_seconds, db_queries = [], [], []
+    for query in queries:
+        conn.db_seconds, conn.queries = 0.0, 0
+        start = time.perf_counter()
+        response = client.post('/api/screen', json=dict(payload, name=query['name'], type=query['type']))
+        seconds.append(time.perf_counter() - start)
+        if response.status_code != 200 or response.get_json().get('demo_mode'):
+            raise RuntimeError(f"{module.__name__} /api/screen failed for {query['name']!r}: {response.get_json()}")
+        db_seconds.append(conn.db_seconds)
+        db_queries.append(conn.queries)
+
+    summary = latency_summary(seconds)
+    summary.update({
+        'cold_start_s': round(cold_start, 4),
+        # the stub's own share (ILIKE emulation in Python); not representative of Postgres
+        'stub_db_mean_ms': round(float(np.mean(db_seconds)) * 1000, 3),
+        'app_mean_ms': round((float(np.mean(seconds)) - float(np.mean(db_seconds))) * 1000, 3),
+        'db_queries_per_request': round(float(np.mean(db_queries)), 2),
+    })
+    return summary
+
+
+def bench_screen(rows: List[Dict[str, Any]], queries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    import flask_backend
+    import flask_backend_enhanced
+
+    conn = StubConnection(rows)
+    results = {}
+    for module in (flask_backend, flask_backend_enhanced):
+        install_stub(module, conn)
+        results[module.__name__] = screen_requests(module, conn, queries)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scale', type=int, default=1, help="corpus size as a multiple of the bundled data")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per micro-benchmark; the fastest counts")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help="slowdown reported as a regression")
+    parser.add_argument('--check', action='store_true', help="exit 1 when a regression is found")
+    parser.add_argument('--no-save', action='store_true', help="don't append this run to the history")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # The backends log every request at INFO
+    logging.disable(logging.INFO)
+
+    raw_rows = load_corpus()
+    rows = normalize_rows(scale_corpus([dict(row) for row in raw_rows], args.scale, args.seed))
+    queries = build_queries(rows, args.queries, args.seed)
+    print(f"📂 {len(rows):,} rows ({len(raw_rows):,} bundled x{args.scale}), {len(queries)} queries\n")
+
+    results = {}
+    results['parsing'] = bench_parsing(args.repeat)
+    results['normalization'] = bench_normalization(raw_rows, args.repeat)
+    built, results['index_build'], results['retrieval'] = bench_indexes(rows, queries)
+    results['scoring'], results['risk'] = bench_scoring(rows, queries, built['name_index'], args.repeat)
+    results['screen'] = bench_screen(rows, queries)
+
+    for stage, values in results.items():
+        print(f"   {stage}")
+        for key, value in values.items():
+            print(f"      {key:<42} {json.dumps(value)}")
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {'scale': args.scale, 'queries': args.queries, 'repeat': args.repeat, 'seed': args.seed},
+        'rows': len(rows),
+        'results': results,
+    }
+    history = load_history(args.history)
+    previous = next((r for r in reversed(history) if r.get('config') == run['config']), None)
+    regressions = compare_runs(previous, run, args.tolerance) if previous else []
+    if previous is None:
+        print("\n📈 No earlier run with this configuration to compare against")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} timings regressed since {previous['commit'] or previous['timestamp']}:")
+        for line in regressions:
+            print(f"   {line}")
+    else:
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} since {previous['commit'] or previous['timestamp']}")
+
+    if not args.no_save:
+        history.append(run)
+        save_history(args.history, history)
+        print(f"💾 Run saved to {args.history}")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Build the memory-mapped search index snapshot for the current data version
+
+Writes the name, phonetic and typo indexes and the entity store under
+INDEX_SNAPSHOT_DIR/v{version}/ (see backend/index_snapshot.py), so Flask
+workers map them at startup instead of each scanning sanctions_list.
+import_all_sanctions.py runs this after every import. Run it by hand to
+prepare a snapshot on a host that didn't run the import.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+# The index modules import their backend siblings directly, as the Flask app does
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+from db_pool import get_db_connection, release_db_connection
+from entity_store import EntityStore
+from index_snapshot import INDEX_SNAPSHOT_DIR, Snapshot
+from name_index import NameIndex
+from phonetic_index import PhoneticIndex
+from result_cache import get_data_version
+from typo_index import TypoIndex
+
+logger = logging.getLogger(__name__)
+
+PARTS = {
+    'name': NameIndex,
+    'phonetic': PhoneticIndex,
+    'typo': TypoIndex,
+    'entities': EntityStore,
+}
+
+
+def build_index_snapshot(conn, version: int, base_dir: str = INDEX_SNAPSHOT_DIR, parts=None) -> Snapshot:
+    """Load each index from the database and write it as a snapshot part; existing parts are kept"""
+    snapshot = Snapshot(base_dir, version)
+    for part in parts or PARTS:
+        with snapshot.lock(part):
+            if snapshot.has(part):
+                logger.info(f"💾 Snapshot {part} v{version} already built")
+                continue
+            index = PARTS[part]().load_from_db(conn)
+            if not snapshot.save(part, index):
+                raise RuntimeError(f"snapshot {part} v{version} could not be written to {snapshot.path}")
+    return snapshot
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Build the search index snapshot for the current data version")
+    parser.add_argument('--dir', default=INDEX_SNAPSHOT_DIR, help=f"snapshot directory (default {INDEX_SNAPSHOT_DIR})")
+    parser.add_argument('--part', action='append', choices=sorted(PARTS), help="only build these indexes")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ No database connection (is DATABASE_URL set?)")
+        sys.exit(1)
+    try:
+        version = get_data_version(conn, max_age=0)
+        if version is None:
+            print("❌ No sanctions_data_version row; run an import first")
+            sys.exit(1)
+        start = time.time()
+        snapshot = build_index_snapshot(conn, version, args.dir, args.part)
+        print(f"✅ Snapshot v{version} ready in {snapshot.path} ({time.time() - start:.1f}s)")
+    finally:
+        release_db_connection(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Evaluation: recall, precision and latency of /api/screen per configuration.
+
+Screens the labelled queries in data/golden_queries.json (transliteration
+variants, the Madbouly/Putin cases from test_search.py, typos, reordered
+and partial names, Arabic script and names that should not match) plus
+--sampled typo/reordered/partial variants of bundled rows, through each
+Flask backend's test client over the benchmark_screening corpus and
+StubConnection. Every configuration in CONFIGURATIONS overrides module
+settings (thresholds, candidate limits, search terms, score weights) for
+its run and reports, per backend:
+- recall@1/5/10: labelled names found at that rank
+- precision@1: queries whose top match is a labelled name, of those with any match
+- precision: labelled names among all returned matches
+- false positive rate: negative queries that returned anything
+- p50/p95 latency
+
+Each configuration is compared with baseline, and every run with the last
+run in --history over the same corpus and query set; recall that dropped
+is reported (exit 1 with --check).
+
+Usage: python3 evaluate_screening.py [--configs baseline,ilike-fallback] [--config 'label:module.NAME=value;...'] [--check]
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmark_screening import (
+    DATA_DIR, StubConnection, build_queries, corpus_row, git_commit, install_stub, latency_summary,
+    load_corpus, load_history, normalize_rows, save_history, scale_corpus,
+)
+from name_forms import normalize_name
+
+GOLDEN_FILE = os.path.join(DATA_DIR, 'golden_queries.json')
+HISTORY_FILE = os.path.join(DATA_DIR, 'evaluation_history.json')
+
+BACKENDS = ('flask_backend', 'flask_backend_enhanced')
+RECALL_AT = (1, 5, 10)
+
+# Settings each configuration overrides, as 'module.NAME': value; the rest
+# keep their defaults. A configuration runs the backends it names (both if none).
+CONFIGURATIONS: Dict[str, Dict[str, Any]] = {
+    'baseline': {},
+    'threshold-low': {'flask_backend.MATCH_THRESHOLD': 0.2, 'flask_backend_enhanced.MATCH_THRESHOLD': 0.2},
+    'threshold-high': {'flask_backend.MATCH_THRESHOLD': 0.4, 'flask_backend_enhanced.MATCH_THRESHOLD': 0.35},
+    'name-index-top-50': {'flask_backend.NAME_INDEX_TOP_K': 50},
+    'name-index-top-500': {'flask_backend.NAME_INDEX_TOP_K': 500},
+    'ilike-fallback': {'flask_backend.NAME_INDEX_ENABLED': False},
+    'ilike-limit-50': {'flask_backend.NAME_INDEX_ENABLED': False, 'flask_backend.TERM_CANDIDATE_LIMIT': 50},
+    'ilike-terms-3': {'flask_backend.NAME_INDEX_ENABLED': False, 'flask_backend.MAX_SEARCH_TERMS': 3},
+    'phonetic-top-20': {'flask_backend_enhanced.PHONETIC_INDEX_TOP_K': 20},
+    'typo-index-off': {'flask_backend_enhanced.TYPO_INDEX_ENABLED': False},
+    'phonetic-index-off': {'flask_backend_enhanced.PHONETIC_INDEX_ENABLED': False},
+    'term-limit-200': {'flask_backend_enhanced.TERM_CANDIDATE_LIMIT': 200},
+    'token-weights': {'flask_backend_enhanced.MATCH_WEIGHTS': {
+        'ratio': 0.10, 'partial': 0.15, 'token_sort': 0.25, 'token_set': 0.25, 'rapidfuzz': 0.15, 'phonetic': 0.10,
+    }},
+}
+
+
+# --- query set ------------------------------------------------------------------
+
+def load_golden(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def golden_cases(golden: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            'name': query['name'], 'type': query['type'], 'kind': query['kind'],
+            'expected': {normalize_name(name) for name in query['expected']},
+        }
+        for query in golden['queries']
+    ]
+
+
+def sampled_cases(rows: List[Dict[str, Any]], count: int, seed: int) -> List[Dict[str, Any]]:
+    """benchmark_screening's typo/reordered/partial/exact variants, labelled with the row they came from"""
+    by_id = {row['id']: row for row in rows}
+    return [
+        {
+            'name': query['name'], 'type': query['type'], 'kind': query['kind'],
+            'expected': {normalize_name(by_id[query['target_id']]['entity_name'])},
+        }
+        # 'miss' draws random tokens, which may well name someone; only golden negatives are labelled
+        for query in build_queries(rows, count, seed) if query['kind'] != 'miss'
+    ]
+
+
+# --- configurations ---------------------------------------------------------------
+
+def parse_config(spec: str) -> tuple:
+    """'label:module.NAME=value;module.NAME=value' with JSON values (bare words are strings)"""
+    label, _, assignments = spec.partition(':')
+    overrides = {}
+    for assignment in filter(None, (a.strip() for a in assignments.split(';'))):
+        setting, _, raw = assignment.partition('=')
+        try:
+            overrides[setting.strip()] = json.loads(raw)
+        except ValueError:
+            overrides[setting.strip()] = raw.strip()
+    return label.strip(), overrides
+
+
+def backends_for(overrides: Dict[str, Any]) -> List[str]:
+    named = {setting.split('.', 1)[0] for setting in overrides}
+    return [backend for backend in BACKENDS if not named or backend in named]
+
+
+@contextmanager
+def overridden(overrides: Dict[str, Any]):
+    """Set module attributes for the duration of a configuration, then restore them"""
+    saved = []
+    try:
+        for setting, value in overrides.items():
+            module_name, _, attr = setting.partition('.')
+            module = importlib.import_module(module_name)
+            if not hasattr(module, attr):
+                raise ValueError(f"{module_name} has no setting {attr}")
+            saved.append((module, attr, getattr(module, attr)))
+            setattr(module, attr, value)
+        yield
+    finally:
+        for module, attr, value in reversed(saved):
+            setattr(module, attr, value)
+
+
+# --- evaluation -------------------------------------------------------------------
+
+def screen_cases(module, cases: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Recall, precision and latency of POST /api/screen over the labelled cases"""
+    client = module.app.test_client()
+    payload = {'use_ai': False, 'enhanced_ai': False}
+    # The first request loads the indexes; it isn't a screening latency
+    client.post('/api/screen', json=dict(payload, name=cases[0]['name'], type=cases[0]['type']))
+
+    seconds = []
+    hits_at = {k: 0 for k in RECALL_AT}
+    kinds: Dict[str, List[int]] = {}
+    positives = top_hits = answered = returned = relevant = 0
+    negatives = flagged = 0
+    missed = []
+    for case in cases:
+        start = time.perf_counter()
+        response = client.post('/api/screen', json=dict(payload, name=case['name'], type=case['type']))
+        seconds.append(time.perf_counter() - start)
+        body = response.get_json()
+        if response.status_code != 200 or body.get('demo_mode'):
+            raise RuntimeError(f"{module.__name__} /api/screen failed for {case['name']!r}: {body}")
+
+        names = [normalize_name(match['name']) for match in body['matches']]
+        returned += len(names)
+        if not case['expected']:
+            negatives += 1
+            flagged += bool(names)
+            continue
+
+        positives += 1
+        relevant += sum(name in case['expected'] for name in names)
+        rank = next((i + 1 for i, name in enumerate(names) if name in case['expected']), None)
+        for k in RECALL_AT:
+            hits_at[k] += rank is not None and rank <= k
+        if names:
+            answered += 1
+            top_hits += rank == 1
+        kind = kinds.setdefault(case['kind'], [0, 0])
+        kind[0] += rank is not None and rank <= RECALL_AT[-1]
+        kind[1] += 1
+        if rank is None:
+            missed.append(f"{case['kind']}: {case['name']}")
+
+    results = {f'recall_at_{k}': round(hits / max(positives, 1), 4) for k, hits in hits_at.items()}
+    results.update({
+        'precision_at_1': round(top_hits / max(answered, 1), 4),
+        'precision': round(relevant / max(returned, 1), 4),
+        'false_positive_rate': round(flagged / max(negatives, 1), 4),
+        'matches_per_query': round(returned / len(cases), 2),
+        'latency': latency_summary(seconds),
+        f'recall_at_{RECALL_AT[-1]}_by_kind': {kind: round(h / n, 4) for kind, (h, n) in sorted(kinds.items())},
+        'missed': missed,
+    })
+    return results
+
+
+def recall_drops(previous: Dict[str, Any], current: Dict[str, Any], against: str) -> List[str]:
+    """recall@K that fell from previous to current"""
+    drops = []
+    for k in RECALL_AT:
+        key = f'recall_at_{k}'
+        if current[key] < previous.get(key, 0):
+            drops.append(f"{key} {previous[key]:.3f} -> {current[key]:.3f} vs {against}")
+    return drops
+
+
+def print_table(backend: str, results: Dict[str, Dict[str, Any]]) -> None:
+    header = ''.join(f"{f'R@{k}':>7}" for k in RECALL_AT)
+    print(f"\n   {backend}")
+    print(f"      {'configuration':<22}{header}{'P@1':>7}{'prec':>7}{'FP':>7}{'p50 ms':>9}{'p95 ms':>9}")
+    for label, metrics in results.items():
+        recalls = ''.join(f"{metrics[f'recall_at_{k}']:>7.3f}" for k in RECALL_AT)
+        print(
+            f"      {label:<22}{recalls}{metrics['precision_at_1']:>7.3f}{metrics['precision']:>7.3f}"
+            f"{metrics['false_positive_rate']:>7.3f}{metrics['latency']['p50_ms']:>9.2f}{metrics['latency']['p95_ms']:>9.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--golden', default=GOLDEN_FILE)
+    parser.add_argument('--sampled', type=int, default=200, help="corpus-drawn variants added to the golden queries")
+    parser.add_argument('--scale', type=int, default=1, help="corpus size as a multiple of the bundled data")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--configs', help="comma-separated configurations to run (default: all)")
+    parser.add_argument('--config', action='append', default=[], metavar='SPEC',
+                        help="add or replace a configuration: 'label:module.NAME=value;module.NAME=value'")
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--check', action='store_true', help="exit 1 when recall dropped")
+    parser.add_argument('--no-save', action='store_true', help="don't append this run to the history")
+    args = parser.parse_args()
+
+    configurations = dict(CONFIGURATIONS)
+    configurations.update(parse_config(spec) for spec in args.config)
+    if args.configs:
+        selected = [label.strip() for label in args.configs.split(',')]
+        unknown = [label for label in selected if label not in configurations]
+        if unknown:
+            parser.error(f"unknown configurations: {', '.join(unknown)}")
+        # Every other configuration is read against baseline
+        configurations = {label: configurations[label] for label in ['baseline'] + selected}
+
+    logging.basicConfig(level=logging.WARNING)
+    # The backends log every request at INFO
+    logging.disable(logging.INFO)
+
+    golden = load_golden(args.golden)
+    raw_rows = load_corpus()
+    raw_rows += [corpus_row(len(raw_rows) + 1 + i, **entity) for i, entity in enumerate(golden.get('entities', []))]
+    rows = normalize_rows(scale_corpus([dict(row) for row in raw_rows], args.scale, args.seed))
+    # Sampled from the bundled rows only; synthetic names have no meaning to recall
+    cases = golden_cases(golden) + sampled_cases(rows[:len(raw_rows)], args.sampled, args.seed)
+    print(f"📂 {len(rows):,} rows ({len(raw_rows):,} bundled x{args.scale}), "
+          f"{len(golden['queries'])} golden + {len(cases) - len(golden['queries'])} sampled queries")
+
+    import flask_backend
+    import flask_backend_enhanced
+
+    conn = StubConnection(rows)
+    for module in (flask_backend, flask_backend_enhanced):
+        install_stub(module, conn)
+
+    results: Dict[str, Dict[str, Any]] = {backend: {} for backend in BACKENDS}
+    for label, overrides in configurations.items():
+        with overridden(overrides):
+            for backend in backends_for(overrides):
+                results[backend][label] = screen_cases(sys.modules[backend], cases)
+
+    regressions = []
+    for backend, by_config in results.items():
+        print_table(backend, by_config)
+        baseline = by_config['baseline']
+        if baseline['missed']:
+            print(f"      baseline missed {len(baseline['missed'])}: {'; '.join(baseline['missed'][:10])}"
+                  f"{' ...' if len(baseline['missed']) > 10 else ''}")
+        for label, metrics in by_config.items():
+            if label != 'baseline':
+                for drop in recall_drops(baseline, metrics, 'baseline'):
+                    print(f"      ⚠️ {label}: {drop}")
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'config': {
+            'golden': len(golden['queries']), 'sampled': args.sampled, 'scale': args.scale, 'seed': args.seed,
+        },
+        'configurations': configurations,
+        'results': results,
+    }
+    history = load_history(args.history)
+    previous: Optional[Dict[str, Any]] = next((r for r in reversed(history) if r.get('config') == run['config']), None)
+    if previous is None:
+        print("\n📈 No earlier run over this query set to compare against")
+    else:
+        since = previous['commit'] or previous['timestamp']
+        for backend, by_config in results.items():
+            for label, metrics in by_config.items():
+                before = previous['results'].get(backend, {}).get(label)
+                # Only comparable when the configuration itself is unchanged
+                if before and previous.get('configurations', {}).get(label) == configurations[label]:
+                    regressions += [f"{backend} {label}: {drop}" for drop in recall_drops(before, metrics, since)]
+        if regressions:
+            print(f"\n❌ Recall dropped in {len(regressions)} places since {since}:")
+            for line in regressions:
+                print(f"   {line}")
+        else:
+            print(f"\n✅ No recall lost since {since}")
+
+    if not args.no_save:
+        history.append(run)
+        save_history(args.history, history)
+        print(f"💾 Run saved to {args.history}")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+On-disk cache for the sanctions feeds, filled concurrently with conditional GETs.
+
+Each feed is stored as <key>.body next to a <key>.json holding the
+ETag/Last-Modified validators and a SHA-256 of the body. Re-runs send
+If-None-Match / If-Modified-Since, so unchanged feeds cost one 304. A feed
+counts as changed until mark_imported() records that its current body made
+it into the database, so a failed import is retried on the next run.
+Local paths (or file:// URLs) are accepted in place of URLs for fixtures.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_DIR = os.environ.get(
+    'FEED_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'feed_cache')
+)
+DOWNLOAD_WORKERS = int(os.environ.get('FEED_DOWNLOAD_WORKERS', 6))
+DOWNLOAD_TIMEOUT = int(os.environ.get('FEED_DOWNLOAD_TIMEOUT', 300))
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class FeedResult:
+    key: str
+    path: Optional[str]
+    status: str  # downloaded | not_modified | local | error
+    changed: bool
+    size: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _local_path(url: str) -> Optional[str]:
+    if url.startswith('file://'):
+        return url[len('file://'):]
+    if '://' not in url:
+        return url
+    return None
+
+
+class FeedCache:
+    """Conditional, parallel feed downloads into a directory"""
+
+    def __init__(self, cache_dir: str = FEED_CACHE_DIR, timeout: int = DOWNLOAD_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.body", f"{base}.json"
+
+    def _read_meta(self, key: str) -> Dict[str, str]:
+        meta_path = self._paths(key)[1]
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, key: str, meta: Dict[str, str]) -> None:
+        meta_path = self._paths(key)[1]
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    def fetch(self, key: str, url: str) -> FeedResult:
+        """Bring one feed up to date in the cache"""
+        start = time.time()
+        meta = self._read_meta(key)
+        body_path, _ = self._paths(key)
+
+        local = _local_path(url)
+        if local is not None:
+            if not os.path.exists(local):
+                return FeedResult(key, None, 'error', False, error=f"{local} not found")
+            sha256 = _sha256(local)
+            meta.update({'url': url, 'sha256': sha256, 'fetched_at': time.time()})
+            self._write_meta(key, meta)
+            return FeedResult(key, local, 'local', sha256 != meta.get('imported_sha256'),
+                              os.path.getsize(local), time.time() - start)
+
+        headers = {}
+        if os.path.exists(body_path) and meta.get('url') == url:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            with requests.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    return FeedResult(key, body_path, 'not_modified',
+                                      meta.get('sha256') != meta.get('imported_sha256'),
+                                      os.path.getsize(body_path), time.time() - start)
+                response.raise_for_status()
+                response.raw.decode_content = True
+
+                # Write next to the final path and swap, so a broken download never replaces a good copy
+                tmp_path = f"{body_path}.part"
+                with open(tmp_path, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, CHUNK_SIZE)
+                os.replace(tmp_path, body_path)
+
+                sha256 = _sha256(body_path)
+                meta.update({
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'sha256': sha256,
+                    'fetched_at': time.time(),
+                })
+                self._write_meta(key, meta)
+                return FeedResult(key, body_path, 'downloaded', sha256 != meta.get('imported_sha256'),
+                                  os.path.getsize(body_path), time.time() - start)
+        except (requests.RequestException, OSError) as e:
+            # Fall back to the last good copy rather than losing the source for this run
+            if os.path.exists(body_path) and meta.get('url') == url:
+                logger.warning(f"⚠️  {key}: {e} - using cached copy")
+                return FeedResult(key, body_path, 'not_modified',
+                                  meta.get('sha256') != meta.get('imported_sha256'),
+                                  os.path.getsize(body_path), time.time() - start, str(e))
+            return FeedResult(key, None, 'error', False, seconds=time.time() - start, error=str(e))
+
+    def fetch_all(self, urls: Dict[str, str], max_workers: int = DOWNLOAD_WORKERS) -> Dict[str, FeedResult]:
+        """Fetch every feed in parallel; results keyed like urls"""
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls) or 1))) as executor:
+            futures = {key: executor.submit(self.fetch, key, url) for key, url in urls.items()}
+            return {key: future.result() for key, future in futures.items()}
+
+    def mark_imported(self, key: str) -> None:
+        """Record that the cached body of key is now in the database"""
+        meta = self._read_meta(key)
+        if meta.get('sha256'):
+            meta['imported_sha256'] = meta['sha256']
+            self._write_meta(key, meta)
@@ -1,11 +1,11 @@
 import sys
 import os
+import argparse
 import warnings
 import logging
 from datetime import datetime
 import uuid
-from typing import List, Dict, Any
-import io  # 🔥 CRITICAL FIX FOR OFAC
+from typing import List, Dict, Any, Optional
 
 # Fix Pandas warnings
 import pandas as pd
@@ -17,13 +17,21 @@ pd.options.mode.chained_assignment = None
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-import requests
 import json
 from tqdm import tqdm
-import xml.etree.ElementTree as ET
+from parse_un_full import iter_un_records
+from record_builder import ofac_records
+from feed_cache import FeedCache
+from build_index_snapshot import build_index_snapshot
 
 # Import DB config
-from backend.config import get_db_connection, release_db_connection
+from backend.db_pool import get_db_connection, release_db_connection
+from backend.bulk_load import bulk_replace, SANCTIONS_COLUMNS, SANCTIONS_TABLE
+from backend.countries import ensure_nationality_codes_column, with_nationality_codes
+from backend.alias_table import ALIAS_COLUMNS, ALIAS_TABLE, ensure_alias_table, iter_alias_rows
+from backend.delta_sync import delta_sync, ensure_delta_columns, keyed_record
+from backend.name_forms import ensure_name_form_columns, with_name_forms
+from backend.result_cache import bump_data_version
 
 # Configure logging
 logging.basicConfig(
@@ -41,12 +49,13 @@ logger = logging.getLogger(__name__)
 class SanctionsImporter:
     """🌍 Fixed Sanctions Data Importer"""
     
-    BATCH_SIZE = 1000
-    COMMIT_INTERVAL = 50000
-    
-    def __init__(self):
+    def __init__(self, fixtures: Optional[Dict[str, str]] = None, only: Optional[List[str]] = None):
         self.records: List[Dict[str, Any]] = []
         self.total_imported = 0
+        # Local files to use instead of a source's URL, e.g. {'un': 'data/un_consolidated.xml'}
+        self.fixtures = fixtures or {}
+        self.feed_cache = FeedCache()
+        self.loaded_sources: List[str] = []
         
         self.sources = {
             'opensanctions_peps': {
@@ -86,24 +95,27 @@ class SanctionsImporter:
                 'type': 'un'
             }
         }
+        # A full import replaces the whole table, so a partial source set is delta-only
+        self.partial = bool(only)
+        if only:
+            self.sources = {key: config for key, config in self.sources.items() if key in only}
     
     def get_first(self, val: Any) -> Any:
         if isinstance(val, list) and val:
             return val
         return val
     
-    def download_opensanctions(self, url: str, source_name: str, is_pep: bool):
-        """📥 Download OpenSanctions JSON"""
+    def load_opensanctions(self, path: str, source_name: str, is_pep: bool):
+        """📥 Parse a cached OpenSanctions FtM JSON-lines feed"""
         logger.info(f"📥 {source_name}")
-        logger.info(f"🔗 {url}")
+        logger.info(f"📄 {path}")
         
         try:
-            response = requests.get(url, stream=True, timeout=300)
-            response.raise_for_status()
-            
             processed = 0
-            for line in response.iter_lines():
-                if line:
+            with open(path, 'rb') as feed:
+                for line in feed:
+                    if not line.strip():
+                        continue
                     try:
                         entity = json.loads(line)
                         props = entity.get('properties', {})
@@ -126,12 +138,13 @@ class SanctionsImporter:
                             'pep_level': self.get_first(props.get('pepStatus')),
                             'position': self.get_first(props.get('position')),
                             'jurisdiction': self.get_first(props.get('country')),
-                            'nationalities': json.dumps(props.get('nationality', [])),
-                            'aliases': json.dumps(props.get('alias', [])),
+                            'nationalities': props.get('nationality') or None,
+                            'aliases': props.get('alias') or None,
                             'date_of_birth': self.get_first(props.get('birthDate')),
                             'remarks': self.get_first(props.get('notes')),
                             'last_updated_date': datetime.now(),
-                            'created_at': datetime.now()
+                            'created_at': datetime.now(),
+                            'source_key': entity.get('id')
                         }
                         
                         self.records.append(record)
@@ -145,117 +158,99 @@ class SanctionsImporter:
             
             logger.info(f"✅ {source_name}: {processed:,} records")
             
-        except requests.RequestException as e:
-            logger.error(f"❌ Network error {source_name}: {e}")
+        except OSError as e:
+            logger.error(f"❌ Read error {source_name}: {e}")
     
-    def download_ofac(self, url: str, source_name: str):
-        """📥 Download OFAC CSV (FIXED)"""
+    def load_ofac(self, path: str, source_name: str):
+        """📥 Parse a cached OFAC SDN CSV"""
         logger.info(f"📥 {source_name}")
-        logger.info(f"🔗 {url}")
+        logger.info(f"📄 {path}")
         
         try:
-            response = requests.get(url, timeout=120)
-            response.raise_for_status()
-            
-            # 🔥 FIXED: Use io.StringIO instead of deprecated pandas.compat
             df = pd.read_csv(
-                io.StringIO(response.text),  # CORRECTED HERE
+                path,
                 encoding='latin1',
                 on_bad_lines='skip',
                 low_memory=False
             )
             
-            for _, row in df.iterrows():
-                record = {
-                    'id': str(uuid.uuid4()),
-                    'entity_name': str(row.iloc[1]) if len(row) > 1 else 'Unknown',
-                    'entity_type': str(row.iloc[2]).lower() if len(row) > 2 else 'individual',
-                    'first_name': None,
-                    'last_name': None,
-                    'list_source': source_name,
-                    'program': str(row.iloc[3]) if len(row) > 3 else 'SDN',
-                    'is_pep': False,
-                    'pep_level': None,
-                    'position': str(row.iloc[4]) if len(row) > 4 else None,
-                    'jurisdiction': None,
-                    'nationalities': None,
-                    'aliases': None,
-                    'date_of_birth': None,
-                    'remarks': str(row.iloc[-1]) if len(row) > 5 else None,
-                    'last_updated_date': datetime.now(),
-                    'created_at': datetime.now()
-                }
-                self.records.append(record)
+            self.records.extend(ofac_records(df, source_name))
             
             logger.info(f"✅ {source_name}: {len(df):,} records")
             
         except Exception as e:
             logger.error(f"❌ OFAC error: {e}")
     
-    def download_un(self, url: str, source_name: str):
-        """📥 Download UN XML"""
+    def load_un(self, path: str, source_name: str):
+        """📥 Parse a cached UN consolidated XML"""
         logger.info(f"📥 {source_name}")
-        logger.info(f"🔗 {url}")
+        logger.info(f"📄 {path}")
         
         try:
-            response = requests.get(url, timeout=180)
-            response.raise_for_status()
-            
-            root = ET.fromstring(response.content)
-            individuals = root.findall(".//INDIVIDUAL")
-            
-            for individual in individuals:
-                first_name = individual.find(".//FIRST_NAME")
-                last_name = individual.find(".//SECOND_NAME")
-                
-                name_parts = []
-                if first_name is not None and first_name.text:
-                    name_parts.append(first_name.text)
-                if last_name is not None and last_name.text:
-                    name_parts.append(last_name.text)
-                
-                if not name_parts:
+            # iterparse keeps memory flat however large the list is
+            individuals = 0
+            for parsed in iter_un_records(path):
+                if parsed['entity_type'] != 'individual' or parsed['entity_name'] == 'UNKNOWN':
                     continue
-                
+
                 record = {
                     'id': str(uuid.uuid4()),
-                    'entity_name': " ".join(name_parts),
+                    'entity_name': parsed['entity_name'],
                     'entity_type': 'individual',
-                    'first_name': first_name.text if first_name is not None else None,
-                    'last_name': last_name.text if last_name is not None else None,
+                    'first_name': parsed['first_name'],
+                    'last_name': parsed['last_name'] or parsed['middle_name'],
                     'list_source': source_name,
                     'program': 'UN Sanctions',
                     'is_pep': False,
                     'pep_level': None,
                     'position': None,
                     'jurisdiction': None,
-                    'nationalities': None,
-                    'aliases': None,
-                    'date_of_birth': None,
-                    'remarks': None,
+                    'nationalities': parsed['nationalities'] or None,
+                    'aliases': parsed['aliases'] or None,
+                    'date_of_birth': parsed['date_of_birth'],
+                    'remarks': parsed['remarks'],
                     'last_updated_date': datetime.now(),
-                    'created_at': datetime.now()
+                    'created_at': datetime.now(),
+                    'source_key': parsed['entity_id']
                 }
                 self.records.append(record)
+                individuals += 1
             
-            logger.info(f"✅ {source_name}: {len(individuals):,} records")
+            logger.info(f"✅ {source_name}: {individuals:,} records")
             
         except Exception as e:
             logger.error(f"❌ UN error: {e}")
     
-    def download_all_sources(self):
-        """Download all sources"""
+    def download_all_sources(self, skip_unchanged: bool = False):
+        """Fetch every feed in parallel into the on-disk cache, then parse them"""
         logger.info("=" * 80)
         logger.info("🌍 DOWNLOADING ALL SOURCES")
         logger.info("=" * 80)
         
+        urls = {key: self.fixtures.get(key, config['url']) for key, config in self.sources.items()}
+        results = self.feed_cache.fetch_all(urls)
+        
         for source_key, config in self.sources.items():
+            result = results[source_key]
+            if result.status == 'error':
+                logger.error(f"❌ {config['name']}: {result.error}")
+                continue
+            logger.info(f"🌐 {config['name']}: {result.status} ({result.size / 1e6:.1f} MB in {result.seconds:.1f}s)")
+            
+            # Delta runs leave unchanged lists alone, so there is nothing to parse
+            if skip_unchanged and not result.changed:
+                logger.info(f"⏭️  {config['name']}: unchanged since last import, skipped")
+                continue
+            
+            before = len(self.records)
             if config['type'] == 'opensanctions':
-                self.download_opensanctions(config['url'], config['name'], config['is_pep'])
+                self.load_opensanctions(result.path, config['name'], config['is_pep'])
             elif config['type'] == 'ofac':
-                self.download_ofac(config['url'], config['name'])
+                self.load_ofac(result.path, config['name'])
             elif config['type'] == 'un':
-                self.download_un(config['url'], config['name'])
+                self.load_un(result.path, config['name'])
+            if len(self.records) > before:
+                self.loaded_sources.append(source_key)
         
         logger.info(f"📊 TOTAL: {len(self.records):,} records collected")
     
@@ -279,87 +274,72 @@ class SanctionsImporter:
         # Clean nulls
         df = df.replace({np.nan: None, pd.NaT: None})
         
-        self.records = df.to_dict('records')
+        # Same normalize_name / transliteration the screening API would otherwise run per candidate,
+        # and ISO codes for the nationality filter
+        self.records = [with_nationality_codes(with_name_forms(r)) for r in df.to_dict('records')]
         logger.info(f"✅ Cleaned: {len(self.records):,} records ready")
     
-    def import_to_cockroach(self):
-        """🚀 Fixed CockroachDB import"""
-        logger.info("\n🚀 IMPORTING TO COCKROACHDB...")
+    def import_to_cockroach(self, delta: bool = False, snapshot: bool = True):
+        """🚀 Fixed CockroachDB import (full reload, or only the changes with delta=True)"""
+        logger.info(f"\n🚀 IMPORTING TO COCKROACHDB ({'delta' if delta else 'full'})...")
         
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         try:
-            # Clear table
-            cursor.execute("TRUNCATE TABLE sanctions_list")
-            conn.commit()
-            logger.info("🗑️  Table cleared")
+            ensure_delta_columns(conn)
+            ensure_name_form_columns(conn)
+            ensure_nationality_codes_column(conn)
+            ensure_alias_table(conn)
             
-            insert_sql = """
-                INSERT INTO sanctions_list (
-                    id, entity_name, entity_type, first_name, last_name,
-                    list_source, program, is_pep, pep_level, position,
-                    jurisdiction, nationalities, aliases, date_of_birth,
-                    remarks, last_updated_date, created_at
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s
+            if delta:
+                # Inserts, updates and deletes keyed on (list_source, source_key), one transaction
+                changes = delta_sync(conn, self.records, columns=SANCTIONS_COLUMNS)
+                imported = len(self.records) - changes['skipped']
+                logger.info(
+                    f"\n✅ Synced {imported:,} records: {changes['inserted']:,} new, "
+                    f"{changes['updated']:,} changed, {changes['deleted']:,} removed, "
+                    f"{changes['unchanged']:,} unchanged"
                 )
-            """
+            else:
+                # COPY into staging tables that replace sanctions_list and sanctions_alias in one transaction
+                with tqdm(self.records, desc="Importing", unit="rows") as records:
+                    loaded = bulk_replace(conn, [
+                        (SANCTIONS_TABLE, SANCTIONS_COLUMNS, (keyed_record(r) for r in records)),
+                        (ALIAS_TABLE, ALIAS_COLUMNS, iter_alias_rows(self.records)),
+                    ])
+                imported = loaded[SANCTIONS_TABLE]
+                logger.info(f"🏷️  {loaded[ALIAS_TABLE]:,} names and aliases indexed")
+                logger.info(f"\n✅ Imported {imported:,} records!")
             
-            total = len(self.records)
-            imported = 0
+            self.total_imported = imported
             
-            with tqdm(total=total, desc="Importing", unit="rows") as pbar:
-                for i in range(0, total, self.BATCH_SIZE):
-                    batch = self.records[i:i + self.BATCH_SIZE]
-                    
-                    try:
-                        batch_data = [
-                            tuple(r.get(k, None) for k in [
-                                'id', 'entity_name', 'entity_type', 'first_name', 'last_name',
-                                'list_source', 'program', 'is_pep', 'pep_level', 'position',
-                                'jurisdiction', 'nationalities', 'aliases', 'date_of_birth',
-                                'remarks', 'last_updated_date', 'created_at'
-                            ])
-                            for r in batch
-                        ]
-                        
-                        cursor.executemany(insert_sql, batch_data)
-                        
-                        imported += len(batch)
-                        pbar.update(len(batch))
-                        
-                        # COMMIT EVERY 50k ROWS
-                        if imported % self.COMMIT_INTERVAL == 0:
-                            conn.commit()
-                            logger.info(f"💾 Checkpoint: {imported:,}/{total:,} ({imported/total*100:.1f}%)")
-                    
-                    except Exception as e:
-                        conn.rollback()
-                        logger.error(f"❌ Batch {i//self.BATCH_SIZE + 1} failed: {e}")
-                        continue
+            # Cached screening results keyed on the old version stop matching
+            version = bump_data_version(conn)
+            logger.info(f"🔖 Sanctions data version {version}")
             
-            # Final commit
-            conn.commit()
-            self.total_imported = imported
-            logger.info(f"\n✅ Imported {imported:,} records!")
+            # Workers on this host map the new indexes instead of rebuilding them
+            if snapshot:
+                try:
+                    build_index_snapshot(conn, version)
+                except Exception as e:
+                    # The data is committed; workers fall back to loading from the database
+                    conn.rollback()
+                    logger.warning(f"⚠️  Index snapshot not built: {e}")
             
             # Stats
-            self._show_stats(cursor)
+            with conn.cursor() as cursor:
+                self._show_stats(cursor)
             
         except Exception as e:
             logger.error(f"❌ Import failed: {e}")
-            conn.rollback()
             raise
         finally:
-            cursor.close()
             release_db_connection(conn)
     
     def _show_stats(self, cursor):
         """📊 Show final statistics"""
         cursor.execute("SELECT COUNT(*) FROM sanctions_list")
-        final_count = cursor.fetchone()
+        final_count = cursor.fetchone()['count']
         
         logger.info(f"📊 DB Count: {final_count:,} | Success Rate: {(final_count/self.total_imported*100):.1f}%")
         
@@ -367,18 +347,25 @@ class SanctionsImporter:
         cursor.execute("SELECT list_source, COUNT(*) FROM sanctions_list GROUP BY list_source ORDER BY count DESC")
         logger.info("📋 By source:")
         for row in cursor.fetchall():
-            logger.info(f"   • {row:<30} {row[1]:>6,}")
+            logger.info(f"   • {row['list_source']:<30} {row['count']:>6,}")
     
-    def run_full_pipeline(self):
+    def run_full_pipeline(self, delta: bool = False, snapshot: bool = True):
         """🎯 Run complete pipeline"""
+        if self.partial and not delta:
+            raise ValueError("a full import replaces every list; limit sources only with delta=True")
         start = datetime.now()
         
         logger.info("🚀 STARTING SANCTIONS IMPORT")
         logger.info(f"⏱️  Started: {start.strftime('%Y-%m-%d %H:%M:%S')}")
         
-        self.download_all_sources()
+        self.download_all_sources(skip_unchanged=delta)
+        if not self.records:
+            logger.info("✨ Nothing new to import")
+            return
         self.clean_data()
-        self.import_to_cockroach()
+        self.import_to_cockroach(delta=delta, snapshot=snapshot)
+        for source_key in self.loaded_sources:
+            self.feed_cache.mark_imported(source_key)
         
         end = datetime.now()
         duration = (end - start).total_seconds() / 60
@@ -389,14 +376,26 @@ class SanctionsImporter:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download all sanctions sources and import them")
+    parser.add_argument('--delta', action='store_true',
+                        help="apply only inserts/updates/deletes; feeds unchanged since the last import are skipped")
+    parser.add_argument('--fixture', action='append', default=[], metavar='SOURCE=PATH',
+                        help="read a source from a local file, e.g. un=data/un_consolidated.xml")
+    parser.add_argument('--only', action='append', metavar='SOURCE',
+                        help="limit the run to these sources (with --delta; a full import replaces every list)")
+    parser.add_argument('--no-snapshot', action='store_true',
+                        help="don't write the memory-mapped index snapshot for the new data version")
+    args = parser.parse_args()
+    if args.only and not args.delta:
+        parser.error("--only needs --delta: a full import would drop every list not selected")
+    
     try:
-        importer = SanctionsImporter()
-        importer.run_full_pipeline()
+        fixtures = dict(item.split('=', 1) for item in args.fixture)
+        importer = SanctionsImporter(fixtures=fixtures, only=args.only)
+        importer.run_full_pipeline(delta=args.delta, snapshot=not args.no_snapshot)
     except KeyboardInterrupt:
         logger.info("⚠️  Cancelled by user")
         sys.exit(1)
     except Exception as e:
         logger.error(f"💥 Fatal: {e}")
         sys.exit(1)
-ENDOFFILE
-
@@ -1,203 +1,97 @@
 #!/usr/bin/env python3
 """
 Full UN Consolidated List Parser
+
+Streams the XML with iterparse and clears every INDIVIDUAL/ENTITY once it
+has been converted, so memory stays flat regardless of list size. Records
+are written as JSON Lines while parsing.
 """
 import xml.etree.ElementTree as ET
 import json
 import re
 
+RECORD_TAGS = ('INDIVIDUAL', 'ENTITY')
+CONTAINER_TAGS = ('INDIVIDUALS', 'ENTITIES')
+
 def parse_date(date_str):
     """Parse UN date format"""
     if not date_str:
         return None, None
-    
+
     # Extract YYYY-MM-DD
     match = re.match(r'(\d{4}-\d{2}-\d{2})', str(date_str))
     if match:
         return match.group(1), date_str
-    
+
     return None, date_str
 
-def parse_un_xml(xml_file, output_file):
-    print("\n" + "="*70)
-    print("UN CONSOLIDATED LIST - FULL PARSER")
-    print("="*70 + "\n")
-    
-    print("📂 Parsing XML file...")
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    
-    entities = []
-    stats = {
-        'total': 0,
-        'individuals': 0,
-        'entities': 0,
-        'with_aliases': 0,
-        'with_dob': 0
-    }
-    
-    # Parse all INDIVIDUALS
-    for individual in root.findall('.//INDIVIDUAL'):
-        stats['total'] += 1
-        stats['individuals'] += 1
-        
-        # Basic info
-        un_list_type = individual.find('UN_LIST_TYPE')
-        reference_number = individual.find('REFERENCE_NUMBER')
-        
-        # Name parsing
-        first_name = individual.find('.//FIRST_NAME')
-        second_name = individual.find('.//SECOND_NAME')
-        third_name = individual.find('.//THIRD_NAME')
-        fourth_name = individual.find('.//FOURTH_NAME')
-        
-        first = first_name.text if first_name is not None else None
-        middle_parts = []
-        if second_name is not None and second_name.text:
-            middle_parts.append(second_name.text)
-        if third_name is not None and third_name.text:
-            middle_parts.append(third_name.text)
-        last = fourth_name.text if fourth_name is not None else None
-        
-        middle = ' '.join(middle_parts) if middle_parts else None
-        
-        # Build full name
-        name_parts = [p for p in [first, middle, last] if p]
-        full_name = ' '.join(name_parts) if name_parts else 'UNKNOWN'
-        
-        # Date of birth
-        dob_elem = individual.find('.//DATE_OF_BIRTH')
-        dob_text = dob_elem.text if dob_elem is not None else None
-        dob, dob_original = parse_date(dob_text)
-        if dob:
-            stats['with_dob'] += 1
-        
-        # Place of birth
-        pob_elem = individual.find('.//CITY_OF_BIRTH')
-        pob = pob_elem.text if pob_elem is not None else None
-        pob_country_elem = individual.find('.//COUNTRY_OF_BIRTH')
-        pob_country = pob_country_elem.text if pob_country_elem is not None else None
-        
-        # Gender
-        gender = 'unknown'
-        title = individual.find('.//TITLE')
-        if title is not None and title.text:
-            if title.text.lower() in ['mr', 'mr.']:
-                gender = 'male'
-            elif title.text.lower() in ['ms', 'ms.', 'mrs', 'mrs.']:
-                gender = 'female'
-        
-        # Nationalities
-        nationalities = []
-        for nat in individual.findall('.//NATIONALITY'):
-            if nat.text:
-                nationalities.append(nat.text)
-        
-        # Aliases
-        aliases = []
-        for alias in individual.findall('.//INDIVIDUAL_ALIAS'):
-            alias_name_elem = alias.find('.//ALIAS_NAME')
-            if alias_name_elem is not None and alias_name_elem.text:
-                aliases.append(alias_name_elem.text)
-        
-        if aliases:
-            stats['with_aliases'] += 1
-        
-        # Addresses
-        addresses = []
-        for addr in individual.findall('.//INDIVIDUAL_ADDRESS'):
-            street = addr.find('.//STREET')
-            city = addr.find('.//CITY')
-            country = addr.find('.//COUNTRY')
-            
-            addr_obj = {}
-            if street is not None and street.text:
-                addr_obj['street'] = street.text
-            if city is not None and city.text:
-                addr_obj['city'] = city.text
-            if country is not None and country.text:
-                addr_obj['country'] = country.text
-            
-            if addr_obj:
-                addresses.append(addr_obj)
-        
-        # Comments
-        comments_elem = individual.find('.//COMMENTS1')
-        comments = comments_elem.text if comments_elem is not None else None
-        
-        entity = {
-            'entity_id': reference_number.text if reference_number is not None else None,
-            'entity_name': full_name,
-            'first_name': first,
-            'middle_name': middle,
-            'last_name': last,
-            'entity_type': 'individual',
-            'gender': gender,
-            'date_of_birth': dob,
-            'date_of_birth_text': dob_original,
-            'place_of_birth': pob,
-            'place_of_birth_country': pob_country,
-            'nationalities': nationalities,
-            'aliases': aliases,
-            'addresses': addresses,
-            'countries': list(set([a.get('country') for a in addresses if a.get('country')])),
-            'list_source': 'UN',
-            'program': un_list_type.text if un_list_type is not None else 'UN Consolidated',
-            'remarks': comments
-        }
-        
-        entities.append(entity)
-        
-        if stats['total'] % 1000 == 0:
-            print(f"   Processing: {stats['total']} entities...")
-    
-    # Parse all ENTITIES
-    for entity_elem in root.findall('.//ENTITY'):
-        stats['total'] += 1
-        stats['entities'] += 1
-        
-        un_list_type = entity_elem.find('UN_LIST_TYPE')
-        reference_number = entity_elem.find('REFERENCE_NUMBER')
-        
-        # Entity name
-        first_name = entity_elem.find('.//FIRST_NAME')
-        name = first_name.text if first_name is not None else 'UNKNOWN'
-        
-        # Aliases
-        aliases = []
-        for alias in entity_elem.findall('.//ENTITY_ALIAS'):
-            alias_name_elem = alias.find('.//ALIAS_NAME')
-            if alias_name_elem is not None and alias_name_elem.text:
-                aliases.append(alias_name_elem.text)
-        
-        if aliases:
-            stats['with_aliases'] += 1
-        
-        # Addresses
-        addresses = []
-        for addr in entity_elem.findall('.//ENTITY_ADDRESS'):
-            street = addr.find('.//STREET')
-            city = addr.find('.//CITY')
-            country = addr.find('.//COUNTRY')
-            
-            addr_obj = {}
-            if street is not None and street.text:
-                addr_obj['street'] = street.text
-            if city is not None and city.text:
-                addr_obj['city'] = city.text
-            if country is not None and country.text:
-                addr_obj['country'] = country.text
-            
+def _text(elem):
+    """Stripped element text, or None for missing/empty elements"""
+    if elem is None or elem.text is None:
+        return None
+    text = elem.text.strip()
+    return text or None
+
+def _values(elem):
+    """Texts of the VALUE children of a multi-valued field (NATIONALITY, TITLE, ...)"""
+    return [v for v in (_text(child) for child in elem.iter('VALUE')) if v]
+
+def _address(elem):
+    addr_obj = {}
+    for key, tag in (('street', 'STREET'), ('city', 'CITY'), ('country', 'COUNTRY')):
+        value = _text(elem.find(tag))
+        if value:
+            addr_obj[key] = value
+    return addr_obj
+
+def _gender(gender, titles):
+    if gender:
+        return gender.lower() if gender.lower() in ('male', 'female') else 'unknown'
+    for title in titles:
+        if title.lower() in ['mr', 'mr.']:
+            return 'male'
+        if title.lower() in ['ms', 'ms.', 'mrs', 'mrs.']:
+            return 'female'
+    return 'unknown'
+
+def build_record(elem):
+    """Convert one INDIVIDUAL or ENTITY element with a single pass over its children"""
+    is_individual = elem.tag == 'INDIVIDUAL'
+    fields = {}
+    nationalities, titles, aliases, addresses = [], [], [], []
+    dob = dob_text = pob = pob_country = None
+
+    for child in elem:
+        tag = child.tag
+        if tag in ('NATIONALITY', 'TITLE'):
+            (nationalities if tag == 'NATIONALITY' else titles).extend(_values(child))
+        elif tag in ('INDIVIDUAL_ALIAS', 'ENTITY_ALIAS'):
+            alias_name = _text(child.find('ALIAS_NAME'))
+            if alias_name:
+                aliases.append(alias_name)
+        elif tag in ('INDIVIDUAL_ADDRESS', 'ENTITY_ADDRESS'):
+            addr_obj = _address(child)
             if addr_obj:
                 addresses.append(addr_obj)
-        
-        # Comments
-        comments_elem = entity_elem.find('.//COMMENTS1')
-        comments = comments_elem.text if comments_elem is not None else None
-        
-        entity = {
-            'entity_id': reference_number.text if reference_number is not None else None,
-            'entity_name': name,
+        elif tag == 'INDIVIDUAL_DATE_OF_BIRTH' and dob_text is None:
+            dob_text = _text(child.find('DATE')) or _text(child.find('YEAR'))
+        elif tag == 'INDIVIDUAL_PLACE_OF_BIRTH' and pob is None and pob_country is None:
+            pob = _text(child.find('CITY'))
+            pob_country = _text(child.find('COUNTRY'))
+        else:
+            fields[tag] = _text(child)
+
+    # A year-only DOB stays in date_of_birth_text; date_of_birth is only set for full dates
+    if dob_text:
+        dob, _ = parse_date(dob_text)
+
+    program = fields.get('UN_LIST_TYPE') or 'UN Consolidated'
+    countries = list(set([a.get('country') for a in addresses if a.get('country')]))
+
+    if not is_individual:
+        return {
+            'entity_id': fields.get('REFERENCE_NUMBER'),
+            'entity_name': fields.get('FIRST_NAME') or 'UNKNOWN',
             'first_name': None,
             'middle_name': None,
             'last_name': None,
@@ -210,38 +104,106 @@ def parse_un_xml(xml_file, output_file):
             'nationalities': [],
             'aliases': aliases,
             'addresses': addresses,
-            'countries': list(set([a.get('country') for a in addresses if a.get('country')])),
+            'countries': countries,
             'list_source': 'UN',
-            'program': un_list_type.text if un_list_type is not None else 'UN Consolidated',
-            'remarks': comments
+            'program': program,
+            'remarks': fields.get('COMMENTS1')
         }
-        
-        entities.append(entity)
-        
-        if stats['total'] % 1000 == 0:
-            print(f"   Processing: {stats['total']} entities...")
-    
+
+    first = fields.get('FIRST_NAME')
+    middle_parts = [p for p in (fields.get('SECOND_NAME'), fields.get('THIRD_NAME')) if p]
+    middle = ' '.join(middle_parts) if middle_parts else None
+    last = fields.get('FOURTH_NAME')
+    name_parts = [p for p in [first, middle, last] if p]
+
+    return {
+        'entity_id': fields.get('REFERENCE_NUMBER'),
+        'entity_name': ' '.join(name_parts) if name_parts else 'UNKNOWN',
+        'first_name': first,
+        'middle_name': middle,
+        'last_name': last,
+        'entity_type': 'individual',
+        'gender': _gender(fields.get('GENDER'), titles),
+        'date_of_birth': dob,
+        'date_of_birth_text': dob_text,
+        'place_of_birth': pob,
+        'place_of_birth_country': pob_country,
+        'nationalities': nationalities,
+        'aliases': aliases,
+        'addresses': addresses,
+        'countries': countries,
+        'list_source': 'UN',
+        'program': program,
+        'remarks': fields.get('COMMENTS1')
+    }
+
+def iter_un_records(source):
+    """Yield normalized records from a UN consolidated XML path or binary file object.
+
+    Each INDIVIDUAL/ENTITY is dropped from the tree as soon as it has been
+    converted, so only one record is held in memory at a time.
+    """
+    container = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag in CONTAINER_TAGS:
+                container = elem
+            continue
+        if elem.tag in RECORD_TAGS:
+            yield build_record(elem)
+            elem.clear()
+            if container is not None:
+                container.remove(elem)
+
+def parse_un_xml(xml_file, output_file):
+    print("\n" + "="*70)
+    print("UN CONSOLIDATED LIST - FULL PARSER")
+    print("="*70 + "\n")
+
+    print("📂 Streaming XML file...")
+    stats = {
+        'total': 0,
+        'individuals': 0,
+        'entities': 0,
+        'with_aliases': 0,
+        'with_dob': 0
+    }
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for entity in iter_un_records(xml_file):
+            stats['total'] += 1
+            if entity['entity_type'] == 'individual':
+                stats['individuals'] += 1
+            else:
+                stats['entities'] += 1
+            if entity['aliases']:
+                stats['with_aliases'] += 1
+            if entity['date_of_birth']:
+                stats['with_dob'] += 1
+
+            f.write(json.dumps(entity, ensure_ascii=False) + '\n')
+
+            if stats['total'] % 1000 == 0:
+                print(f"   Processing: {stats['total']} entities...")
+
+    total = stats['total'] or 1
     print(f"\n{'='*70}")
     print("PARSING COMPLETE!")
     print(f"{'='*70}")
     print(f"   Total entities: {stats['total']}")
-    print(f"   Individuals: {stats['individuals']} ({stats['individuals']/stats['total']*100:.1f}%)")
-    print(f"   Entities: {stats['entities']} ({stats['entities']/stats['total']*100:.1f}%)")
-    print(f"   With aliases: {stats['with_aliases']} ({stats['with_aliases']/stats['total']*100:.1f}%)")
-    print(f"   With DOB: {stats['with_dob']} ({stats['with_dob']/stats['total']*100:.1f}%)")
+    print(f"   Individuals: {stats['individuals']} ({stats['individuals']/total*100:.1f}%)")
+    print(f"   Entities: {stats['entities']} ({stats['entities']/total*100:.1f}%)")
+    print(f"   With aliases: {stats['with_aliases']} ({stats['with_aliases']/total*100:.1f}%)")
+    print(f"   With DOB: {stats['with_dob']} ({stats['with_dob']/total*100:.1f}%)")
     print(f"{'='*70}\n")
-    
-    # Save to JSON
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(entities, f, ensure_ascii=False, indent=2)
-    
-    print(f"✅ Saved {len(entities)} entities to: {output_file}\n")
-    return entities
+
+    print(f"✅ Saved {stats['total']} entities to: {output_file} (JSON Lines)\n")
+    return stats
 
 if __name__ == '__main__':
     import sys
     if len(sys.argv) != 3:
-        print("Usage: python3 parse_un_full.py <un_consolidated.xml> <output.json>")
+        print("Usage: python3 parse_un_full.py <un_consolidated.xml> <output.jsonl>")
         sys.exit(1)
-    
+
     parse_un_xml(sys.argv[1], sys.argv[2])
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Column-at-a-time record builders for the CSV importers.
+
+Every field is derived with whole-column pandas operations (null masks,
+string slicing, splitting) and the rows are zipped together at the end, so
+building a chunk costs a handful of vectorized passes instead of one
+DataFrame.iterrows() Series per row. The tuple builders emit rows in the
+column order their upload script hands to COPY.
+"""
+import re
+import uuid
+from datetime import datetime
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# cleaned_sanctions.csv -> sanctions_list (upload_turbo.py)
+TURBO_COLUMNS = [
+    'entity_name', 'entity_type', 'first_name', 'last_name', 'list_source',
+    'jurisdiction', 'aliases', 'date_of_birth', 'is_pep', 'pep_level'
+]
+# cleaned_sanctions.csv -> legacy sanctions_list layout (upload_chunked.py)
+CHUNKED_COLUMNS = [
+    'entity_id', 'name', 'entity_type', 'source', 'country', 'aliases', 'dates_of_birth', 'raw_data'
+]
+
+
+def text_column(df: pd.DataFrame, column: Any, max_len: Optional[int] = None,
+                default: Optional[str] = '') -> pd.Series:
+    """df[column] as python strings, nulls replaced by default and values cut to max_len.
+
+    column may be a name or a position; a column that does not exist is all default.
+    """
+    if isinstance(column, int):
+        values = df.iloc[:, column] if -len(df.columns) <= column < len(df.columns) else None
+    else:
+        values = df[column] if column in df.columns else None
+    if values is None:
+        return pd.Series(default, index=df.index, dtype=object)
+
+    present = values.notna()
+    # object round trip keeps plain python str (and None defaults) on pandas 2 and 3
+    text = values.astype(object).where(present, '').astype(str).astype(object)
+    if max_len is not None:
+        text = text.str.slice(0, max_len)
+    return text.where(present, default)
+
+
+def split_aliases(values: pd.Series, sep: str = '|') -> pd.Series:
+    """'a | b||c' -> ['a', 'b', 'c'] for every row; empty and null values give []"""
+    esc = re.escape(sep)
+    # Collapse separators with their surrounding whitespace first so a plain split gives clean parts
+    cleaned = (
+        values.fillna('').astype(str).astype(object)
+        .str.replace(rf'\s*{esc}[\s{esc}]*', sep, regex=True)
+        .str.replace(rf'^[\s{esc}]+|[\s{esc}]+$', '', regex=True)
+    )
+    present = cleaned != ''
+    result = pd.Series([[] for _ in range(len(values))], index=values.index, dtype=object)
+    result[present] = cleaned[present].str.split(sep, regex=False)
+    return result
+
+
+def split_names(names: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """First whitespace-separated word, and the remaining words joined by single spaces"""
+    collapsed = names.str.replace(r'\s+', ' ', regex=True).str.strip()
+    parts = collapsed.str.split(' ', n=1, expand=True, regex=False)
+    first = parts[0].fillna('') if 0 in parts.columns else pd.Series('', index=names.index)
+    last = parts[1].fillna('') if 1 in parts.columns else pd.Series('', index=names.index)
+    return first.astype(object), last.astype(object)
+
+
+def zip_rows(columns: Sequence[Any], length: int) -> List[tuple]:
+    """Zip Series / lists / scalars into row tuples; scalars are repeated on every row"""
+    iterables = []
+    for column in columns:
+        if isinstance(column, pd.Series):
+            iterables.append(column.tolist())
+        elif isinstance(column, (list, np.ndarray)):
+            iterables.append(column)
+        else:
+            iterables.append(repeat(column, length))
+    return list(zip(*iterables))
+
+
+def turbo_rows(df: pd.DataFrame) -> List[tuple]:
+    """cleaned_sanctions.csv chunk -> TURBO_COLUMNS tuples"""
+    name = text_column(df, 'name')
+    source = text_column(df, 'source')
+    dob = text_column(df, 'dates_of_birth')
+    first, last = split_names(name)
+    is_pep = source.str.lower().str.contains('pep', regex=False)
+
+    return zip_rows([
+        name.str.slice(0, 500).replace('', 'Unknown'),
+        text_column(df, 'entity_type', 100),
+        first.str.slice(0, 100),
+        last.str.slice(0, 100),
+        source.str.slice(0, 200).replace('', 'Unknown'),
+        text_column(df, 'country', 500),
+        split_aliases(text_column(df, 'aliases')),
+        dob.str.slice(0, 500).where(dob != 'nan', None),
+        is_pep.astype(bool),
+        pd.Series(np.where(is_pep, 'medium', None), index=df.index, dtype=object),
+    ], len(df))
+
+
+def chunked_rows(df: pd.DataFrame) -> List[tuple]:
+    """cleaned_sanctions.csv chunk -> CHUNKED_COLUMNS tuples"""
+    return zip_rows([
+        text_column(df, 'entity_id', 255),
+        text_column(df, 'name', 500),
+        text_column(df, 'entity_type', 100),
+        text_column(df, 'source', 100),
+        text_column(df, 'country', 500),
+        text_column(df, 'aliases', 2000),
+        text_column(df, 'dates_of_birth', 500),
+        text_column(df, 'raw_data', default='{}'),
+    ], len(df))
+
+
+def ofac_records(df: pd.DataFrame, source_name: str, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """OFAC sdn.csv frame -> SanctionsImporter record dicts.
+
+    The SDN file has no header row worth trusting, so fields are taken by
+    position exactly like the old row loop, but nulls become None (or the
+    default) instead of the string 'nan'.
+    """
+    now = now or datetime.now()
+    width = len(df.columns)
+    entity_type = text_column(df, 2, default='individual') if width > 2 else 'individual'
+    if isinstance(entity_type, pd.Series):
+        entity_type = entity_type.str.lower().str.strip().replace('', 'individual')
+
+    # Ent_Num comes back as float when the column has gaps; keep the integer form as the key
+    source_key = text_column(df, 0, default=None).str.replace(r'\.0$', '', regex=True) if width else None
+
+    frame = pd.DataFrame({
+        'id': [str(uuid.uuid4()) for _ in range(len(df))],
+        'entity_name': text_column(df, 1, default='Unknown') if width > 1 else 'Unknown',
+        'entity_type': entity_type,
+        'first_name': None,
+        'last_name': None,
+        'list_source': source_name,
+        'program': text_column(df, 3, default='SDN') if width > 3 else 'SDN',
+        'is_pep': False,
+        'pep_level': None,
+        'position': text_column(df, 4, default=None) if width > 4 else None,
+        'jurisdiction': None,
+        'nationalities': None,
+        'aliases': None,
+        'date_of_birth': None,
+        'remarks': text_column(df, -1, default=None) if width > 5 else None,
+        'last_updated_date': now,
+        'created_at': now,
+        'source_key': source_key,
+    }, index=df.index)
+    return frame.to_dict('records')
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
-import os, time, pandas as pd, psycopg2
-from psycopg2.extras import execute_batch
+import os, sys, time, pandas as pd, psycopg2
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from backend.bulk_load import copy_rows
+from backend.result_cache import bump_data_version
+from record_builder import chunked_rows, CHUNKED_COLUMNS
+
 def log(msg):
     print(f"{datetime.now().strftime('%H:%M:%S')} | {msg}")
 
@@ -90,12 +94,6 @@ log(f"✅ Total: {total_rows:,} records\n")
 log(f"⬆️  Uploading in chunks of {CHUNK_SIZE:,} (batches of {BATCH_SIZE:,})...")
 log("="*70)
 
-insert_sql = """
-    INSERT INTO sanctions_list 
-    (entity_id, name, entity_type, source, country, aliases, dates_of_birth, raw_data)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s::jsonb)
-"""
-
 uploaded = 0
 start = time.time()
 
@@ -109,29 +107,16 @@ try:
         conn.autocommit = False
         cur = conn.cursor()
         
-        # Process chunk in batches
+        # Process chunk in batches; fields are built for the whole chunk at once
+        rows = chunked_rows(chunk_df)
         chunk_uploaded = 0
-        for i in range(0, len(chunk_df), BATCH_SIZE):
-            batch = chunk_df.iloc[i:i+BATCH_SIZE]
-            
-            batch_data = []
-            for _, row in batch.iterrows():
-                batch_data.append((
-                    str(row.get('entity_id', ''))[:255] if pd.notna(row.get('entity_id')) else '',
-                    str(row.get('name', ''))[:500] if pd.notna(row.get('name')) else '',
-                    str(row.get('entity_type', ''))[:100] if pd.notna(row.get('entity_type')) else '',
-                    str(row.get('source', ''))[:100] if pd.notna(row.get('source')) else '',
-                    str(row.get('country', ''))[:500] if pd.notna(row.get('country')) else '',
-                    str(row.get('aliases', ''))[:2000] if pd.notna(row.get('aliases')) else '',
-                    str(row.get('dates_of_birth', ''))[:500] if pd.notna(row.get('dates_of_birth')) else '',
-                    str(row.get('raw_data', '{}')) if pd.notna(row.get('raw_data')) else '{}'
-                ))
-            
-            execute_batch(cur, insert_sql, batch_data, page_size=1000)
+        for i in range(0, len(rows), BATCH_SIZE):
+            batch_data = rows[i:i+BATCH_SIZE]
+            copy_rows(cur, 'sanctions_list', CHUNKED_COLUMNS, batch_data)
             conn.commit()
             
-            chunk_uploaded += len(batch)
-            uploaded += len(batch)
+            chunk_uploaded += len(batch_data)
+            uploaded += len(batch_data)
             
             elapsed = time.time() - start
             rate = uploaded / elapsed if elapsed > 0 else 0
@@ -152,6 +137,8 @@ try:
     
     # Verify
     conn = psycopg2.connect(**CONN)
+    # Running workers reload their indexes and stop serving cached results for the old data
+    log(f"🔖 Sanctions data version {bump_data_version(conn)}")
     cur = conn.cursor()
     cur.execute("SELECT COUNT(*) FROM sanctions_list")
     final = cur.fetchone()[0]